@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+bench.py: Lexer and parser throughput benchmarks, with regression checks.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tsparxer.lexer import BACKENDS
+from tsparxer.lexer import Identifiers
+from tsparxer.lexer import Lexer as TSLexer
+from tsparxer.parser import Parser as TSParser
+
+from .corpus import generate
+from .timing import best
+
+# metrics where a larger value is an improvement, every other one (latencies,
+# memory) regresses when it grows
+HIGHER_IS_BETTER = {
+    "lex_tokens_per_s",
+    "lex_bytes_per_s",
+    "parse_bytes_per_s",
+    "parses_per_s",
+    "lex_bytes_saved_per_mb",
+}
+
+
+def _peak(func: Callable[[], object]) -> int:
+    """
+    Returns the peak amount of memory allocated while calling `func`, in bytes.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class _Uninterned(Identifiers):
+    """
+    An identifier table keeping nothing, every word is looked up as scanned
+    and keeps its own string, as lexing did before the table.
+    """
+
+    __slots__ = ()
+
+    def lookup(self, text: str) -> Tuple[str, str, int]:
+        return text, self.reserved.get(text.lower(), "ID"), -1
+
+
+def _retained(lexer: TSLexer, corpus: str) -> int:
+    """
+    Returns the memory still allocated after lexing the corpus, its tokens
+    kept, in bytes.
+    """
+    tracemalloc.start()
+    try:
+        tokens = lexer.lex(corpus)
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    # the tokens were kept alive until measured
+    del tokens
+    return retained
+
+
+def _interning(lexer: TSLexer, corpus: str) -> Dict[str, float]:
+    """
+    Returns the memory kept by the tokens of the corpus lexed by a lexer with
+    a fresh identifier table, its table included, and the memory that table
+    saves per megabyte lexed against the same lexer without one.
+    """
+    interned = lexer.clone()
+    plain = lexer.clone()
+    plain.identifiers = _Uninterned(plain.reserved)
+
+    retained = _retained(interned, corpus)
+    megabytes = len(corpus.encode()) / 1e6
+
+    return {
+        "lex_retained_bytes": retained,
+        "lex_bytes_saved_per_mb": (_retained(plain, corpus) - retained)
+        / megabytes,
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+# -----------------------------------------------------------------------------
+# Measurements
+# -----------------------------------------------------------------------------
+
+
+def measure(
+    size: int, programs: int, repeat: int, seed: int = 0, backend: str = "ply"
+) -> Dict[str, float]:
+    """
+    Runs every benchmark and returns the metrics by name.
+
+    :param size: The length of the large corpus, in characters
+    :param programs: The amount of small programs parsed one by one
+    :param repeat: The amount of runs, the fastest one is reported
+    :param seed: The seed of the generated corpora
+    :param backend: The lexer backend to measure
+    """
+    metrics: Dict[str, float] = {}
+
+    # the first construction compiles (or loads) the tables, later ones reuse
+    # them
+    start = time.perf_counter()
+    lexer = TSLexer(backend=backend)
+    metrics["lexer_cold_ms"] = (time.perf_counter() - start) * 1e3
+    metrics["lexer_init_ms"] = (
+        best(lambda: TSLexer(backend=backend), repeat * 100) * 1e3
+    )
+
+    start = time.perf_counter()
+    parser = TSParser(lexer)
+    metrics["parser_cold_ms"] = (time.perf_counter() - start) * 1e3
+    metrics["parser_init_ms"] = (
+        best(lambda: TSParser(lexer), repeat * 100) * 1e3
+    )
+
+    corpus = generate(size, seed)
+    tokens = len(lexer.lex(corpus))
+
+    elapsed = best(lambda: lexer.lex(corpus), repeat)
+    metrics["lex_tokens_per_s"] = tokens / elapsed
+    metrics["lex_bytes_per_s"] = len(corpus) / elapsed
+
+    elapsed = best(lambda: parser.parse(corpus), repeat)
+    metrics["parse_bytes_per_s"] = len(corpus) / elapsed
+
+    # many small inputs, dominated by per-parse overhead
+    sources = [generate(500, seed + i) for i in range(programs)]
+    elapsed = best(lambda: [parser.parse(s) for s in sources], repeat)
+    metrics["parses_per_s"] = programs / elapsed
+
+    metrics["lex_peak_bytes"] = _peak(lambda: lexer.lex(corpus))
+    metrics.update(_interning(lexer, corpus))
+    metrics["parse_peak_bytes"] = _peak(lambda: parser.parse(corpus))
+
+    return metrics
+
+
+def compare(
+    baseline: Dict[str, float], current: Dict[str, float], threshold: float
+) -> List[Tuple[str, float, float, float]]:
+    """
+    Returns the metrics that got worse by more than `threshold` as tuples of
+    `(name, baseline, current, change)`, `change` being relative to baseline.
+
+    :param baseline: The metrics to compare against
+    :param current: The newly measured metrics
+    :param threshold: The tolerated relative change, e.g. `0.1` for 10%
+    """
+    regressions = []
+    for name, old in baseline.items():
+        new = current.get(name)
+        if new is None or not old:
+            continue
+
+        # savings may be negative, a cost
+        change = (new - old) / abs(old)
+        worse = -change if name in HIGHER_IS_BETTER else change
+        if worse > threshold:
+            regressions.append((name, old, new, change))
+
+    return regressions
+
+
+# -----------------------------------------------------------------------------
+# Entry point
+# -----------------------------------------------------------------------------
+
+
+def bench(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the benchmarks, prints the metrics and optionally writes them as JSON
+    or compares them with a previous run. Returns non-zero on regressions.
+
+    :param argv: The arguments, defaults to `sys.argv`
+    """
+    parser = argparse.ArgumentParser(
+        prog="bench", description="Benchmark the lexer and parser."
+    )
+    parser.add_argument(
+        "--size", type=int, default=200_000, help="corpus size in characters"
+    )
+    parser.add_argument(
+        "--programs", type=int, default=200, help="small programs to parse"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs per metric")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument(
+        "--backend", choices=BACKENDS, default="ply", help="lexer backend"
+    )
+    parser.add_argument("-o", "--output", help="write the results to a file")
+    parser.add_argument("--compare", help="results of a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative change reported as regression (default: 0.1)",
+    )
+    args = parser.parse_args(argv)
+
+    metrics = measure(
+        args.size, args.programs, args.repeat, args.seed, args.backend
+    )
+    results = {
+        "meta": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "size": args.size,
+            "programs": args.programs,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "backend": args.backend,
+        },
+        "metrics": metrics,
+    }
+
+    for name, value in metrics.items():
+        print(f"{name:<20} {value:>16,.3f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as file:
+        baseline = json.load(file)["metrics"]
+
+    regressions = compare(baseline, metrics, args.threshold)
+    for name, old, new, change in regressions:
+        print(
+            f"regression: {name} {old:,.3f} -> {new:,.3f} ({change:+.1%})",
+            file=sys.stderr,
+        )
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(bench())
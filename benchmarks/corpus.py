@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+corpus.py: Synthetic TypeScript corpora built from the supported constructs.
+"""
+
+import random
+import textwrap
+from typing import Callable, List
+
+# statements nest at most this deep inside control structures and functions
+MAX_DEPTH: int = 3
+
+TYPES: List[str] = ["number", "string", "boolean"]
+# `const` is left out, the grammar reserves `const ID =` for functions
+KINDS: List[str] = ["let", "var"]
+ARITHMETIC: List[str] = ["+", "-", "*", "/", "%"]
+COMPARATIVE: List[str] = ["==", "===", "!=", "<", "<=", ">", ">="]
+
+
+class Generator:
+    """
+    Generates random, syntactically valid programs for the tsparxer grammar.
+    """
+
+    def __init__(self, seed: int = 0) -> None:
+        self.random = random.Random(seed)
+        self.counter = 0
+
+    # -------------------------------------------------------------------------
+    # Terminals
+    # -------------------------------------------------------------------------
+
+    def name(self) -> str:
+        self.counter += 1
+        return f"v{self.counter}"
+
+    def number(self) -> str:
+        return str(self.random.randint(0, 1000))
+
+    def string(self) -> str:
+        words = self.random.choice(["hello", "world", "foo bar", "a, b"])
+        return self.random.choice(['"%s"', "'%s'"]) % words
+
+    def value(self, type: str) -> str:
+        if type == "number":
+            return self.number()
+        elif type == "string":
+            return self.string()
+        else:
+            return self.random.choice(["true", "false"])
+
+    def operand(self) -> str:
+        return self.random.choice([self.number(), self.name()])
+
+    def expression(self) -> str:
+        parts = [self.operand()]
+        for _ in range(self.random.randint(0, 3)):
+            parts += (self.random.choice(ARITHMETIC), self.operand())
+
+        return " ".join(parts)
+
+    def condition(self) -> str:
+        left, right = self.expression(), self.expression()
+        comparative = f"{left} {self.random.choice(COMPARATIVE)} {right}"
+        choice = self.random.randrange(3)
+
+        if choice == 0:
+            return comparative
+        elif choice == 1:
+            return f"{comparative} && {self.name()} || true"
+        else:
+            return f"!({self.string()})"
+
+    # -------------------------------------------------------------------------
+    # Statements
+    # -------------------------------------------------------------------------
+
+    def assignment(self, depth: int) -> str:
+        kind = self.random.choice(KINDS)
+        if self.random.random() < 0.5:
+            type = self.random.choice(TYPES)
+            return f"{kind} {self.name()}: {type} = {self.value(type)};"
+
+        return f"{kind} {self.name()} = {self.expression()};"
+
+    def array(self, depth: int) -> str:
+        type = self.random.choice(TYPES)
+        values = ", ".join(
+            self.value(type) for _ in range(self.random.randint(1, 8))
+        )
+        return f"let {self.name()}: {type}[] = [{values}];"
+
+    def tuple(self, depth: int) -> str:
+        types = [
+            self.random.choice(TYPES) for _ in range(self.random.randint(1, 4))
+        ]
+        values = ", ".join(self.value(t) for t in types)
+        return f"let {self.name()}: [{', '.join(types)}] = [{values}];"
+
+    def interface(self, depth: int) -> str:
+        fields = " ".join(
+            f"{self.name()}: {self.random.choice(TYPES)};"
+            for _ in range(self.random.randint(1, 5))
+        )
+        return f"interface {self.name().upper()} {{ {fields} }}"
+
+    def console_log(self, depth: int) -> str:
+        parts = [
+            self.random.choice([self.string(), self.name(), self.number()])
+            for _ in range(self.random.randint(1, 3))
+        ]
+        return f"console.log({' + '.join(parts)});"
+
+    def control_if(self, depth: int) -> str:
+        statement = f"if ({self.condition()}) {{\n{self.block(depth)}}}"
+        if self.random.random() < 0.5:
+            statement += f" else {{\n{self.block(depth)}}}"
+
+        return statement
+
+    def control_while(self, depth: int) -> str:
+        return f"while ({self.condition()}) {{\n{self.block(depth)}}}"
+
+    def loop_for(self, depth: int) -> str:
+        i = self.name()
+        delta = self.random.choice([f"{i}++", f"{i}--", f"++{i}", f"--{i}"])
+        return (
+            f"for (let {i}: number = 0; {i} < {self.number()}; {delta}) "
+            f"{{\n{self.block(depth)}}}"
+        )
+
+    def function_decl(self, depth: int) -> str:
+        name = self.name()
+        params = ", ".join(
+            f"{self.name()}: {self.random.choice(TYPES)}"
+            for _ in range(self.random.randint(1, 4))
+        )
+        body = f"{self.block(depth)}    return {self.name()};\n"
+        choice = self.random.randrange(3)
+
+        if choice == 0:
+            return f"function {name}({params}): number {{\n{body}}}"
+        elif choice == 1:
+            return f"const {name} = function({params}) {{\n{body}}};"
+        else:
+            return f"const {name} = ({params}): string => {{\n{body}}}"
+
+    def statement(self, depth: int = 0) -> str:
+        simple: List[Callable[[int], str]] = [
+            self.assignment,
+            self.assignment,
+            self.array,
+            self.tuple,
+            self.console_log,
+        ]
+        nested: List[Callable[[int], str]] = [
+            self.control_if,
+            self.control_while,
+            self.loop_for,
+            self.function_decl,
+        ]
+
+        rules = simple + nested if depth < MAX_DEPTH else simple
+        if depth == 0:
+            rules.append(self.interface)
+
+        return self.random.choice(rules)(depth)
+
+    def block(self, depth: int) -> str:
+        return "".join(
+            textwrap.indent(self.statement(depth + 1), "    ") + "\n"
+            for _ in range(self.random.randint(1, 3))
+        )
+
+    def program(self, size: int) -> str:
+        """
+        Returns a program of at least `size` characters.
+
+        :param size: The minimum length of the program
+        """
+        statements, length = [], 0
+        while length < size:
+            statement = self.statement()
+            statements.append(statement)
+            length += len(statement) + 1
+
+        return "\n".join(statements) + "\n"
+
+
+def generate(size: int, seed: int = 0) -> str:
+    """
+    Returns a random program of at least `size` characters.
+
+    :param size: The minimum length of the program
+    :param seed: The seed, equal seeds produce equal programs
+    """
+    return Generator(seed).program(size)
@@ -0,0 +1,657 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+fuzz.py: Grammar-driven and mutation fuzzing of the lexer and parser.
+"""
+
+import argparse
+import glob
+import itertools
+import os
+import random
+import time
+from collections import Counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from tsparxer.lexer import BACKENDS
+from tsparxer.lexer import Lexer as TSLexer
+from tsparxer.nodes import Node, walk
+from tsparxer.parser import Parser as TSParser
+from tsparxer.parser import ParserSyntaxError
+
+from .corpus import generate
+
+# inputs taking longer than this to parse, in microseconds per byte, are
+# flagged; typical ones take a few
+DEFAULT_THRESHOLD: float = 50.0
+# shorter inputs are dominated by the fixed cost of a parse, their time per
+# byte means nothing
+MIN_TIMED_BYTES: int = 512
+# a flagged input is parsed repeated this many times, taking over this factor
+# more than linear growth would is super-linear
+SCALE: int = 4
+SUPERLINEAR: float = 2.0
+# mutants the parser accepted are kept as seeds, up to this many
+MAX_CORPUS: int = 1000
+
+# text inserted by mutations, besides the terminals of the grammar: token
+# delimiters, unterminated constructs and illegal characters
+PIECES: List[str] = [
+    '"',
+    "'",
+    "/*",
+    "*/",
+    "//",
+    "\n",
+    "\r",
+    "\t",
+    "@",
+    "#",
+    "é",
+    "\x00",
+    "0",
+    "_",
+]
+
+
+class Finding(NamedTuple):
+    """
+    An input on which the lexer or parser misbehaved.
+    """
+
+    # `crash`, `backend`, `relex`, `recover`, `grammar`, `slow` or
+    # `superlinear`; `harness` when the checks themselves failed
+    kind: str
+    message: str
+    source: str
+
+
+T = TypeVar("T")
+
+
+class _Crash(Exception):
+    """
+    Wraps an exception raised by the lexer or parser, as opposed to one of
+    the checks around them.
+    """
+
+
+# -----------------------------------------------------------------------------
+# Grammar
+# -----------------------------------------------------------------------------
+
+
+class Grammar:
+    """
+    The productions of a parser, read from its generated tables, along with
+    the height of the shortest derivation of every symbol. Error recovery
+    productions are left out.
+    """
+
+    def __init__(self, parser: TSParser) -> None:
+        """
+        :param parser: The parser whose grammar is walked
+        """
+        self.rules: Dict[str, List[Tuple[str, ...]]] = {}
+        # `S' -> program` comes first
+        self.start = parser.parser.productions[0].str.split()[-1]
+
+        for production in parser.parser.productions[1:]:
+            name, _, body = production.str.partition(" -> ")
+            symbols = tuple(s for s in body.split() if s != "<empty>")
+            if "error" not in symbols:
+                self.rules.setdefault(name, []).append(symbols)
+
+        # terminals have height 0, a production one more than its highest
+        # symbol; iterated until every nonterminal reaches its minimum
+        self.heights: Dict[str, float] = {n: float("inf") for n in self.rules}
+        changed = True
+        while changed:
+            changed = False
+            for name, rules in self.rules.items():
+                height = min(self.height(rule) for rule in rules)
+                if height < self.heights[name]:
+                    self.heights[name] = height
+                    changed = True
+
+    @property
+    def terminals(self) -> List[str]:
+        return sorted(
+            {
+                s
+                for rules in self.rules.values()
+                for rule in rules
+                for s in rule
+                if s not in self.rules
+            }
+        )
+
+    def height(self, rule: Tuple[str, ...]) -> float:
+        """
+        Returns the height of the shortest derivation of a production.
+        """
+        return 1 + max((self.heights.get(s, 0) for s in rule), default=0)
+
+
+class GrammarGenerator:
+    """
+    Generates random programs by deriving the start symbol of a `Grammar`,
+    picking productions at random while they fit in a depth budget. The
+    programs are syntactically valid, but may break the semantic checks of
+    the parser (e.g. assigning a string to a `number`).
+    """
+
+    def __init__(
+        self, grammar: Grammar, seed: int = 0, max_depth: int = 12
+    ) -> None:
+        """
+        :param grammar: The grammar to derive programs from
+        :param seed: The seed, equal seeds produce equal programs
+        :param max_depth: The depth of the derivation trees
+        """
+        self.grammar = grammar
+        self.random = random.Random(seed)
+        self.max_depth = max(max_depth, int(grammar.heights[grammar.start]))
+        self.counter = 0
+
+        # every terminal is a keyword, a fixed piece of punctuation or one of
+        # the value tokens built below
+        self.texts: Dict[str, str] = {
+            type: text for text, type in TSLexer.fast_spec().literals.items()
+        }
+        self.texts.update({type: w for w, type in TSLexer.reserved.items()})
+
+    def derive(self, symbol: Optional[str] = None) -> List[str]:
+        """
+        Returns the terminals of a random derivation of a symbol.
+
+        :param symbol: The symbol to derive, the start symbol by default
+        """
+        rules = self.grammar.rules
+        terminals = []
+        # expanded without recursing, leftmost symbol first
+        stack = [(symbol or self.grammar.start, 0)]
+        while stack:
+            symbol, depth = stack.pop()
+            if symbol not in rules:
+                terminals.append(symbol)
+                continue
+
+            budget = self.max_depth - depth
+            choices = [
+                r for r in rules[symbol] if self.grammar.height(r) <= budget
+            ]
+            rule = self.random.choice(choices)
+            stack.extend((s, depth + 1) for s in reversed(rule))
+
+        return terminals
+
+    def text(self, type: str) -> str:
+        """
+        Returns a random text of a terminal.
+        """
+        if type == "ID":
+            self.counter += 1
+            return f"v{self.counter}"
+        elif type == "NUMBER":
+            return str(self.random.randint(0, 1000))
+        elif type == "STRINGCONTENT":
+            return self.random.choice(['"%s"', "'%s'"]) % "hello world"
+
+        return self.texts[type]
+
+    def program(self) -> Tuple[str, List[str]]:
+        """
+        Returns a random program and the types of its tokens.
+        """
+        types = self.derive()
+        parts = []
+        for type in types:
+            parts.append(self.text(type))
+            # tokens never touch, statements mostly end lines
+            end = type in ("SEMICOLON", "OPENBRACE", "CLOSEBRACE")
+            parts.append("\n" if end and self.random.random() < 0.8 else " ")
+
+        return "".join(parts), types
+
+
+# -----------------------------------------------------------------------------
+# Fuzzer
+# -----------------------------------------------------------------------------
+
+
+def _blank(source: str, spans: List[Tuple[int, int]]) -> str:
+    """
+    Returns the source with everything outside of the spans replaced by
+    spaces, but newlines, so every offset and line stays the same.
+    """
+    parts, last = [], 0
+    for start, end in spans:
+        gap = source[last:start]
+        parts.append("".join(c if c == "\n" else " " for c in gap))
+        parts.append(source[start:end])
+        last = end
+
+    parts.append("".join(c if c == "\n" else " " for c in source[last:]))
+    return "".join(parts)
+
+
+class Fuzzer:
+    """
+    Feeds generated and mutated inputs to the lexer and parser, and checks
+    every one of them for:
+
+    - crashes, any exception but a syntax error;
+    - differences between the lexer backends;
+    - tokens that lex differently once the text between them is blanked out,
+      i.e. tokens whose offsets, lines or values don't match their text;
+    - recovering parses disagreeing with strict ones, on the tree or on the
+      first error;
+    - grammar-generated programs not lexing to the derived tokens;
+    - parses taking more than `threshold` microseconds per byte, and growing
+      super-linearly with the input.
+    """
+
+    def __init__(self, seed: int = 0, threshold: float = DEFAULT_THRESHOLD):
+        """
+        :param seed: The seed, equal seeds fuzz equal inputs
+        :param threshold: Parse time flagged as slow, in microseconds per byte
+        """
+        self.random = random.Random(seed)
+        self.threshold = threshold
+        self.stats: Counter = Counter()
+        # whether the parser accepted the last input checked
+        self.accepted = False
+
+        self.lexers = {
+            backend: TSLexer(backend=backend) for backend in BACKENDS
+        }
+        self.strict = TSParser(TSLexer())
+        self.recover = TSParser(TSLexer(), recover=True)
+        self.generator = GrammarGenerator(Grammar(self.strict), seed)
+
+        self.corpus = [generate(200, seed + i) for i in range(10)]
+        data = os.path.join(os.path.dirname(__file__), "..", "data", "*.ts")
+        for path in sorted(glob.glob(data)):
+            with open(path, "r", encoding="utf-8") as f:
+                self.corpus.append(f.read())
+
+        self.pieces = PIECES + sorted(self.generator.texts.values())
+        self.mutations: List[Callable[[str], str]] = [
+            self._delete,
+            self._duplicate,
+            self._insert,
+            self._replace,
+            self._splice,
+            self._repeat,
+        ]
+
+    def run(
+        self, iterations: Optional[int] = None, seconds: Optional[float] = None
+    ) -> Iterator[Finding]:
+        """
+        Fuzzes until `iterations` inputs were checked or `seconds` passed,
+        yielding the findings. Every fourth input is a grammar-generated
+        program, the others are mutants of the corpus.
+
+        :param iterations: The amount of inputs, unbounded if `None`
+        :param seconds: The time budget, unbounded if `None`
+        """
+        deadline = None if seconds is None else time.monotonic() + seconds
+        for i in itertools.count():
+            if iterations is not None and i >= iterations:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+
+            if i % 4 == 0:
+                source, types = self.generator.program()
+                yield from self.check(source, types)
+                continue
+
+            source = self.mutate(self.random.choice(self.corpus))
+            findings = self.check(source)
+            if self.accepted and len(self.corpus) < MAX_CORPUS:
+                self.corpus.append(source)
+
+            yield from findings
+
+    def mutate(self, source: str) -> str:
+        """
+        Returns the source after one to four random mutations.
+        """
+        for _ in range(self.random.randint(1, 4)):
+            source = self.random.choice(self.mutations)(source)
+
+        return source
+
+    def check(
+        self, source: str, types: Optional[List[str]] = None
+    ) -> List[Finding]:
+        """
+        Runs every check on an input, returns what was found.
+
+        :param source: The input
+        :param types: The token types the input must lex to, if known
+        """
+        self.stats["inputs"] += 1
+        try:
+            return self._check(source, types)
+        except _Crash as crash:
+            self.accepted = False
+            e = crash.__cause__
+            return [Finding("crash", f"{type(e).__name__}: {e}", source)]
+        except Exception as e:
+            self.accepted = False
+            return [Finding("harness", f"{type(e).__name__}: {e}", source)]
+
+    def _call(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Calls into the lexer or parser, telling their crashes apart from
+        syntax errors and from failures of the checks.
+        """
+        try:
+            return func(*args)
+        except ParserSyntaxError:
+            raise
+        except Exception as e:
+            raise _Crash() from e
+
+    def _check(self, source: str, types: Optional[List[str]]) -> List[Finding]:
+        findings = []
+
+        def found(kind: str, message: str) -> None:
+            findings.append(Finding(kind, message, source))
+
+        # lexing
+        tokens = {}
+        for backend, lexer in self.lexers.items():
+            tokens[backend] = (
+                self._call(self._lex, lexer, source),
+                lexer.errors,
+            )
+
+        first, *others = BACKENDS
+        for backend in others:
+            diff = _difference(tokens[first][0], tokens[backend][0])
+            if diff is not None:
+                found("backend", f"{first} and {backend} tokens differ: {diff}")
+            elif tokens[first][1] != tokens[backend][1]:
+                found("backend", f"{first} and {backend} errors differ")
+
+        lexed = tokens[first][0]
+        blanked = _blank(source, [(t[3], t[4]) for t in lexed])
+        relexed = self._call(self._lex, self.lexers[first], blanked)
+        diff = _difference(lexed, relexed)
+        if diff is not None:
+            found("relex", f"tokens differ once blanked: {diff}")
+
+        if types is not None and [t[0] for t in lexed] != types:
+            found("grammar", "generated program lexes to other tokens")
+
+        # parsing
+        start = time.perf_counter()
+        try:
+            program, error = self._call(self.strict.parse, source), None
+        except ParserSyntaxError as e:
+            program, error = None, e
+        elapsed = time.perf_counter() - start
+
+        recovered = self._call(self.recover.parse, source)
+        errors = self.recover.errors
+        if error is None:
+            if errors:
+                found("recover", f"recovery reports {errors[0]} on valid input")
+            elif not _same_tree(recovered, program):
+                found("recover", "recovery builds another tree")
+        elif not errors:
+            found("recover", f"recovery misses {error}")
+        elif (errors[0].lineno, errors[0].col) != (error.lineno, error.col):
+            found(
+                "recover",
+                f"recovery reports {errors[0]} at {errors[0].lineno}:"
+                f"{errors[0].col}, not {error} at {error.lineno}:{error.col}",
+            )
+
+        self.stats["accepted" if error is None else "rejected"] += 1
+        if types is not None:
+            # derivations can still fail the type checks, or run into the
+            # grammar's conflicts, which PLY resolves by shifting
+            self.stats["generated"] += 1
+            self.stats["generated_rejected"] += error is not None
+        self.accepted = error is None
+
+        # performance, a slow parse is timed again to rule out noise
+        size = len(source)
+        if size >= MIN_TIMED_BYTES and elapsed / size * 1e6 > self.threshold:
+            base = self._time(source)
+            if base / size * 1e6 > self.threshold:
+                ratio = self._time("\n".join([source] * SCALE)) / base
+                kind = "superlinear" if ratio > SCALE * SUPERLINEAR else "slow"
+                found(
+                    kind,
+                    f"{base / size * 1e6:.1f} us/byte, x{ratio:.1f} for "
+                    f"x{SCALE} input",
+                )
+
+        return findings
+
+    def _lex(
+        self, lexer: TSLexer, source: str
+    ) -> List[Tuple[str, object, int, int, int]]:
+        """
+        Returns the type, value, line, start and end of every token.
+        """
+        tokens = []
+        for t in lexer.iter_tokens(source):
+            # the scanner stops right after the token just returned
+            tokens.append((t.type, t.value, t.lineno, t.lexpos, lexer.lexpos))
+
+        return tokens
+
+    def _time(self, source: str) -> float:
+        """
+        Returns the fastest of three parses of the source, in seconds.
+        """
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            try:
+                self._call(self.strict.parse, source)
+            except ParserSyntaxError:
+                pass
+            times.append(time.perf_counter() - start)
+
+        return min(times)
+
+    def shrink(self, finding: Finding) -> Finding:
+        """
+        Returns the finding on the smallest input found by deleting chunks of
+        the original one while the same kind of finding remains. Performance
+        findings depend on the size and are returned as is.
+
+        :param finding: The finding to minimize
+        """
+        if finding.kind in ("slow", "superlinear", "grammar"):
+            return finding
+
+        def same(source: str) -> Optional[Finding]:
+            for other in self.check(source):
+                if other.kind == finding.kind:
+                    return other
+
+            return None
+
+        chunk = len(finding.source) // 2
+        while chunk:
+            i = 0
+            while i < len(finding.source):
+                end = i + chunk
+                source = finding.source[:i] + finding.source[end:]
+                smaller = same(source)
+                if smaller is not None:
+                    finding = smaller
+                else:
+                    i += chunk
+            chunk //= 2
+
+        return finding
+
+    # -------------------------------------------------------------------------
+    # Mutations
+    # -------------------------------------------------------------------------
+
+    def _span(self, source: str, size: int = 16) -> Tuple[int, int]:
+        start = self.random.randint(0, len(source))
+        return start, min(start + self.random.randint(1, size), len(source))
+
+    def _delete(self, source: str) -> str:
+        start, end = self._span(source)
+        return source[:start] + source[end:]
+
+    def _duplicate(self, source: str) -> str:
+        start, end = self._span(source)
+        at = self.random.randint(0, len(source))
+        return source[:at] + source[start:end] + source[at:]
+
+    def _insert(self, source: str) -> str:
+        at = self.random.randint(0, len(source))
+        return source[:at] + self.random.choice(self.pieces) + source[at:]
+
+    def _replace(self, source: str) -> str:
+        start, end = self._span(source, 4)
+        return source[:start] + self.random.choice(self.pieces) + source[end:]
+
+    def _splice(self, source: str) -> str:
+        other = self.random.choice(self.corpus)
+        start, end = self._span(other, 64)
+        at = self.random.randint(0, len(source))
+        return source[:at] + other[start:end] + source[at:]
+
+    def _repeat(self, source: str) -> str:
+        # long runs of one construct, e.g. deep nesting or many operators
+        start, end = self._span(source, 8)
+        times = self.random.randint(2, 200)
+        return source[:start] + source[start:end] * times + source[end:]
+
+
+def _difference(a: List[Tuple], b: List[Tuple]) -> Optional[str]:
+    """
+    Describes the first difference between two token lists, `None` if equal.
+    """
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return f"token {i}: {x} != {y}"
+
+    if len(a) != len(b):
+        return f"{len(a)} != {len(b)} tokens"
+
+    return None
+
+
+def _same_tree(a: Optional[Node], b: Optional[Node]) -> bool:
+    """
+    Whether two syntax trees are equal but for positions, compared node by
+    node in pre-order rather than recursively, as trees can be deep.
+    """
+    if a is None or b is None:
+        return a is b
+
+    for x, y in itertools.zip_longest(walk(a), walk(b)):
+        if type(x) is not type(y):
+            return False
+
+        # the child nodes are compared in turn, only their shape here
+        for field in x._fields:
+            mine, theirs = getattr(x, field), getattr(y, field)
+            if isinstance(mine, Node) or isinstance(theirs, Node):
+                if type(mine) is not type(theirs):
+                    return False
+            elif isinstance(mine, list) and isinstance(theirs, list):
+                if len(mine) != len(theirs) or [
+                    v for v in mine if not isinstance(v, Node)
+                ] != [v for v in theirs if not isinstance(v, Node)]:
+                    return False
+            elif mine != theirs:
+                return False
+
+    return True
+
+
+# -----------------------------------------------------------------------------
+# Entry point
+# -----------------------------------------------------------------------------
+
+
+def fuzz(argv: Optional[List[str]] = None) -> int:
+    """
+    Fuzzes the lexer and parser, writing the inputs of the findings to a
+    directory. Returns non-zero if anything was found.
+
+    :param argv: The arguments, defaults to `sys.argv`
+    """
+    parser = argparse.ArgumentParser(
+        prog="fuzz", description="Fuzz the lexer and parser."
+    )
+    parser.add_argument(
+        "-n", "--iterations", type=int, help="inputs to check (default: 10000)"
+    )
+    parser.add_argument("--seconds", type=float, help="time budget")
+    parser.add_argument("--seed", type=int, default=0, help="fuzzing seed")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="parse time flagged as slow, in us/byte "
+        f"(default: {DEFAULT_THRESHOLD:g})",
+    )
+    parser.add_argument(
+        "-o", "--output", default="fuzz", help="directory of failing inputs"
+    )
+    args = parser.parse_args(argv)
+
+    iterations = args.iterations
+    if iterations is None and args.seconds is None:
+        iterations = 10_000
+
+    fuzzer = Fuzzer(args.seed, args.threshold)
+    seen = set()
+    start = time.monotonic()
+    for finding in fuzzer.run(iterations, args.seconds):
+        finding = fuzzer.shrink(finding)
+        # the same bug tends to be found over and over
+        if (finding.kind, finding.message) in seen:
+            continue
+        seen.add((finding.kind, finding.message))
+
+        os.makedirs(args.output, exist_ok=True)
+        path = os.path.join(args.output, f"{finding.kind}-{len(seen)}.ts")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(finding.source)
+
+        print(f"{path}: {finding.kind}: {finding.message}")
+
+    stats = fuzzer.stats
+    print(
+        f"{stats['inputs']} inputs ({stats['accepted']} accepted, "
+        f"{stats['rejected']} rejected, {stats['generated_rejected']} of "
+        f"{stats['generated']} generated), {len(seen)} findings in "
+        f"{time.monotonic() - start:.1f}s"
+    )
+    return 1 if seen else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(fuzz())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+parallel.py: Speedup of parallel lexing of a single large input per core.
+"""
+
+import argparse
+import os
+from typing import Dict, List, Optional
+
+from tsparxer.lexer import BACKENDS
+from tsparxer.lexer import Lexer as TSLexer
+from tsparxer.lexer import split_points
+
+from .corpus import generate
+from .timing import best
+
+
+def measure(
+    source: str,
+    jobs: List[int],
+    backend: str = "fast",
+    repeat: int = 3,
+) -> Dict[str, float]:
+    """
+    Returns the fastest times of finding the split points of the source and
+    of lexing it spread over each amount of processes, one being sequential
+    lexing, in seconds.
+
+    :param source: The input to lex
+    :param jobs: The amounts of processes to measure
+    :param backend: The lexer backend, one of `BACKENDS`
+    :param repeat: The amount of runs the fastest is taken from
+    """
+    lexer = TSLexer(backend=backend)
+    size = -(-len(source) // max(jobs))
+
+    times = {"split": best(lambda: split_points(source, size), repeat)}
+    for n in jobs:
+        times[f"jobs_{n}"] = best(
+            lambda: lexer.lex_parallel(source, n, -(-len(source) // n)),
+            repeat,
+        )
+
+    return times
+
+
+def parallel(argv: Optional[List[str]] = None) -> int:
+    """
+    Prints the time of lexing a generated input with 1 up to `--jobs`
+    processes, and its speedup over a single one.
+
+    :param argv: The arguments, defaults to `sys.argv`
+    """
+    parser = argparse.ArgumentParser(
+        prog="parallel", description="Measure parallel lexing speedup."
+    )
+    parser.add_argument(
+        "--size", type=int, default=16, help="input size in MiB (default: 16)"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, help="most processes (default: CPU count)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per metric")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument(
+        "--backend", choices=BACKENDS, default="fast", help="lexer backend"
+    )
+    args = parser.parse_args(argv)
+
+    source = generate(args.size << 20, args.seed)
+    jobs = list(range(1, (args.jobs or os.cpu_count() or 1) + 1))
+    times = measure(source, jobs, args.backend, args.repeat)
+
+    print(f"{os.cpu_count()} CPUs, {len(source) / 1e6:.1f} MB")
+    print(f"{'split':<8} {times.pop('split'):8.3f}s")
+    for name, seconds in times.items():
+        print(f"{name:<8} {seconds:8.3f}s {times['jobs_1'] / seconds:6.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(parallel())
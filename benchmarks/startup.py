@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+startup.py: Cold-start import time of the command line, with a budget.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+# the module every command line run imports
+ENTRY_POINT: str = "tsparxer.main"
+# modules only some commands need, which the entry point must leave to them
+LAZY = (
+    "tkinter",
+    "tkcode",
+    "tsparxer.gui",
+    "tsparxer.check",
+    "tsparxer.server",
+    "tsparxer.incremental",
+    "tsparxer.worker",
+)
+DEFAULT_BUDGET_MS: float = 150.0
+
+# imports resolve from the root of the repository
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(code: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def imports(module: str = ENTRY_POINT) -> Dict[str, int]:
+    """
+    Imports a module in a fresh interpreter under `-X importtime`, returns
+    the cumulative import time of every module it loaded, in microseconds.
+
+    :param module: The module to import
+    """
+    times = {}
+    stderr = _python(f"import {module}", "-X", "importtime").stderr
+    for line in stderr.splitlines():
+        # `import time: self [us] | cumulative | imported package`
+        if not line.startswith("import time:"):
+            continue
+
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def measure(module: str = ENTRY_POINT, repeat: int = 5) -> Dict[str, float]:
+    """
+    Returns the fastest import time of the module and the fastest wall time
+    of a fresh interpreter importing it, less that of a bare interpreter,
+    both in milliseconds.
+
+    :param module: The module to import
+    :param repeat: The amount of runs the fastest is taken from
+    """
+
+    def wall(code: str) -> float:
+        start = time.perf_counter()
+        _python(code)
+        return time.perf_counter() - start
+
+    import_us = min(imports(module)[module] for _ in range(repeat))
+    bare = min(wall("pass") for _ in range(repeat))
+    loaded = min(wall(f"import {module}") for _ in range(repeat))
+
+    return {
+        "import_ms": import_us / 1e3,
+        "startup_ms": max(loaded - bare, 0.0) * 1e3,
+    }
+
+
+def startup(argv: Optional[List[str]] = None) -> int:
+    """
+    Measures the cold start of the command line. Returns non-zero if it goes
+    over budget or imports a module meant to be loaded on demand.
+
+    :param argv: The arguments, defaults to `sys.argv`
+    """
+    parser = argparse.ArgumentParser(
+        prog="startup", description="Measure the command line cold start."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs per metric")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help=f"import time budget in ms (default: {DEFAULT_BUDGET_MS:g})",
+    )
+    args = parser.parse_args(argv)
+
+    metrics = measure(ENTRY_POINT, args.repeat)
+    for name, value in metrics.items():
+        print(f"{name:<12} {value:8.1f}")
+
+    status = 0
+    eager = [m for m in LAZY if m in imports(ENTRY_POINT)]
+    if eager:
+        print(f"{ENTRY_POINT} imports {', '.join(eager)}")
+        status = 1
+    if metrics["import_ms"] > args.budget:
+        print(
+            f"import_ms over budget: {metrics['import_ms']:.1f} > "
+            f"{args.budget:g}"
+        )
+        status = 1
+
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(startup())
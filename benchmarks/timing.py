@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+timing.py: Timing helpers shared by the benchmarks.
+"""
+
+import time
+from typing import Callable
+
+
+def best(func: Callable[[], object], repeat: int) -> float:
+    """
+    Returns the fastest of `repeat` calls of `func`, in seconds.
+
+    :param func: The function to time
+    :param repeat: The amount of calls
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
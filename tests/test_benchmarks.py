@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+test_benchmarks.py: Benchmark corpus and comparison testing.
+"""
+
+import unittest
+from unittest import mock
+
+from benchmarks import bench, corpus, fuzz, parallel, startup
+from tsparxer.lexer import Lexer as TSLexer
+from tsparxer.parser import Parser as TSParser
+
+
+class TestBenchmarks(unittest.TestCase):
+    """
+    Testing the generated corpora and the regression checks.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up the parser used to check the corpora.
+        """
+        self.parser = TSParser(TSLexer())
+
+    def test_corpus_parses(self) -> None:
+        for seed in range(20):
+            source = corpus.generate(2000, seed)
+
+            self.assertGreaterEqual(len(source), 2000)
+            self.assertTrue(self.parser.parse(source).body)
+
+    def test_corpus_deterministic(self) -> None:
+        self.assertEqual(corpus.generate(500, 3), corpus.generate(500, 3))
+        self.assertNotEqual(corpus.generate(500, 3), corpus.generate(500, 4))
+
+    def test_compare(self) -> None:
+        baseline = {"parses_per_s": 100.0, "parser_init_ms": 1.0}
+
+        # throughput regresses when it drops, latency when it grows
+        self.assertEqual(
+            [],
+            bench.compare(
+                baseline, {"parses_per_s": 95.0, "parser_init_ms": 0.5}, 0.1
+            ),
+        )
+        self.assertEqual(
+            ["parses_per_s", "parser_init_ms"],
+            [
+                r[0]
+                for r in bench.compare(
+                    baseline, {"parses_per_s": 80.0, "parser_init_ms": 1.2}, 0.1
+                )
+            ],
+        )
+
+    def test_compare_negative(self) -> None:
+        baseline = {"lex_bytes_saved_per_mb": -100.0}
+
+        # a saving turning into a larger cost is worse, not better
+        self.assertEqual(
+            [],
+            bench.compare(baseline, {"lex_bytes_saved_per_mb": 50.0}, 0.1),
+        )
+        self.assertEqual(
+            [("lex_bytes_saved_per_mb", -100.0, -200.0, -1.0)],
+            bench.compare(baseline, {"lex_bytes_saved_per_mb": -200.0}, 0.1),
+        )
+
+    def test_fuzz_grammar(self) -> None:
+        grammar = fuzz.Grammar(self.parser)
+        generator = fuzz.GrammarGenerator(grammar, 0)
+
+        self.assertEqual("program", grammar.start)
+        self.assertNotIn("error", grammar.terminals)
+        for _ in range(50):
+            source, types = generator.program()
+            self.assertEqual(
+                types, [t.type for t in self.parser.lexer.lex(source)]
+            )
+
+    def test_fuzz_checks(self) -> None:
+        fuzzer = fuzz.Fuzzer(0)
+
+        self.assertEqual([], list(fuzzer.run(200)))
+        self.assertEqual(200, fuzzer.stats["inputs"])
+        self.assertGreater(fuzzer.stats["accepted"], 0)
+        self.assertGreater(fuzzer.stats["rejected"], 0)
+
+        # inputs too slow to parse are flagged, and shrinking keeps a finding
+        fuzzer.threshold = 0.0
+        slow = fuzzer.check("let x = 1;\n" * 100)
+        self.assertEqual(["slow"], [f.kind for f in slow])
+        finding = fuzz.Finding("recover", "", "let x = 1;")
+        self.assertEqual(finding, fuzzer.shrink(finding))
+
+    def test_fuzz_crashes(self) -> None:
+        fuzzer = fuzz.Fuzzer(0)
+
+        # trees deeper than the recursion limit are still compared
+        deep = "var v=" + "+".join(["2"] * 1500) + ";"
+        self.assertEqual([], fuzzer.check(deep))
+
+        # only failures of the lexer or parser are crashes
+        with mock.patch.object(
+            fuzzer.strict, "parse", side_effect=RuntimeError("boom")
+        ):
+            self.assertEqual(
+                [("crash", "RuntimeError: boom")],
+                [f[:2] for f in fuzzer.check("let x = 1;")],
+            )
+        with mock.patch.object(fuzz, "_difference", side_effect=KeyError(1)):
+            self.assertEqual(
+                ["harness"], [f.kind for f in fuzzer.check("let x = 1;")]
+            )
+
+    def test_startup_imports(self) -> None:
+        imports = startup.imports(startup.ENTRY_POINT)
+
+        self.assertIn("tsparxer.lexer", imports)
+        self.assertIn("tsparxer.parser", imports)
+        for module in startup.LAZY:
+            self.assertNotIn(module, imports)
+
+    def test_parallel_measure(self) -> None:
+        source = corpus.generate(20000)
+        times = parallel.measure(source, [1, 2], repeat=1)
+
+        self.assertEqual(["split", "jobs_1", "jobs_2"], list(times))
+        self.assertTrue(all(t > 0 for t in times.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+test_check.py: Batch checking testing.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from tsparxer import check
+from tsparxer.cache import ResultCache
+
+
+class TestCheck(unittest.TestCase):
+    """
+    Testing the batch checking of files.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up a directory tree holding valid and invalid files.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        files = {
+            "a.ts": "let x = 5;",
+            "nested/b.ts": "let y: number = 10;\nlet z = ;\nlet = 1;",
+            "nested/c.ts": "interface Person { name: string; }",
+            "nested/d.ts": "let a = 1;\nlet # b = 2;\nlet = 3;",
+            "notes.txt": "not TypeScript",
+        }
+        for name, content in files.items():
+            path = os.path.join(self.tmp.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(content)
+
+    def path(self, name: str) -> str:
+        return os.path.normpath(os.path.join(self.tmp.name, name))
+
+    def test_check_collect(self) -> None:
+        self.assertEqual(
+            [
+                self.path("a.ts"),
+                self.path("nested/b.ts"),
+                self.path("nested/c.ts"),
+                self.path("nested/d.ts"),
+            ],
+            check.collect([self.tmp.name, self.path("a.ts")]),
+        )
+        self.assertEqual(
+            [
+                self.path("nested/b.ts"),
+                self.path("nested/c.ts"),
+                self.path("nested/d.ts"),
+            ],
+            check.collect([os.path.join(self.tmp.name, "nested", "*.ts")]),
+        )
+
+    def test_check_results(self) -> None:
+        paths = check.collect([self.tmp.name]) + [self.path("missing.ts")]
+
+        # same outcome in-process and through the worker pool
+        for jobs in (1, 2):
+            results = list(check.check(paths, jobs))
+
+            self.assertEqual(paths, [r.path for r in results])
+            self.assertEqual(
+                [True, False, True, False, False], [r.ok for r in results]
+            )
+            self.assertEqual((2, 9), (results[1].lineno, results[1].col))
+            self.assertEqual(5, results[0].tokens)
+
+    def test_check_max_errors(self) -> None:
+        result = check.check_file(self.path("nested/b.ts"), max_errors=10)
+
+        self.assertFalse(result.ok)
+        self.assertEqual(
+            [(2, 9), (3, 5)], [(n, c) for n, c, _ in result.errors]
+        )
+        self.assertEqual((2, 9), (result.lineno, result.col))
+        self.assertEqual(2, len(str(result).splitlines()))
+
+        # the first error aborts by default
+        self.assertEqual((), check.check_file(self.path("nested/b.ts")).errors)
+
+    def test_check_lexing_errors(self) -> None:
+        result = check.check_file(self.path("nested/d.ts"), max_errors=10)
+
+        self.assertEqual(
+            [(2, 5, "Illegal characters '#'"), (3, 5)],
+            [e if e[0] == 2 else e[:2] for e in result.errors],
+        )
+
+        result = check.check_file(self.path("nested/d.ts"))
+        self.assertEqual((2, 5), (result.lineno, result.col))
+
+    def test_check_mapped(self) -> None:
+        paths = check.collect([self.tmp.name])
+        expected = [check.check_file(p, 10) for p in paths]
+
+        # large files are lexed from a memory map, with the same outcome
+        size = check.MAPPED_SIZE
+        check.MAPPED_SIZE = 0
+        try:
+            self.assertEqual(expected, [check.check_file(p, 10) for p in paths])
+        finally:
+            check.MAPPED_SIZE = size
+
+    def test_check_cache(self) -> None:
+        paths = check.collect([self.tmp.name])
+        db = os.path.join(self.tmp.name, "cache", "results.sqlite")
+        expected = list(check.check(paths, 1, 5))
+
+        for hits in (0, len(paths)):
+            with ResultCache(db) as cache:
+                self.assertEqual(
+                    expected, list(check.check(paths, 1, 5, cache))
+                )
+                self.assertEqual(hits, cache.hits)
+
+        # changed files and other options miss
+        with open(self.path("a.ts"), "w") as file:
+            file.write("let = 5;")
+        with ResultCache(db) as cache:
+            results = list(check.check(paths, 1, 5, cache))
+            self.assertFalse(results[0].ok)
+            self.assertEqual(len(paths) - 1, cache.hits)
+
+            list(check.check(paths, 1, 1, cache))
+            self.assertEqual(1 + len(paths), cache.misses)
+
+    def test_check_version(self) -> None:
+        # every module a check imports versions its cached results
+        script = (
+            "import sys, tsparxer.check; "
+            "print(*(m for m in sys.modules if m.startswith('tsparxer.')))"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        self.assertEqual(
+            sorted(f"{m.split('.')[1]}.py" for m in output.split()),
+            sorted(check._MODULES),
+        )
+
+    def test_check_cache_eviction(self) -> None:
+        db = os.path.join(self.tmp.name, "results.sqlite")
+        with ResultCache(db, max_bytes=10) as cache:
+            for key in "abc":
+                cache.put(key, key * 4)
+            self.assertEqual("aaaa", cache.get("a"))
+
+        # the least recently used values above the bound are evicted
+        with ResultCache(db) as cache:
+            self.assertEqual(
+                ["aaaa", None, None], [cache.get(k) for k in "abc"]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
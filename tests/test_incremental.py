@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+test_incremental.py: Incremental document testing.
+"""
+
+import random
+import unittest
+
+from benchmarks import corpus
+from tsparxer.incremental import Document, diff
+from tsparxer.lexer import Lexer as TSLexer
+from tsparxer.nodes import walk
+
+# text inserted by the random edits, favouring the ones changing the lexer
+# state or the statement boundaries
+SNIPPETS = [
+    "a",
+    " ",
+    "\n",
+    ";",
+    "{",
+    "}",
+    '"',
+    "'",
+    "/*",
+    "*/",
+    "//",
+    "@",
+    "let x = 1;",
+    "if (a) {",
+    "} else {",
+    "const f = () => {\nreturn 1;\n}",
+]
+
+
+class TestIncremental(unittest.TestCase):
+    """
+    Testing the incremental re-lexing and re-parsing of documents.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up the test case by initializing the lexer.
+        """
+        self.lexer: TSLexer = TSLexer()
+
+    def assert_fresh(self, document: Document) -> None:
+        """
+        Assert an edited document equals one built from its text at once.
+
+        :param document: The edited document
+        """
+        source = document.source
+        fresh = Document(source)
+
+        self.assertEqual(
+            [
+                (t.type, t.value, t.lineno, t.lexpos)
+                for t in self.lexer.lex(source)
+            ],
+            [(t.type, t.value, t.lineno, t.lexpos) for t in document.tokens],
+        )
+        self.assertEqual(self.lexer.errors, document.errors)
+        self.assertEqual(self.lexer.line_starts, document.line_starts)
+        self.assertEqual(fresh.diagnostics(), document.diagnostics())
+        self.assertEqual(fresh.program, document.program)
+        self.assertEqual(
+            [n.pos for n in walk(fresh.program)],
+            [n.pos for n in walk(document.program)],
+        )
+
+    # -------------------------------------------------------------------------
+    # Tests
+    # -------------------------------------------------------------------------
+
+    def test_diff(self) -> None:
+        tests = [
+            ("", "abc", (0, 0, "abc")),
+            ("abc", "", (0, 3, "")),
+            ("let x = 1;", "let xy = 1;", (5, 0, "y")),
+            ("let x = 1;", "let = 1;", (4, 2, "")),
+            ("aaaa", "aaa", (3, 1, "")),
+            ("abcd", "axyd", (1, 2, "xy")),
+        ]
+
+        for old, new, expected in tests:
+            self.assertEqual(expected, diff(old, new))
+
+    def test_document_edits(self) -> None:
+        document = Document("let x = 5;\nlet y = 6;\n")
+        self.assertEqual([], document.diagnostics())
+
+        document.update("let x = 5;\nlet y = ;\nlet z = 7;\n")
+        self.assertEqual(
+            [(2, 9, "Syntax error at SEMICOLON ';'")], document.diagnostics()
+        )
+        self.assert_fresh(document)
+
+        document.update("let x = 5;\nlet y = 6;\nlet z = 7;\n")
+        self.assertEqual([], document.diagnostics())
+        self.assertEqual(3, len(document.program.body))
+        self.assert_fresh(document)
+
+    def test_document_unterminated(self) -> None:
+        # an edit after an unclosed string or comment may close it
+        document = Document("let x = 'a;\nlet y = 1;\n")
+        self.assertTrue(document.errors)
+
+        document.edit(10, 0, "'")
+        self.assertEqual([], document.diagnostics())
+        self.assert_fresh(document)
+
+        document.edit(0, 0, "/*\n")
+        document.edit(len(document.source), 0, "*/")
+        self.assertEqual([], document.tokens)
+        self.assert_fresh(document)
+
+    def test_document_random_edits(self) -> None:
+        for seed in range(8):
+            rnd = random.Random(seed)
+            document = Document(corpus.generate(rnd.randint(0, 600), seed))
+
+            for _ in range(25):
+                size = len(document.source)
+                offset = rnd.randint(0, size)
+                deleted = min(
+                    rnd.choice([0, 1, rnd.randint(0, 20)]), size - offset
+                )
+                document.edit(offset, deleted, rnd.choice(SNIPPETS + [""]))
+                self.assert_fresh(document)
+
+
+if __name__ == "__main__":
+    unittest.main()
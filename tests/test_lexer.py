@@ -6,11 +6,21 @@
 test_lexer.py: Lexer testing.
 """
 
+import glob
+import io
+import os
+import random
+import tempfile
 import unittest
 from ply.lex import LexToken
 from typing import List, Tuple, TypedDict, Any
 
+from tsparxer.lexer import BACKENDS
 from tsparxer.lexer import Lexer as TSLexer
+from tsparxer.lexer import Diagnostic, LexerError, safe_boundaries
+from tsparxer.lexer import split_points
+from tsparxer.parser import Parser as TSParser
+from tsparxer.tokens import FORMATS, TokenBuffer, read_tokens
 from tsparxer.util import read_file
 
 
@@ -502,6 +512,468 @@ class TestLexer(unittest.TestCase):
             ),
         )
 
+    # -------------------------------------------------------------------------
+    # Streaming
+    # -------------------------------------------------------------------------
+
+    def test_lex_iter_file_tokens(self) -> None:
+        data = (
+            read_file("data/alg04.ts")
+            + "let s = 'multi\nline // not a comment';\n"
+            + "/* block\n 'quote */ let x = 1;\n\n"
+            + 'let t = "unterminated;\n'
+            + "let @u = 1;\n"
+        )
+        expected = [
+            (t.type, t.value, t.lineno, t.col, t.lexpos)
+            for t in self.lexer.iter_tokens(data, columns=True)
+        ]
+        errors = self.lexer.errors
+
+        for chunk_size in (1, 7, 64, len(data)):
+            tokens = [
+                (t.type, t.value, t.lineno, t.col, t.lexpos)
+                for t in self.lexer.iter_file_tokens(
+                    io.StringIO(data), chunk_size, columns=True
+                )
+            ]
+            self.assertEqual(expected, tokens, f"chunk size {chunk_size}")
+            self.assertEqual(errors, self.lexer.errors)
+
+    def test_lex_iter_mapped_tokens(self) -> None:
+        data = (
+            read_file("data/alg04.ts")
+            + "let s = 'ünï\r\ncode';\r\n// é\rlet x = 1;\n"
+            + "/* ✓ */ let @é = 2;\n"
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "mapped.ts")
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                file.write(data)
+
+            # the same as lexing the text read, newlines translated
+            for lexer in (self.lexer, TSLexer(backend="fast")):
+                expected = [
+                    (t.type, t.value, t.lineno, t.col, t.lexpos)
+                    for t in lexer.iter_tokens(read_file(path), columns=True)
+                ]
+                errors = lexer.errors
+
+                for chunk_size in (1, 64, len(data)):
+                    tokens = [
+                        (t.type, t.value, t.lineno, t.col, t.lexpos)
+                        for t in lexer.iter_mapped_tokens(
+                            path, chunk_size, columns=True
+                        )
+                    ]
+                    self.assertEqual(expected, tokens, f"chunk {chunk_size}")
+                    self.assertEqual(errors, lexer.errors)
+
+                    # positions count from the start of the file
+                    last = expected[-1][4]
+                    self.assertEqual(expected[-1][2:4], lexer.position(last))
+
+            # a single line is split between tokens, not held whole
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("let a = f(1, 'é c');" * 50)
+            expected = [
+                (t.type, t.value, t.col, t.lexpos)
+                for t in self.lexer.iter_tokens(read_file(path), columns=True)
+            ]
+            tokens = [
+                (t.type, t.value, t.col, t.lexpos)
+                for t in self.lexer.iter_mapped_tokens(path, 16, True, 64)
+            ]
+            self.assertEqual(expected, tokens)
+
+            open(path, "w").close()
+            self.assertEqual([], list(self.lexer.iter_mapped_tokens(path)))
+            self.assertEqual([], self.lexer.errors)
+
+    def test_lex_chunk_open_tokens(self) -> None:
+        data = "let a = 1;\n'open /* open\n" + "let b = 2;\n" * 100
+
+        for lexer in (self.lexer, TSLexer(backend="fast")):
+            expected = [(t.type, t.lineno, t.lexpos) for t in lexer.lex(data)]
+            errors = lexer.errors
+
+            # unterminated, the rest of the file isn't held waiting for them
+            file = io.StringIO(data)
+            tokens = (
+                (t.type, t.lineno, t.lexpos)
+                for t in lexer.iter_file_tokens(file, 16, max_token=64)
+            )
+            self.assertEqual(expected[:12], [next(tokens) for _ in range(12)])
+            self.assertLess(file.tell(), 200)
+            self.assertEqual(expected[12:], list(tokens))
+            self.assertEqual(errors, lexer.errors)
+
+            # longer strings are taken as unterminated
+            tokens = lexer.iter_file_tokens(
+                io.StringIO("'" + "x\n" * 50 + "';\n"), 16, max_token=64
+            )
+            self.assertEqual("ID", next(tokens).type)
+            self.assertEqual("'", lexer.errors[0].text)
+
+    def test_lex_chunk_long_lines(self) -> None:
+        data = "let a = f(1, 'b c');/* d */" * 50 + "// " + "e" * 300 + "\nx"
+
+        for lexer in (self.lexer, TSLexer(backend="fast")):
+            expected = [
+                (t.type, t.value, t.lineno, t.col, t.lexpos)
+                for t in lexer.iter_tokens(data, columns=True)
+            ]
+
+            # the line is split between tokens rather than held whole
+            file = io.StringIO(data)
+            tokens = (
+                (t.type, t.value, t.lineno, t.col, t.lexpos)
+                for t in lexer.iter_file_tokens(file, 16, True, max_token=64)
+            )
+            self.assertEqual(expected[:10], [next(tokens) for _ in range(10)])
+            self.assertLess(file.tell(), 200)
+            self.assertEqual(expected[10:], list(tokens))
+            self.assertEqual([], lexer.errors)
+
+    def test_lex_safe_boundaries(self) -> None:
+        data = "a\n'b\nc'\n/* d\n */ e // f\ng /\n\"h\n"
+
+        self.assertEqual([2, 8, 24, 28], list(safe_boundaries(data)))
+        self.assertEqual([2, 8, 24, 28, 31], list(safe_boundaries(data, True)))
+
+    def test_lex_split_points(self) -> None:
+        data = "a\n'b\nc'\n/* d\n */ e // f\ng /\n\"h\n"
+
+        # the first safe boundaries at least `size` past the previous point
+        self.assertEqual([2, 8, 24, 28], split_points(data, 1))
+        self.assertEqual([8, 24, 28], split_points(data, 3))
+        self.assertEqual([24], split_points(data, 20))
+        self.assertEqual([], split_points(data, len(data)))
+        # unclosed, a comment's opening characters are lexed on their own
+        self.assertEqual([5], split_points("/* a\nb\n", 1))
+
+    def test_lex_buffer(self) -> None:
+        data = read_file("data/alg04.ts") + "let s = 'multi\nline';\n"
+        buffer = self.lexer.lex_buffer(data)
+
+        self.assertEqual(
+            [
+                (t.type, t.value, t.lineno, t.lexpos)
+                for t in self.lexer.lex(data)
+            ],
+            [(t.type, t.value, t.lineno, t.lexpos) for t in buffer],
+        )
+        self.assertEqual("'multi\nline'", buffer.text(len(buffer) - 2))
+        self.assertEqual("SEMICOLON", buffer.type(len(buffer) - 1))
+
+        # one byte for the kind plus three 4-byte columns per token
+        self.assertEqual(13 * len(buffer), buffer.nbytes)
+
+    def test_lex_parallel(self) -> None:
+        data = (
+            read_file("data/alg04.ts")
+            + "let s = 'multi\nline';\n/* a\n b */ let @ = 1;\n"
+            + "'open\nlet x = 2; /* open\nlet y = 3;\n"
+        )
+
+        for backend in BACKENDS:
+            lexer, pool = TSLexer(backend=backend), TSLexer(backend=backend)
+            expected = lexer.lex_buffer(data)
+
+            # the pieces are stitched back with positions in the whole input
+            for chunk_size in (64, 200, len(data)):
+                buffer = pool.lex_parallel(data, 2, chunk_size)
+                self.assertEqual(
+                    [(t.type, t.value, t.lineno, t.lexpos) for t in expected],
+                    [(t.type, t.value, t.lineno, t.lexpos) for t in buffer],
+                )
+                self.assertEqual(list(expected.ends), list(buffer.ends))
+                self.assertEqual(lexer.errors, pool.errors)
+                self.assertEqual(lexer.line_starts, pool.line_starts)
+                self.assertEqual(lexer.position(20), pool.position(20))
+
+        limited: TSLexer = TSLexer(max_errors=2)
+        with self.assertRaises(LexerError) as context:
+            limited.lex_parallel("a @ b\nc # d\ne $ f\n", 2, 4)
+
+        self.assertEqual(
+            (2, 3), (context.exception.lineno, context.exception.col)
+        )
+        self.assertEqual(2, len(limited.errors))
+
+    def test_lex_dump(self) -> None:
+        # numbers and strings of digits stay apart, offsets count characters
+        data = read_file("data/alg04.ts") + "let s = '123\né';\nlet n = 0123;"
+        expected = [
+            (t.type, t.value, t.lineno, t.lexpos) for t in self.lexer.lex(data)
+        ]
+
+        for format in FORMATS:
+            file = io.BytesIO()
+            self.assertEqual(len(expected), self.lexer.dump(data, file, format))
+
+            file.seek(0)
+            self.assertEqual(
+                expected,
+                [
+                    (t.type, t.value, t.lineno, t.lexpos)
+                    for t in read_tokens(file)
+                ],
+            )
+
+        # the binary dump holds everything, it's parsed without lexing again
+        buffer = TokenBuffer.load(io.BytesIO(file.getvalue()))
+        self.assertEqual(
+            list(self.lexer.lex_buffer(data).ends), list(buffer.ends)
+        )
+        self.assertEqual(data, buffer.source)
+
+        copy = io.BytesIO()
+        buffer.dump(copy)
+        self.assertEqual(file.getvalue(), copy.getvalue())
+
+        self.lexer.input(buffer.source, len(buffer.source))
+        parsers = [TSParser(TSLexer(), recover=True) for _ in range(2)]
+        self.assertEqual(
+            parsers[0].parse(data), parsers[1].parse_tokens(buffer, self.lexer)
+        )
+        self.assertEqual(
+            [(e.lineno, e.col) for e in parsers[0].errors],
+            [(e.lineno, e.col) for e in parsers[1].errors],
+        )
+        self.assertTrue(parsers[1].errors)
+
+        with self.assertRaises(ValueError):
+            list(read_tokens(io.BytesIO(file.getvalue()[:-5])))
+        with self.assertRaises(ValueError):
+            self.lexer.dump(data, io.BytesIO(), "xml")
+        self.assertEqual([], list(read_tokens(io.BytesIO())))
+
+    # -------------------------------------------------------------------------
+    # Positions
+    # -------------------------------------------------------------------------
+
+    def test_lex_positions(self) -> None:
+        data = "let a = 1;\n/* two\nlines */ let s = 'x\ny';  b\n\n  c"
+        tokens = list(self.lexer.iter_tokens(data, columns=True))
+
+        # newlines inside comments and strings are counted as well
+        self.assertEqual(
+            [
+                ("LET", 1, 1),
+                ("ID", 1, 5),
+                ("EQUALS", 1, 7),
+                ("NUMBER", 1, 9),
+                ("SEMICOLON", 1, 10),
+                ("LET", 3, 10),
+                ("ID", 3, 14),
+                ("EQUALS", 3, 16),
+                ("STRINGCONTENT", 3, 18),
+                ("SEMICOLON", 4, 3),
+                ("ID", 4, 6),
+                ("ID", 6, 3),
+            ],
+            [(t.type, t.lineno, t.col) for t in tokens],
+        )
+        self.assertEqual([0, 11, 18, 38, 45, 46], list(self.lexer.line_starts))
+        for t in tokens:
+            self.assertEqual((t.lineno, t.col), self.lexer.position(t.lexpos))
+
+        # end of input, as reported for unexpected EOF
+        self.assertEqual((6, 4), self.lexer.position(len(data)))
+
+    # -------------------------------------------------------------------------
+    # Errors
+    # -------------------------------------------------------------------------
+
+    def test_lex_errors(self) -> None:
+        tokens = self.lexer.lex("let x = 5; @@@ #\nlet é€ y = 1;")
+
+        # runs of illegal characters are reported once, then skipped
+        self.assertEqual(
+            [
+                Diagnostic(11, 1, 12, "@@@"),
+                Diagnostic(15, 1, 16, "#"),
+                Diagnostic(21, 2, 5, "é€"),
+            ],
+            self.lexer.errors,
+        )
+        self.assertEqual("ID", tokens[-4].type)
+
+        # errors are reset by every input
+        self.lexer.lex("let x = 5;")
+        self.assertEqual([], self.lexer.errors)
+
+    def test_lex_errors_limit(self) -> None:
+        lexer: TSLexer = TSLexer(max_errors=2)
+
+        with self.assertRaises(LexerError) as context:
+            lexer.lex("a @ b #\n c $ d")
+
+        self.assertEqual(
+            (1, 7), (context.exception.lineno, context.exception.col)
+        )
+        self.assertEqual(2, len(lexer.errors))
+        self.assertEqual(2, lexer.clone().max_errors)
+
+    # -------------------------------------------------------------------------
+    # Backends
+    # -------------------------------------------------------------------------
+
+    def test_lex_fast_backend(self) -> None:
+        fast: TSLexer = TSLexer(backend="fast")
+        alphabet = list("aZ_09 \t\n\r\x0b\"'/*+-=<>!&|^%.,;:()[]{}@#é") + [
+            "let",
+            "LeT",
+            "===",
+            "//",
+            "/*",
+            "*/",
+        ]
+        sources = [read_file(f) for f in sorted(glob.glob("data/*.ts"))]
+        for seed in range(500):
+            rnd = random.Random(seed)
+            size = rnd.randint(0, 60)
+            sources.append("".join(rnd.choices(alphabet, k=size)))
+
+        def scan(lexer: TSLexer, source: str) -> Tuple[Any, ...]:
+            tokens = [
+                (t.type, t.value, t.lineno, t.lexpos, lexer.lexpos)
+                for t in lexer.iter_tokens(source)
+            ]
+            return tokens, lexer.errors, lexer.line_starts, lexer.lineno
+
+        # token for token the same as PLY, diagnostics and positions included
+        for source in sources:
+            self.assertEqual(scan(self.lexer, source), scan(fast, source))
+
+        source = sources[3]
+        self.assertEqual(
+            [(t.type, t.lexpos) for t in self.lexer.lex(source)],
+            [
+                (t.type, t.lexpos)
+                for t in fast.iter_file_tokens(io.StringIO(source), 64)
+            ],
+        )
+        self.assertEqual(
+            list(self.lexer.lex_buffer(source).ends),
+            list(fast.lex_buffer(source).ends),
+        )
+        self.assertEqual("fast", fast.clone().backend)
+
+        with self.assertRaises(LexerError) as context:
+            TSLexer(max_errors=2, backend="fast").lex("a @ b #\n c $ d")
+        self.assertEqual(
+            (1, 7), (context.exception.lineno, context.exception.col)
+        )
+
+        with self.assertRaises(ValueError):
+            TSLexer(backend="unknown")
+
+    def test_lex_profile(self) -> None:
+        source = "let x = 1; // one\nif (x @ 2) {}\n"
+        lexers = [TSLexer(profile=True), TSLexer(backend="fast", profile=True)]
+
+        # each match counted under its rule, skipped ones included
+        for lexer in lexers:
+            self.assertEqual(
+                [str(t) for t in self.lexer.lex(source)],
+                [str(t) for t in lexer.lex(source)],
+            )
+            self.assertEqual(
+                {
+                    "t_ID": 4,
+                    "t_EQUALS": 1,
+                    "t_NUMBER": 2,
+                    "t_SEMICOLON": 1,
+                    "t_COMMENT": 1,
+                    "t_newline": 2,
+                    "t_OPENPAREN": 1,
+                    "t_CLOSEPAREN": 1,
+                    "t_OPENBRACE": 1,
+                    "t_CLOSEBRACE": 1,
+                    "t_error": 1,
+                },
+                lexer.stats.rules,
+            )
+            self.assertIsNotNone(lexer.clone().stats)
+
+        # both backends agree on every rule
+        for path in sorted(glob.glob("data/*.ts")):
+            source = read_file(path)
+            for lexer in lexers:
+                lexer.lex(source)
+        self.assertEqual(lexers[0].stats.rules, lexers[1].stats.rules)
+        self.assertIsNone(self.lexer.stats)
+
+    def test_lex_identifiers(self) -> None:
+        source = "let count = 1;\nLET Count = count + count;\nlet x = LeT;"
+
+        for lexer in (TSLexer(), TSLexer(backend="fast")):
+            tokens = lexer.lex(source)
+            words = [t for t in tokens if t.type in ("ID", "LET")]
+
+            # keywords match in any case, repeated words share one string
+            self.assertEqual(
+                ["LET", "ID", "LET", "ID", "ID", "ID", "LET", "ID", "LET"],
+                [t.type for t in words],
+            )
+            self.assertIs(words[1].value, words[4].value)
+            self.assertIs(words[4].value, words[5].value)
+            self.assertIsNot(words[1].value, words[3].value)
+
+            # ids are handed out on first sight and carried by the tokens
+            identifiers = lexer.identifiers
+            self.assertEqual(
+                ["let", "count", "LET", "Count"], identifiers.names[:4]
+            )
+            self.assertEqual(("count", 1), identifiers.intern("count"))
+            self.assertEqual([0, 1, 2, 3, 1, 1], [t.symbol for t in words[:6]])
+            self.assertEqual(0, len(lexer.clone().identifiers))
+
+            # every input starts a new table, but chunks of one file share it
+            lexer.lex("let y = count;")
+            self.assertEqual(["let", "y", "count"], identifiers.names)
+            chunked = lexer.iter_file_tokens(io.StringIO(source), 8)
+            self.assertEqual(
+                [t.symbol for t in words],
+                [t.symbol for t in chunked if t.type in ("ID", "LET")],
+            )
+
+    # -------------------------------------------------------------------------
+    # Construction
+    # -------------------------------------------------------------------------
+
+    def test_lex_clone(self) -> None:
+        clone: TSLexer = self.lexer.clone()
+
+        # clones share the compiled rules but not the scanning state
+        self.assertIs(TSLexer.spec(), TSLexer.spec())
+        self.assertIsNot(clone.lexer, self.lexer.lexer)
+
+        self.lexer.input("let a = 1;")
+        self.assertEqual("LET", self.lexer.token().type)
+        self.assertEqual("ID", clone.lex("foo")[0].type)
+        self.assertEqual("ID", self.lexer.token().type)
+
+    def test_lex_table_cache(self) -> None:
+        data = read_file("data/alg04.ts")
+        expected = [(t.type, t.value) for t in self.lexer.lex(data)]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # first build persists the table, the second one loads it
+            for _ in range(2):
+                TSLexer._specs.pop((TSLexer, cache_dir), None)
+                lexer: TSLexer = TSLexer(cache_dir)
+                tokens = [(t.type, t.value) for t in lexer.lex(data)]
+                self.assertEqual(expected, tokens)
+
+            self.assertEqual(
+                [f"lextab_{TSLexer.signature()}.py"],
+                [f for f in os.listdir(cache_dir) if f.endswith(".py")],
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
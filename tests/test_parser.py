@@ -6,12 +6,37 @@
 test_parser.py: Parser testing.
 """
 
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
 import unittest
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Tuple
+from unittest import mock
 
+from ply.lex import LexToken
+
+from benchmarks import corpus
 from tsparxer.lexer import Lexer as TSLexer
 from tsparxer.parser import Parser as TSParser
 from tsparxer.parser import ParserSyntaxError
+from tsparxer.nodes import (
+    ArrayLiteral,
+    ArrayType,
+    BinaryOp,
+    ConsoleLog,
+    Identifier,
+    If,
+    Invalid,
+    Literal,
+    Program,
+    Return,
+    TypeRef,
+    VarDecl,
+)
 
 
 class TestParser(unittest.TestCase):
@@ -259,6 +284,284 @@ class TestParser(unittest.TestCase):
 
         self.run_test(tests)
 
+    # -----------------------------------------------------------------------------
+    # Syntax Tree
+    # -----------------------------------------------------------------------------
+
+    def test_parser_ast(self) -> None:
+        program = self.parser.parse(
+            "let a: number[] = [1, 2];\n"
+            "if (x > 1 + 2 * y) { return a; } else { let b = true; }"
+        )
+
+        self.assertEqual(
+            Program(
+                [
+                    VarDecl(
+                        "let",
+                        "a",
+                        ArrayType(TypeRef("number")),
+                        ArrayLiteral(
+                            [Literal("number", 1), Literal("number", 2)]
+                        ),
+                    ),
+                    If(
+                        BinaryOp(
+                            ">",
+                            Identifier("x"),
+                            BinaryOp(
+                                "+",
+                                Literal("number", 1),
+                                BinaryOp(
+                                    "*", Literal("number", 2), Identifier("y")
+                                ),
+                            ),
+                        ),
+                        [Return(Identifier("a"))],
+                        [VarDecl("let", "b", None, Literal("boolean", True))],
+                    ),
+                ]
+            ),
+            program,
+        )
+
+        # spans point at the first token of each construct
+        declaration, statement = program.body
+        self.assertEqual((1, 1), declaration.pos)
+        self.assertEqual((1, 19), declaration.value.pos)
+        self.assertEqual((2, 1), statement.pos)
+        self.assertEqual((2, 5), statement.test.pos)
+        self.assertEqual((2, 41), statement.orelse[0].pos)
+
+    def test_parser_deep_tree(self) -> None:
+        source = "let v = " + "+".join(["2"] * 1500) + ";"
+        first, second = self.parser.parse(source), self.parser.parse(source)
+
+        # operator chains fold into trees deeper than the recursion limit
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, self.parser.parse(source[:-3] + "3;"))
+        self.assertTrue(repr(first).startswith("Program(body=[VarDecl("))
+        self.assertEqual(
+            "BinaryOp(op='+', left=Literal(kind='number', value=2), "
+            "right=Literal(kind='number', value=2))",
+            repr(self.parser.parse("let v = 2+2;").body[0].value),
+        )
+
+    def test_parser_long_lists(self) -> None:
+        count = 10000
+        data = (
+            "let a: number[] = ["
+            + ",".join(["1"] * count)
+            + "];\n"
+            + "let x = 1 + 2;\n" * count
+            + "function f("
+            + ",".join(f"p{i}: number" for i in range(count))
+            + ") { return 1; }"
+        )
+
+        # sample the LR stack depth each time a token is shifted
+        depths: List[int] = []
+        tokens = self.lexer.iter_tokens(data)
+
+        def sampled():
+            for t in tokens:
+                depths.append(len(self.parser.parser.statestack))
+                yield t
+
+        program = self.parser.parse_tokens(sampled())
+
+        self.assertEqual(count + 2, len(program.body))
+        self.assertEqual(count, len(program.body[0].value.elements))
+        self.assertEqual(count, len(program.body[-1].params))
+        self.assertLess(max(depths), 20)
+
+    def test_parser_token_buffer(self) -> None:
+        data = corpus.generate(5000)
+        expected = self.parser.parse(data)
+
+        buffer = self.lexer.lex_buffer(data)
+        self.assertEqual(expected, self.parser.parse_tokens(buffer))
+
+    # -----------------------------------------------------------------------------
+    # Error Recovery
+    # -----------------------------------------------------------------------------
+
+    def test_parser_recovery(self) -> None:
+        parser: TSParser = TSParser(self.lexer, recover=True)
+        program = parser.parse(
+            "let x = 5;\n"
+            "let y = ;\n"
+            "if (x < 3) {\n"
+            "  let = 4;\n"
+            "  let z: number = 'a';\n"
+            "}\n"
+            "console.log(x);\n"
+        )
+
+        # every error is reported, broken statements are skipped; types are
+        # left to `typecheck`
+        self.assertEqual(
+            [(2, 9), (4, 7)],
+            [(e.lineno, e.col) for e in parser.errors],
+        )
+        self.assertEqual(
+            [VarDecl, Invalid, If, ConsoleLog],
+            [type(s) for s in program.body],
+        )
+        self.assertEqual(
+            [Invalid, VarDecl], [type(s) for s in program.body[2].body]
+        )
+
+        # errors are reset by every parse
+        parser.parse("let x = 5;")
+        self.assertEqual([], parser.errors)
+
+    def test_parser_recovery_limits(self) -> None:
+        parser: TSParser = TSParser(self.lexer, recover=True, max_errors=2)
+
+        self.assertIsNone(parser.parse("let = 1;\nlet = 2;\nlet = 3;"))
+        self.assertEqual([1, 2], [e.lineno for e in parser.errors])
+
+        # the input ending inside a statement leaves no tree
+        self.assertIsNone(parser.parse("let x = 5;\nlet y ="))
+        self.assertEqual([(2, 8)], [(e.lineno, e.col) for e in parser.errors])
+
+        # without recovery the first error is raised
+        with self.assertRaises(ParserSyntaxError):
+            self.parser.parse("let = 1;\nlet x = 2;")
+
+    def test_parser_threads(self) -> None:
+        shared: TSParser = TSParser(self.lexer, recover=True)
+        sources = [corpus.generate(300, seed) for seed in range(8)]
+        sources += [s.replace(";", "", 2) for s in sources]
+        sources.append("let x = 5;\nlet y =")
+
+        def parse(source: str) -> Tuple[object, List[Tuple[int, int, str]]]:
+            program = shared.parse(source)
+            return program, [(e.lineno, e.col, str(e)) for e in shared.errors]
+
+        expected = [parse(source) for source in sources]
+        self.assertTrue(any(errors for _, errors in expected))
+
+        # switching threads as often as possible, so parses interleave
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+        with ThreadPoolExecutor(8) as executor:
+            jobs = sources * 25
+            results = list(executor.map(parse, jobs))
+
+        self.assertEqual(expected * 25, results)
+        # single-threaded calls still go through the parser's own lexer
+        shared.parse("let x = @;")
+        self.assertEqual(1, len(self.lexer.errors))
+
+    def test_parser_reentrant(self) -> None:
+        parser: TSParser = TSParser(self.lexer, recover=True)
+        source = "let = 1;\nlet x = 2;"
+        lexer: TSLexer = self.lexer.clone()
+        nested = []
+
+        def tokens() -> Iterator[LexToken]:
+            for t in lexer.iter_tokens(source):
+                # a parse started from within a running one
+                nested.append(parser.parse("\n\nlet y = ;"))
+                yield t
+
+        program = parser.parse_tokens(tokens(), lexer)
+
+        # neither call sees the other's errors or positions
+        self.assertEqual(2, len(program.body))
+        self.assertEqual([(1, 5)], [(e.lineno, e.col) for e in parser.errors])
+        self.assertEqual(9, len(nested))
+        self.assertEqual([Invalid()] * 9, [p.body[0] for p in nested])
+
+    def test_parser_profile(self) -> None:
+        lexer: TSLexer = TSLexer(profile=True)
+        parser: TSParser = TSParser(lexer, recover=True, profile=True)
+        source = corpus.generate(2000)
+
+        # the tree is the same, the stats are shared with the lexer
+        self.assertEqual(self.parser.parse(source), parser.parse(source))
+        parser.parse("let = 1;\nlet x = 2;")
+        stats = lexer.stats
+        self.assertIs(stats, parser.stats)
+        self.assertEqual(2, stats.parses)
+        self.assertEqual(len(self.lexer.lex(source)) + 9, stats.shifts)
+        self.assertEqual(1, stats.reductions["statement -> error SEMICOLON"])
+        self.assertEqual(
+            stats.parses, stats.reductions["program -> statements"]
+        )
+        self.assertLessEqual(sum(stats.times.values()), stats.parse_time)
+
+        output = io.StringIO()
+        stats.dump(output, "json")
+        data = json.loads(output.getvalue())
+        self.assertEqual(stats.reduces, data["reduces"])
+        self.assertEqual(stats.rules["t_ID"], data["rules"]["t_ID"])
+
+        # `frame;frame value` lines, one per reduced production
+        lines = stats.collapsed()
+        self.assertTrue(
+            any(
+                line.startswith("parse;reduce;program;program -> statements ")
+                for line in lines
+            )
+        )
+        self.assertEqual(
+            len([r for r in stats.reductions.values() if r]) + 2, len(lines)
+        )
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+
+        self.assertIsNone(self.parser.stats)
+        self.assertIsNotNone(TSParser(self.lexer, profile=True).stats)
+
+    def test_parser_run(self) -> None:
+        output = io.StringIO()
+        with mock.patch("builtins.input", return_value="let x: number = 'a';"):
+            with contextlib.redirect_stdout(output):
+                self.parser.run()
+
+        # the prompt reports the type errors of what it parsed
+        self.assertEqual(
+            "1:17: Type mismatch: cannot assign string to number\n",
+            output.getvalue(),
+        )
+
+        # every line is checked on its own, until the input ends
+        inputs = ["let y = 1; let z: string = y;", "", EOFError]
+        output = io.StringIO()
+        with mock.patch("builtins.input", side_effect=inputs):
+            with contextlib.redirect_stdout(output):
+                self.parser.run_loop("> ")
+
+        self.assertEqual(
+            "1:28: Type mismatch: cannot assign number to string\n",
+            output.getvalue(),
+        )
+
+    # -----------------------------------------------------------------------------
+    # Parse Tables
+    # -----------------------------------------------------------------------------
+
+    def test_parser_table_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for _ in range(2):
+                TSParser._tables.pop((TSParser, cache_dir), None)
+                parser: TSParser = TSParser(self.lexer, cache_dir)
+                parser.parse("let x = 5;")
+
+            # only the versioned tables are written, no `parser.out`
+            self.assertEqual(
+                [f"parsetab_{TSParser.signature()}.py"],
+                [
+                    f
+                    for f in os.listdir(cache_dir)
+                    if f.endswith((".py", ".out"))
+                ],
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+test_server.py: Language server testing.
+"""
+
+import io
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from tsparxer.server import (
+    INVALID_PARAMS,
+    METHOD_NOT_FOUND,
+    PARSE_ERROR,
+    Session,
+    read_message,
+    write_message,
+)
+
+
+class TestServer(unittest.TestCase):
+    """
+    Testing the JSON-RPC server sessions.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up the test case by starting a worker pool.
+        """
+        self.executor = ThreadPoolExecutor(4)
+        self.addCleanup(self.executor.shutdown)
+
+    def run_session(self, messages: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Runs a session reading the given messages, returns the ones written.
+
+        :param messages: The messages sent by the client
+        """
+        reader, writer = io.BytesIO(), io.BytesIO()
+        for message in messages:
+            write_message(reader, {"jsonrpc": "2.0", **message})
+        reader.seek(0)
+
+        Session(reader, writer, self.executor).run()
+
+        writer.seek(0)
+        return list(iter(lambda: read_message(writer), None))
+
+    # -------------------------------------------------------------------------
+    # Tests
+    # -------------------------------------------------------------------------
+
+    def test_server_framing(self) -> None:
+        stream = io.BytesIO()
+        write_message(stream, {"text": "é"})
+        stream.write(b"Content-Type: application/json\r\n")
+        write_message(stream, [1, 2])
+        stream.seek(0)
+
+        self.assertEqual({"text": "é"}, read_message(stream))
+        self.assertEqual([1, 2], read_message(stream))
+        self.assertIsNone(read_message(stream))
+
+    def test_server_bad_headers(self) -> None:
+        reader, writer = io.BytesIO(), io.BytesIO()
+        reader.write(b"Content-Length: abc\r\n\r\n")
+        reader.write(b"Content-Length: -5\r\n\r\n")
+        reader.write("Content-Typé: x\r\n\r\n".encode("utf-8"))
+        write_message(reader, {"id": 1, "method": "shutdown"})
+        reader.seek(0)
+
+        # each bad frame is answered, the session goes on
+        Session(reader, writer, self.executor).run()
+        writer.seek(0)
+        answers = list(iter(lambda: read_message(writer), None))
+
+        self.assertEqual(
+            [PARSE_ERROR] * 3, [a["error"]["code"] for a in answers[:3]]
+        )
+        self.assertEqual((1, None), (answers[3]["id"], answers[3]["result"]))
+
+    def test_server_requests(self) -> None:
+        answers = self.run_session(
+            [
+                {"id": 1, "method": "initialize", "params": {}},
+                {
+                    "id": 2,
+                    "method": "tsparxer/check",
+                    "params": {"text": "let x = ;\nlet = 1;", "maxErrors": 5},
+                },
+                {
+                    "id": 3,
+                    "method": "tsparxer/tokenize",
+                    "params": {"text": "let x = 1; @"},
+                },
+                {"id": 4, "method": "tsparxer/check", "params": {}},
+                {"id": 5, "method": "unknown"},
+                {"id": 6, "method": "shutdown"},
+                {"method": "exit"},
+                {"id": 7, "method": "shutdown"},
+            ]
+        )
+        # requests run concurrently, answers come in any order
+        by_id = {a["id"]: a for a in answers}
+
+        self.assertEqual([1, 2, 3, 4, 5, 6], sorted(by_id))
+        self.assertEqual(
+            2, by_id[1]["result"]["capabilities"]["textDocumentSync"]
+        )
+        self.assertEqual(
+            [(1, 9), (2, 5)],
+            [(e["line"], e["col"]) for e in by_id[2]["result"]["errors"]],
+        )
+        self.assertEqual(
+            [["LET", "let", 1, 0], ["ID", "x", 1, 4]],
+            by_id[3]["result"]["tokens"][:2],
+        )
+        self.assertEqual(
+            [{"line": 1, "col": 12, "message": "Illegal characters '@'"}],
+            by_id[3]["result"]["errors"],
+        )
+        self.assertEqual(INVALID_PARAMS, by_id[4]["error"]["code"])
+        self.assertEqual(METHOD_NOT_FOUND, by_id[5]["error"]["code"])
+        self.assertIsNone(by_id[6]["result"])
+
+    def test_server_documents(self) -> None:
+        uri = "file:///a.ts"
+        diagnostics = self.run_session(
+            [
+                {
+                    "method": "textDocument/didOpen",
+                    "params": {
+                        "textDocument": {"uri": uri, "text": "let x = 1;\n"}
+                    },
+                },
+                {
+                    "method": "textDocument/didChange",
+                    "params": {
+                        "textDocument": {"uri": uri},
+                        "contentChanges": [
+                            {
+                                "range": {
+                                    "start": {"line": 1, "character": 0},
+                                    "end": {"line": 1, "character": 0},
+                                },
+                                "text": "let = 2;",
+                            }
+                        ],
+                    },
+                },
+                {
+                    "method": "textDocument/didChange",
+                    "params": {
+                        "textDocument": {"uri": uri},
+                        "contentChanges": [{"text": "let y = 2;"}],
+                    },
+                },
+                {
+                    "method": "textDocument/didClose",
+                    "params": {"textDocument": {"uri": uri}},
+                },
+            ]
+        )
+
+        self.assertEqual(
+            ["textDocument/publishDiagnostics"] * 4,
+            [d["method"] for d in diagnostics],
+        )
+        self.assertEqual(
+            [[], [(1, 4)], [], []],
+            [
+                [
+                    (
+                        d["range"]["start"]["line"],
+                        d["range"]["start"]["character"],
+                    )
+                    for d in message["params"]["diagnostics"]
+                ]
+                for message in diagnostics
+            ],
+        )
+
+    def test_server_positions(self) -> None:
+        uri = "file:///a.ts"
+
+        def change(line: int, character: int) -> Dict[str, Any]:
+            position = {"line": line, "character": character}
+            return {
+                "method": "textDocument/didChange",
+                "params": {
+                    "textDocument": {"uri": uri},
+                    "contentChanges": [
+                        {
+                            "range": {"start": position, "end": position},
+                            "text": "@",
+                        }
+                    ],
+                },
+            }
+
+        diagnostics = self.run_session(
+            [
+                {
+                    "method": "textDocument/didOpen",
+                    "params": {
+                        "textDocument": {
+                            "uri": uri,
+                            "text": "let x = 1;\nlet y = 2;",
+                        }
+                    },
+                },
+                # past the end of the line, clamped to it
+                change(0, 99),
+                # negative positions are ignored
+                change(-1, 0),
+                change(1, -1),
+                change(5, 0),
+            ]
+        )
+
+        self.assertEqual(
+            [[], [(0, 10)], [(0, 10), (1, 10)]],
+            [
+                [
+                    (
+                        d["range"]["start"]["line"],
+                        d["range"]["start"]["character"],
+                    )
+                    for d in message["params"]["diagnostics"]
+                ]
+                for message in diagnostics
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
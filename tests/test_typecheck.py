@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+test_typecheck.py: Type checking testing.
+"""
+
+import unittest
+from typing import List, Tuple
+
+from tsparxer import check, typecheck
+from tsparxer.incremental import Document
+from tsparxer.lexer import Lexer as TSLexer
+from tsparxer.parser import Parser as TSParser
+
+
+class TestTypeCheck(unittest.TestCase):
+    """
+    Testing the name resolution and type checking of parsed programs.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up the test case by initializing the lexer and parser.
+        """
+        self.parser: TSParser = TSParser(TSLexer())
+
+    def run_test(self, tests: List[Tuple[str, List[str]]]) -> None:
+        """
+        Run a series of tests for the type checker.
+
+        :param tests: A list of tuples containing the test data and the
+         messages of the errors expected, in order
+        """
+        for data, expected in tests:
+            diagnostics = typecheck.check(self.parser.parse(data))
+            self.assertEqual(expected, [d.message for d in diagnostics], data)
+
+    # -------------------------------------------------------------------------
+    # Tests
+    # -------------------------------------------------------------------------
+
+    def test_typecheck_declarations(self) -> None:
+        tests = [
+            # valid
+            ("let x: number = 5;", []),
+            ("let x = 'a';\nlet y: string = x;", []),
+            ("var x = 1;\nvar x = 2;", []),
+            ("let a: number[] = [1, 2];", []),
+            ("let t: [string, number] = ['a', 1];", []),
+            # invalid
+            (
+                "let x: number = 'a';",
+                ["Type mismatch: cannot assign string to number"],
+            ),
+            (
+                "let x = true;\nlet y: number = x;",
+                ["Type mismatch: cannot assign boolean to number"],
+            ),
+            ("let y: number = x;", ["Cannot find name 'x'"]),
+            ("let x = 1;\nlet x = 2;", ["Cannot redeclare 'x'"]),
+            (
+                "var a = 1;\nvar a = 'b';\nvar a: number = 2;",
+                ["'a' is declared as number, not string"],
+            ),
+            (
+                "let a: number[] = [1, 'b', true];",
+                [
+                    "Type mismatch: cannot assign string to number",
+                    "Type mismatch: cannot assign boolean to number",
+                ],
+            ),
+            (
+                "let t: [string, number] = [1, 'a'];",
+                [
+                    "Type mismatch: cannot assign number to string",
+                    "Type mismatch: cannot assign string to number",
+                ],
+            ),
+            (
+                "interface P { a: number; a: number; }",
+                ["Duplicate field 'a'"],
+            ),
+        ]
+
+        self.run_test(tests)
+
+    def test_typecheck_expressions(self) -> None:
+        tests = [
+            # valid
+            ("let x = 1;\nlet y = x + 2 * x;", []),
+            ("let s = 'a';\nlet t = s + 1;", []),
+            ("let x = 1;\nwhile (x < 3 && true) { console.log(x); }", []),
+            ("for (let i = 0; i < 3; i++) { console.log(i); }", []),
+            # invalid
+            (
+                "let b = true;\nlet x = b - 1;",
+                ["Operator '-' cannot be applied to boolean and number"],
+            ),
+            (
+                "let x = 1;\nif (x < y) { console.log(z); }",
+                ["Cannot find name 'y'", "Cannot find name 'z'"],
+            ),
+            (
+                "for (const i = 0; i < 3; i++) { console.log(i); }",
+                ["Cannot assign to 'i', a constant"],
+            ),
+            (
+                "for (let i = 0; i < 3; i++) { let j = 1; }\n"
+                "console.log(i);\nconsole.log(j);",
+                ["Cannot find name 'i'", "Cannot find name 'j'"],
+            ),
+        ]
+
+        self.run_test(tests)
+
+    def test_typecheck_functions(self) -> None:
+        tests = [
+            # valid, declarations are hoisted
+            (
+                "console.log(f(1));\n"
+                "function f(a: number): number { return a; }",
+                [],
+            ),
+            ("const f = (a: string) => { let b = a + 1; return b; }", []),
+            # invalid
+            (
+                "function f(a: number): string { return a; }",
+                [
+                    "Type mismatch: cannot return number from a function "
+                    "returning string"
+                ],
+            ),
+            (
+                "function f(a: number): number { return a; }\n"
+                "console.log(f('x'));",
+                ["Type mismatch: cannot assign string to number"],
+            ),
+            (
+                "let f = 1;\nconsole.log(f(2));",
+                ["'f' is a number, not a function"],
+            ),
+            (
+                "function f(a: number, a: number) { return a; }",
+                ["Cannot redeclare 'a'"],
+            ),
+        ]
+
+        self.run_test(tests)
+
+    def test_typecheck_function_bodies(self) -> None:
+        tests = [
+            # bodies run after the names around them are declared
+            (
+                "function f(a: number): number { console.log(x); return a; }"
+                "\nlet x = 1;",
+                [],
+            ),
+            (
+                "if (true) { function h(a: number): number "
+                "{ console.log(z); return a; }\nlet z = 1; }",
+                [],
+            ),
+            (
+                "function f(a: number): number { console.log(w); return a; }",
+                ["Cannot find name 'w'"],
+            ),
+        ]
+
+        self.run_test(tests)
+
+    def test_typecheck_recovery(self) -> None:
+        parser = TSParser(TSLexer(), recover=True)
+
+        # the skipped statement may have declared `a` and `x`, so their uses
+        # aren't reported; other type errors still are
+        source = (
+            "let a = ;\nlet b: number = a;\nlet c = a - 1;\n"
+            "let x = 1 + ;\nlet y: string = x;\nlet z: string = 1;"
+        )
+        self.assertEqual(
+            ["Type mismatch: cannot assign number to string"],
+            [d.message for d in typecheck.check(parser.parse(source))],
+        )
+
+    def test_typecheck_deep(self) -> None:
+        # folded operator chains are deeper than the recursion limit
+        chain = " + ".join(["x"] * 5000)
+        source = f"let x = 1;\nlet y = {chain};\nlet z: string = y;"
+        diagnostics = typecheck.check(self.parser.parse(source))
+
+        self.assertEqual(
+            ["Type mismatch: cannot assign number to string"],
+            [d.message for d in diagnostics],
+        )
+
+    def test_typecheck_reported(self) -> None:
+        source = "let x: number = 'a';\nlet y = z;\n"
+
+        # every error is found in one walk, after parsing succeeded
+        self.assertEqual(
+            [
+                (1, 17, "Type mismatch: cannot assign string to number"),
+                (2, 9, "Cannot find name 'z'"),
+            ],
+            list(check.check_source(source, max_errors=10).errors),
+        )
+        self.assertEqual((1, 17), check.check_source(source, max_errors=1)[4:6])
+        self.assertEqual(
+            (2, 9, "Cannot find name 'z'"), Document(source).diagnostics()[1]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+test_worker.py: Background worker testing.
+"""
+
+import threading
+import unittest
+from typing import List
+
+from tsparxer.worker import Worker
+
+
+class TestWorker(unittest.TestCase):
+    """
+    Testing the background worker.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up the test case with a worker recording its jobs, each waiting for
+        `release` to be set once started.
+        """
+        self.calls: List[int] = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+        def job(n: int) -> int:
+            self.calls.append(n)
+            self.started.set()
+            self.release.wait(5)
+            if n < 0:
+                raise ValueError(n)
+            return n * 2
+
+        self.worker = Worker(job)
+
+    def tearDown(self) -> None:
+        self.release.set()
+        self.worker.close()
+
+    # -------------------------------------------------------------------------
+    # Tests
+    # -------------------------------------------------------------------------
+
+    def test_worker_newest(self) -> None:
+        self.worker.submit(1)
+        self.started.wait(5)
+        # queued while the first job runs, only the newest is run
+        for n in range(2, 6):
+            self.worker.submit(n)
+        self.assertIsNone(self.worker.poll())
+
+        self.release.set()
+        self.assertEqual(10, self.worker.poll(5))
+        self.assertEqual([1, 5], self.calls)
+
+    def test_worker_cancel(self) -> None:
+        self.worker.submit(1)
+        self.worker.cancel()
+        self.release.set()
+
+        # the result of a cancelled job is dropped
+        self.assertIsNone(self.worker.poll(0.2))
+        self.worker.submit(3)
+        self.assertEqual(6, self.worker.poll(5))
+
+    def test_worker_error(self) -> None:
+        self.release.set()
+        self.worker.submit(-1)
+
+        with self.assertRaises(ValueError):
+            self.worker.poll(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
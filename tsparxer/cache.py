@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+cache.py: Persistent, size-bounded cache of check results.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Optional
+
+from .util import default_cache_dir
+
+# the results of a typical file take a few hundred bytes
+DEFAULT_MAX_BYTES: int = 64 * 1024 * 1024
+# writes per transaction
+WRITE_BATCH: int = 256
+
+
+class ResultCache:
+    """
+    Stores JSON-serializable values by key in an SQLite database, shared by
+    every process checking files. Once the values take more than `max_bytes`,
+    the least recently used ones are evicted when the cache is closed.
+
+    The cache never fails a check: if the database can't be opened or written,
+    every lookup simply misses.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        """
+        :param path: The database file, `results.sqlite` in the cache
+         directory by default
+        :param max_bytes: The size the stored values are trimmed to
+        """
+        self.path = path or os.path.join(default_cache_dir(), "results.sqlite")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+        self.db: Optional[sqlite3.Connection] = None
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.db = sqlite3.connect(self.path, timeout=10)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " used REAL NOT NULL)"
+            )
+            self.db.commit()
+        except (OSError, sqlite3.Error):
+            self.db = None
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the value stored under `key`, or `None`.
+
+        :param key: The key of the value
+        """
+        row = self._execute("SELECT value FROM results WHERE key = ?", key)
+        row = row.fetchone() if row is not None else None
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._write(
+            "UPDATE results SET used = ? WHERE key = ?", time.time(), key
+        )
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Stores a value under `key`, replacing any previous one.
+
+        :param key: The key of the value
+        :param value: The JSON-serializable value
+        """
+        text = json.dumps(value, separators=(",", ":"))
+        self._write(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            key,
+            text,
+            len(text),
+            time.time(),
+        )
+
+    def close(self) -> None:
+        """
+        Evicts the least recently used values above the size bound, then
+        writes everything to disk.
+        """
+        if self.db is None:
+            return
+
+        self._execute(
+            "DELETE FROM results WHERE key IN ("
+            " SELECT key FROM ("
+            "  SELECT key, SUM(size) OVER (ORDER BY used DESC, key) AS total"
+            "  FROM results"
+            " ) WHERE total > ?"
+            ")",
+            self.max_bytes,
+        )
+        try:
+            self.db.commit()
+            self.db.close()
+        except sqlite3.Error:
+            pass
+
+        self.db = None
+
+    def _write(self, sql: str, *params: Any) -> None:
+        # committed in batches, other processes can't write while a
+        # transaction is open and every commit syncs the disk
+        if self.db is None:
+            return
+
+        self._execute(sql, *params)
+        self._writes += 1
+        if self._writes % WRITE_BATCH == 0:
+            try:
+                self.db.commit()
+            except sqlite3.Error:
+                pass
+
+    def _execute(self, sql: str, *params: Any) -> Optional[sqlite3.Cursor]:
+        if self.db is None:
+            return None
+
+        try:
+            return self.db.execute(sql, params)
+        except sqlite3.Error:
+            return None
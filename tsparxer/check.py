@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+check.py: Batch lexing + parsing of many files using a process pool.
+"""
+
+import glob
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from ply.lex import LexToken
+
+from . import typecheck
+from .cache import ResultCache
+from .lexer import Lexer as TSLexer
+from .lexer import LexerError
+from .parser import Parser as TSParser
+from .parser import ParserSyntaxError
+from .util import digest, map_file, read_file
+
+
+class CheckResult(NamedTuple):
+    """
+    Outcome of checking a single file, `lineno`/`col` locate the (first)
+    error. `errors` holds every `(lineno, col, message)` found when recovering.
+    """
+
+    path: str
+    ok: bool
+    tokens: int
+    message: str = ""
+    lineno: int = 0
+    col: int = 0
+    errors: Tuple[Tuple[int, int, str], ...] = ()
+
+    def __str__(self) -> str:
+        if self.ok:
+            return f"{self.path}: ok ({self.tokens} tokens)"
+
+        errors = self.errors or ((self.lineno, self.col, self.message),)
+        return "\n".join(f"{self.path}:{n}:{c}: {m}" for n, c, m in errors)
+
+
+# files from this size on are lexed from a memory map, so their text is never
+# held whole
+MAPPED_SIZE: int = 8 * 1024 * 1024
+
+# warm lexer/parser pair of the current (worker) process or thread
+_worker = threading.local()
+
+
+def _init_worker() -> None:
+    lexer: TSLexer = TSLexer()
+    _worker.pair = (lexer, TSParser(lexer))
+
+
+def warm() -> Tuple[TSLexer, TSParser]:
+    """
+    Returns the lexer/parser pair of the current thread, built on first use.
+    """
+    if not hasattr(_worker, "pair"):
+        _init_worker()
+
+    return _worker.pair
+
+
+def collect(patterns: Iterable[str]) -> List[str]:
+    """
+    Expands paths, directories (searched recursively for `.ts` files) and glob
+    patterns into a sorted list of files, without duplicates.
+
+    :param patterns: The paths, directories or globs to expand
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*.ts")
+
+        if any(c in pattern for c in "*?["):
+            files.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            files.append(pattern)
+
+    return list(dict.fromkeys(os.path.normpath(f) for f in files))
+
+
+def check_file(path: str, max_errors: int = 1) -> CheckResult:
+    """
+    Lexes and parses a single file with the thread's warm lexer/parser. Files
+    of `MAPPED_SIZE` or more are lexed from a memory map, a chunk at a time,
+    rather than read whole; there a string or block comment longer than
+    `lexer.MAX_TOKEN` is lexed as unterminated, see `iter_mapped_tokens`.
+
+    :param path: The path of the file to check
+    :param max_errors: The amount of lexing and syntax errors to report, more
+     than one makes the parser recover from them
+    """
+    try:
+        if os.path.getsize(path) >= MAPPED_SIZE:
+            lexer = warm()[0]
+            tokens = lexer.iter_mapped_tokens(path)
+            # decoding errors only surface while the file is lexed
+            return _check_tokens(tokens, path, max_errors)
+
+        source = read_file(path)
+    except (OSError, UnicodeDecodeError) as e:
+        return CheckResult(path, False, 0, str(e))
+
+    return check_source(source, path, max_errors)
+
+
+def check_source(
+    source: str, path: str = "<input>", max_errors: int = 1
+) -> CheckResult:
+    """
+    Lexes, parses and type checks a source text with the thread's warm
+    lexer/parser.
+
+    :param source: The text to check
+    :param path: The name the result is reported under
+    :param max_errors: The amount of lexing and syntax errors to report, more
+     than one makes the parser recover from them
+    """
+    lexer = warm()[0]
+    return _check_tokens(lexer.iter_tokens(source), path, max_errors)
+
+
+def _check_tokens(
+    tokens: Iterator[LexToken], path: str, max_errors: int
+) -> CheckResult:
+    # the tokens come from the thread's lexer, which is only configured here
+    # as they are produced lazily
+    lexer, parser = warm()
+    lexer.max_errors = max_errors
+    parser.recover, parser.max_errors = max_errors > 1, max_errors
+    count = [0]
+
+    def counted(tokens: Iterator[LexToken]) -> Iterator[LexToken]:
+        for t in tokens:
+            count[0] += 1
+            yield t
+
+    try:
+        program = parser.parse_tokens(counted(tokens))
+    except (ParserSyntaxError, LexerError) as e:
+        return CheckResult(path, False, count[0], str(e), e.lineno, e.col)
+
+    errors = sorted(
+        [(d.lineno, d.col, d.message) for d in lexer.errors]
+        + [(e.lineno, e.col, str(e)) for e in parser.errors]
+    )
+    if program is not None:
+        types = typecheck.check(program)
+        errors = sorted(errors + [tuple(d) for d in types[:max_errors]])
+    if errors:
+        lineno, col, message = errors[0]
+        return CheckResult(
+            path, False, count[0], message, lineno, col, tuple(errors)
+        )
+
+    return CheckResult(path, True, count[0])
+
+
+# the modules a check runs, this one and all it imports, cached results are
+# only reused by the exact same code
+_MODULES = (
+    "cache.py",
+    "check.py",
+    "lexer.py",
+    "nodes.py",
+    "parser.py",
+    "stats.py",
+    "tokens.py",
+    "typecheck.py",
+    "util.py",
+)
+_version: Optional[str] = None
+
+
+def version() -> str:
+    """
+    Returns a digest of the lexer, grammar and checking code, which versions
+    cached results.
+    """
+    global _version
+
+    if _version is None:
+        sources = []
+        for name in _MODULES:
+            path = os.path.join(os.path.dirname(__file__), name)
+            sources.append(read_file(path))
+        _version = digest(TSLexer.signature(), TSParser.signature(), *sources)
+
+    return _version
+
+
+def cache_key(path: str, max_errors: int = 1) -> Optional[str]:
+    """
+    Returns the key of a file's results: a digest of its contents, the code
+    checking it and the options. `None` if the file can't be read.
+
+    :param path: The path of the file
+    :param max_errors: The amount of errors reported
+    """
+    try:
+        # hashed straight from the page cache
+        with map_file(path) as data:
+            content = hashlib.sha256(data).hexdigest()
+    except OSError:
+        return None
+
+    return digest(version(), str(max_errors), content)
+
+
+def check(
+    paths: List[str],
+    jobs: Optional[int] = None,
+    max_errors: int = 1,
+    cache: Optional[ResultCache] = None,
+) -> Iterator[CheckResult]:
+    """
+    Checks the given files, in order, spreading them over `jobs` processes.
+    Files with results in the cache aren't checked again.
+
+    :param paths: The files to check
+    :param jobs: The amount of worker processes, defaults to the CPU count
+    :param max_errors: The amount of syntax errors to report per file
+    :param cache: The cache to take results from and store them in
+    """
+    keys, cached = {}, {}
+    if cache is not None:
+        for path in paths:
+            keys[path] = key = cache_key(path, max_errors)
+            value = cache.get(key) if key is not None else None
+            if value is not None:
+                ok, tokens, message, lineno, col, errors = value
+                errors = tuple(tuple(e) for e in errors)
+                cached[path] = CheckResult(
+                    path, ok, tokens, message, lineno, col, errors
+                )
+
+    results = _check([p for p in paths if p not in cached], jobs, max_errors)
+    for path in paths:
+        if path in cached:
+            yield cached[path]
+            continue
+
+        result = next(results)
+        if keys.get(path) is not None:
+            cache.put(keys[path], list(result[1:]))
+        yield result
+
+
+def _check(
+    paths: List[str], jobs: Optional[int], max_errors: int
+) -> Iterator[CheckResult]:
+    func = partial(check_file, max_errors=max_errors)
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) <= 1:
+        yield from map(func, paths)
+        return
+
+    # hand out several files per task, keeps IPC overhead low
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(jobs, initializer=_init_worker) as executor:
+        yield from executor.map(func, paths, chunksize=chunksize)
+
+
+def run(
+    patterns: List[str],
+    jobs: Optional[int] = None,
+    max_errors: int = 1,
+    use_cache: bool = True,
+) -> int:
+    """
+    Checks every file matched by the patterns, reporting each outcome plus a
+    summary. Returns the exit status, non-zero if any file failed.
+
+    :param patterns: The paths, directories or globs to check
+    :param jobs: The amount of worker processes, defaults to the CPU count
+    :param max_errors: The amount of syntax errors to report per file
+    :param use_cache: Whether to reuse the results of unchanged files
+    """
+    paths = collect(patterns)
+    passed, tokens = 0, 0
+    cache = ResultCache() if use_cache else None
+
+    start = time.perf_counter()
+    try:
+        for result in check(paths, jobs, max_errors, cache):
+            print(result)
+            passed += result.ok
+            tokens += result.tokens
+    finally:
+        if cache is not None:
+            cache.close()
+    elapsed = time.perf_counter() - start
+
+    rate = len(paths) / elapsed if elapsed else 0.0
+    summary = (
+        f"{len(paths)} files, {passed} passed, {len(paths) - passed} failed, "
+        f"{tokens} tokens in {elapsed:.2f}s ({rate:.1f} files/s)"
+    )
+    if cache is not None and cache.hits:
+        summary += f", {cache.hits} cached"
+    print(summary)
+
+    return 0 if passed == len(paths) else 1
+
+
+def profile(
+    patterns: List[str],
+    output: Optional[str] = None,
+    format: str = "json",
+    backend: str = "ply",
+) -> int:
+    """
+    Lexes and parses every file matched by the patterns with a profiled lexer
+    and parser, in this process, and reports the most frequent token rules
+    and the most expensive productions. Returns the exit status.
+
+    :param patterns: The paths, directories or globs to profile
+    :param output: The file the stats are written to, if any
+    :param format: The format of the output, one of `stats.FORMATS`
+    :param backend: The lexer backend, one of `lexer.BACKENDS`
+    """
+    lexer = TSLexer(backend=backend, profile=True)
+    parser = TSParser(lexer, recover=True, profile=True)
+
+    for path in collect(patterns):
+        try:
+            source = read_file(path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"{path}: {e}")
+            return 1
+
+        parser.parse(source)
+
+    print(lexer.stats.report())
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as f:
+            lexer.stats.dump(f, format)
+
+    return 0
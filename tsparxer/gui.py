@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+gui.py: Tk editor running the lexer and parser as the code is typed.
+"""
+
+from tkinter import *
+from tkcode import CodeEditor
+
+from .incremental import Document
+from .lexer import Lexer as TSLexer
+from .worker import Worker
+
+# delay after the last keystroke before the output is refreshed, and between
+# checks for results of the worker, in milliseconds
+DEBOUNCE_MS: int = 300
+POLL_MS: int = 30
+
+
+def clear_windows(*windows):
+    for window in windows:
+        window.update("")
+
+
+def gui() -> None:
+    root = Tk()
+    root.title("GUI")
+    root.geometry("1280x720")
+    root.configure(bg="#323846")
+    root.resizable(False, False)
+
+    # create lexer
+    lexer: TSLexer = TSLexer()
+
+    # kept lexed and parsed as the code is edited, only touched by the worker
+    document = Document(lexer=lexer)
+
+    def render(mode: str, data: str) -> str:
+        document.update(data)
+
+        if mode == "lex":
+            lines = [str(t) for t in document.tokens]
+            lines.extend(str(diagnostic) for diagnostic in document.errors)
+            return "\n".join(lines)
+
+        diagnostics = document.diagnostics()
+        if not diagnostics:
+            return "All syntax is correct"
+
+        return "\n".join(
+            f"{lineno}:{col}: {message}" for lineno, col, message in diagnostics
+        )
+
+    # lexing and parsing run off the event loop, the output of the last button
+    # pressed is refreshed once typing pauses
+    worker = Worker(render)
+    mode = "syntax"
+    pending = None
+
+    def submit():
+        nonlocal pending
+        if pending is not None:
+            root.after_cancel(pending)
+            pending = None
+
+        worker.submit(mode, code_input.get("1.0", "end-1c"))
+
+    def on_change(event=None):
+        nonlocal pending
+        # whatever runs now is about the old text
+        worker.cancel()
+        if pending is not None:
+            root.after_cancel(pending)
+        pending = root.after(DEBOUNCE_MS, submit)
+
+    def poll():
+        try:
+            output = worker.poll()
+            if output is not None:
+                # a single insert, rather than one per line
+                code_output.delete("1.0", END)
+                code_output.insert("1.0", output)
+        finally:
+            root.after(POLL_MS, poll)
+
+    def run_lex():
+        nonlocal mode
+        mode = "lex"
+        submit()
+
+    def run_syntax():
+        nonlocal mode
+        mode = "syntax"
+        submit()
+
+    def clear():
+        code_input.delete("1.0", END)
+
+    # Text Label
+    insert_str = StringVar()
+    input_label = Label(
+        root,
+        textvariable=insert_str,
+        relief=RAISED,
+        bd="0px",
+        bg="#305265",
+        fg="#fff",
+    )
+    insert_str.set("Insert Code")
+    input_label.pack()
+    input_label.place(x=70, y=10, width=200, height=50)
+
+    # Syntax label to run
+    syntax_str = StringVar()
+    syntax_label = Label(
+        root,
+        textvariable=syntax_str,
+        relief=RAISED,
+        bd="0px",
+        bg="#305265",
+        fg="#fff",
+    )
+    syntax_str.set("Run Syntax")
+    syntax_label.pack()
+    syntax_label.place(x=850, y=5, width=100, height=50)
+
+    # Lex label to run
+    lex_str = StringVar()
+    lex_label = Label(
+        root,
+        textvariable=lex_str,
+        relief=RAISED,
+        bd="0px",
+        bg="#305265",
+        fg="#fff",
+    )
+    lex_str.set("Run Lex")
+    lex_label.pack()
+    lex_label.place(x=1060, y=5, width=50, height=50)
+
+    # code input
+    code_input = CodeEditor(
+        root,
+        language="TypeScript",
+        background="black",
+        highlighter="dracula",
+        font="consolas",
+        autofocus=True,
+        blockcursor=True,
+        insertofftime=0,
+    )
+
+    # code_input.pack(fill="both", expand=True)
+    code_input.place(x=50, y=50, width=1200, height=300)
+    code_input.configure(bg="#000", insertbackground="#fff")
+    code_input.bind("<<ContentChanged>>", on_change)
+
+    # output
+    code_output = Text(
+        root, font="consolas 15", bg="#1D2722", fg="lightgreen", wrap=WORD
+    )
+    code_output.place(x=50, y=370, width=1200, height=300)
+    code_output.insert("1.0", "-OUTPUT-")
+
+    # Lex button
+    lex_btn = PhotoImage(file="./lib/assets/play_btn.png")
+    Button(root, image=lex_btn, bg="#323846", bd=0, command=run_lex).place(
+        x=1000, y=5, width=64, height=64
+    )
+
+    # Syntax button
+    syntax_btn = PhotoImage(file="./lib/assets/play_btn.png")
+    Button(root, image=lex_btn, bg="#323846", bd=0, command=run_syntax).place(
+        x=800, y=5, width=64, height=64
+    )
+
+    # Clear button
+    clear_btn = PhotoImage(
+        file="./lib/assets/clear.png",
+    )
+    Button(
+        root, image=clear_btn, bg="#323846", bd=0, command=clear, text="Clean"
+    ).place(x=700, y=5, width=64, height=64)
+
+    # files-bar
+    files_bar = Canvas(bg="#403C3E", height=720, width=45, bd=0, borderwidth=0)
+    files_bar.place(x=0, y=0)
+
+    # file_icon
+    file_icon = PhotoImage(file="./lib/assets/file.png")
+    Button(root, image=file_icon, bg="#323846", bd=0).place(
+        x=8, y=5, width=32, height=32
+    )
+
+    poll()
+    root.mainloop()
+    worker.close()
+
+
+if __name__ == "__main__":
+    gui()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+incremental.py: Incremental re-lexing and re-parsing of an edited document.
+"""
+
+import re
+from array import array
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Tuple
+
+from ply.lex import LexToken
+
+from . import typecheck
+from .lexer import Diagnostic
+from .lexer import Lexer as TSLexer
+from .nodes import Node, Program, walk
+from .parser import Parser as TSParser
+from .parser import ParserSyntaxError
+
+_NEWLINE_RE = re.compile(r"\n")
+
+# tokens changing the nesting depth, top-level statements end at depth 0
+_OPEN = {"OPENPAREN", "OPENBRACKET", "OPENBRACE"}
+_CLOSE = {"CLOSEPAREN", "CLOSEBRACKET", "CLOSEBRACE"}
+# a `}` followed by these doesn't end the statement, e.g. `} else {`
+_CONTINUE = {"ELSE", "SEMICOLON"}
+
+
+def diff(old: str, new: str) -> Tuple[int, int, str]:
+    """
+    Returns the single edit turning `old` into `new` as `(offset, deleted,
+    inserted)`, by stripping their common prefix and suffix.
+
+    :param old: The text before the edit
+    :param new: The text after the edit
+    """
+    limit = min(len(old), len(new))
+
+    # binary searches comparing slices in C, rather than char by char
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[lo:mid] == new[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = lo
+
+    # the suffix may not overlap the prefix
+    lo, hi = 0, limit - prefix
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[-mid:][: mid - lo] == new[-mid:][: mid - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    suffix = lo
+
+    inserted = new[prefix:]
+    inserted = inserted[: len(inserted) - suffix]
+
+    return prefix, len(old) - prefix - suffix, inserted
+
+
+class Segment:
+    """
+    A top-level statement of a document: its tokens, the statements parsed
+    from them and the syntax errors found.
+
+    `offset`/`lines` are shifts from earlier edits not yet applied to the
+    positions of the tokens, nodes and errors, so an edit doesn't have to touch
+    every statement after it.
+    """
+
+    __slots__ = ("tokens", "body", "errors", "offset", "lines")
+
+    def __init__(self, tokens: List[LexToken]) -> None:
+        self.tokens = tokens
+        self.body: List[Node] = []
+        self.errors: List[ParserSyntaxError] = []
+        self.offset = 0
+        self.lines = 0
+
+    @property
+    def start(self) -> int:
+        return self.tokens[0].lexpos + self.offset
+
+    @property
+    def lineno(self) -> int:
+        return self.tokens[0].lineno + self.lines
+
+    def settle(self) -> "Segment":
+        """
+        Applies the pending shifts.
+        """
+        if self.offset or self.lines:
+            for t in self.tokens:
+                t.lexpos += self.offset
+                t.end += self.offset
+                t.lineno += self.lines
+
+            if self.lines:
+                for statement in self.body:
+                    for node in walk(statement):
+                        node.lineno += self.lines
+                for error in self.errors:
+                    error.lineno += self.lines
+
+            self.offset = self.lines = 0
+
+        return self
+
+
+class Document:
+    """
+    A source text kept lexed and parsed across edits.
+
+    An edit re-lexes from the last token ending before it until the new tokens
+    line up again with the old ones, then only the top-level statements made of
+    changed tokens are split and parsed again; everything after just has its
+    positions shifted, lazily. The parser recovers from errors, so every
+    statement gets its diagnostics.
+    """
+
+    def __init__(self, source: str = "", lexer: Optional[TSLexer] = None):
+        """
+        :param source: The initial text
+        :param lexer: The lexer to use, a new one by default
+        """
+        self.lexer = lexer or TSLexer()
+        self.parser = TSParser(self.lexer, recover=True)
+
+        self.source = ""
+        self.segments: List[Segment] = []
+        # lexing errors and offsets of unclosed `/*`, in document order
+        self.errors: List[Diagnostic] = []
+        self._openers: List[int] = []
+        self.line_starts: array = array("l", [0])
+
+        if source:
+            self.edit(0, 0, source)
+
+    # -------------------------------------------------------------------------
+    # Results
+    # -------------------------------------------------------------------------
+
+    @property
+    def tokens(self) -> List[LexToken]:
+        return [t for s in self.segments for t in s.settle().tokens]
+
+    @property
+    def program(self) -> Program:
+        body = [n for s in self.segments for n in s.settle().body]
+        return Program(body, pos=body[0].pos if body else (1, 1))
+
+    def diagnostics(self) -> List[Tuple[int, int, str]]:
+        """
+        Returns every lexing, syntax and type error as `(lineno, col,
+        message)`, in document order.
+        """
+        found = [(d.lineno, d.col, d.message) for d in self.errors]
+        for segment in self.segments:
+            found.extend(
+                (e.lineno + segment.lines, e.col, str(e))
+                for e in segment.errors
+            )
+
+        # names resolve across statements, so the whole program is checked
+        found.extend(tuple(d) for d in typecheck.check(self.program))
+
+        return sorted(found)
+
+    # -------------------------------------------------------------------------
+    # Edits
+    # -------------------------------------------------------------------------
+
+    def update(self, source: str) -> None:
+        """
+        Brings the document up to date with a new version of its text.
+
+        :param source: The whole new text
+        """
+        if source != self.source:
+            self.edit(*diff(self.source, source))
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> None:
+        """
+        Replaces `deleted` characters at `offset` with the `inserted` text.
+
+        :param offset: Where the edit starts
+        :param deleted: The amount of characters removed
+        :param inserted: The text inserted in their place
+        """
+        old_end, end = offset + deleted, offset + len(inserted)
+        delta, old_length = end - old_end, len(self.source)
+        source = self.source[:offset] + inserted + self.source[old_end:]
+
+        restart = self._restart(offset)
+        first = max(0, bisect_right(self.segments, restart, key=_start) - 1)
+        old = self._iter_tokens(first)
+
+        # tokens of the first affected statement which are lexed the same
+        prefix: List[LexToken] = []
+        cursor = next(old, None)
+        while cursor is not None and cursor[2].lexpos < restart:
+            prefix.append(cursor[2])
+            cursor = next(old, None)
+
+        # re-lex until a token past the edit matches an old one at the same
+        # shifted offset, from there on the text and so the tokens are equal
+        lexer, scanner = self.lexer, self.lexer.lexer
+        lexer.input(source, restart)
+        new: List[LexToken] = []
+        openers: List[int] = []
+        resync = None
+
+        for t in lexer.stream():
+            t.end = scanner.lexpos
+            if t.type == "MULTIPLY" and new and new[-1].end == t.lexpos:
+                if new[-1].type == "DIVIDE":
+                    openers.append(new[-1].lexpos)
+
+            if t.lexpos >= end:
+                while cursor and cursor[2].lexpos + delta < t.lexpos:
+                    cursor = next(old, None)
+                if cursor and _same(cursor[2], t, delta):
+                    resync = t
+                    break
+
+            new.append(t)
+
+        # line starts scanned so far, plus the ones past the resync point
+        starts = lexer.line_starts
+        starts.extend(
+            m.end() for m in _NEWLINE_RE.finditer(source, scanner.lexpos)
+        )
+        # errors at the end of the input point at its last line
+        scanner.lineno = len(starts)
+        self.source, self.line_starts = source, starts
+
+        if resync is None:
+            k, tail, moved, lines = len(self.segments), [], old_length, 0
+        else:
+            k, j, token = cursor
+            tail = self.segments[k].tokens[j:]
+            moved, lines = token.lexpos, resync.lineno - token.lineno
+
+            for t in tail:
+                t.lexpos += delta
+                t.end += delta
+                t.lineno += lines
+            for segment in self.segments[k:][1:]:
+                segment.offset += delta
+                segment.lines += lines
+
+        self.errors = [
+            *(d for d in self.errors if d.lexpos < restart),
+            *lexer.errors,
+            *(
+                Diagnostic(
+                    d.lexpos + delta, *lexer.position(d.lexpos + delta), d.text
+                )
+                for d in self.errors
+                if d.lexpos >= moved
+            ),
+        ]
+        self._openers = [
+            *(p for p in self._openers if p < restart),
+            *openers,
+            *(p + delta for p in self._openers if p >= moved),
+        ]
+
+        built, stop = self._split(prefix + new, tail, k)
+        kept = self.segments[stop:][1:]
+        self.segments[first:] = built + kept
+
+        # statements following on the edited line have their columns shifted
+        line = bisect_right(starts, end)
+        for segment in kept:
+            if segment.lineno != line:
+                break
+            built.append(segment.settle())
+
+        for segment in built:
+            self._parse(segment)
+
+    def _restart(self, offset: int) -> int:
+        """
+        Returns the offset to re-lex from for an edit at `offset`.
+        """
+        restart = 0
+
+        # the end of the last token ending before the edit, where the scanner
+        # was in the same state as it will be now
+        i = bisect_right(self.segments, offset, key=_start)
+        while i > 0 and not restart:
+            i -= 1
+            ends = [t.end for t in self.segments[i].settle().tokens]
+            restart = next((e for e in reversed(ends) if e < offset), 0)
+
+        # unclosed strings and comments were tried up to the end of the input,
+        # any edit after them may close them
+        hazards = [d.lexpos for d in self.errors if d.text[0] in "\"'"]
+        hazards.extend(self._openers)
+
+        return min([restart, *(h for h in hazards if h < offset)])
+
+    def _iter_tokens(self, first: int) -> Iterator[Tuple[int, int, LexToken]]:
+        """
+        Yields `(segment, index, token)` for the tokens of the segments from
+        `first` on, settling them on the way.
+        """
+        for k in range(first, len(self.segments)):
+            for j, t in enumerate(self.segments[k].settle().tokens):
+                yield k, j, t
+
+    def _split(
+        self, tokens: List[LexToken], tail: List[LexToken], k: int
+    ) -> Tuple[List[Segment], int]:
+        """
+        Splits the re-lexed tokens, followed by the old ones, into top-level
+        statements until a statement ends where an old one did. Returns the new
+        segments and the index of the last old segment they replace.
+
+        :param tokens: The tokens up to the resync point
+        :param tail: The old tokens of segment `k` from the resync point on
+        :param k: The segment the resync point lies in
+        """
+
+        def stream() -> Iterator[Tuple[LexToken, Optional[int]]]:
+            # old segment ends are tagged with the segment's index
+            for t in tokens:
+                yield t, None
+            for i, t in enumerate(tail, 1):
+                yield t, k if i == len(tail) else None
+            for s in range(k + 1, len(self.segments)):
+                old = self.segments[s].settle().tokens
+                for i, t in enumerate(old, 1):
+                    yield t, s if i == len(old) else None
+
+        built: List[Segment] = []
+        current: List[LexToken] = []
+        depth = 0
+        items = stream()
+        item = next(items, None)
+
+        while item is not None:
+            t, boundary = item
+            current.append(t)
+            following = next(items, None)
+
+            if t.type in _OPEN:
+                depth += 1
+            elif t.type in _CLOSE:
+                depth = max(depth - 1, 0)
+
+            if depth == 0 and (
+                t.type == "SEMICOLON"
+                or t.type == "CLOSEBRACE"
+                and (following is None or following[0].type not in _CONTINUE)
+            ):
+                built.append(Segment(current))
+                current = []
+                if boundary is not None:
+                    return built, boundary
+
+            item = following
+
+        if current:
+            built.append(Segment(current))
+
+        return built, len(self.segments)
+
+    def _parse(self, segment: Segment) -> None:
+        program = self.parser.parse_tokens(segment.tokens)
+        segment.body = program.body if program is not None else []
+        segment.errors = self.parser.errors
+
+        # the statement ended early, which isn't where the document does
+        for error in segment.errors:
+            if error.eof:
+                end = segment.tokens[-1].end
+                error.lineno, error.col = self.lexer.position(end)
+
+
+def _start(segment: Segment) -> int:
+    return segment.start
+
+
+def _same(old: LexToken, new: LexToken, delta: int) -> bool:
+    return (
+        old.lexpos + delta == new.lexpos
+        and old.type == new.type
+        and old.value == new.value
+    )
@@ -6,10 +6,242 @@
 lexer.py: A lexer implementation for TypeScript.
 """
 
+import os
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from functools import partial
+from types import SimpleNamespace
 import ply.lex as plylex
-from typing import List, Dict, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    IO,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+)
 from ply.lex import LexToken
 
+from .stats import Stats
+from .tokens import TokenBuffer, TokenWriter
+from .util import decode_chunks, digest, load_table, map_file, write_table
+
+# characters that may start a multi-line token, or end a line
+_BOUNDARY_RE = re.compile(r"[\"'/\n]")
+
+_NEWLINE_RE = re.compile(r"\n")
+
+# a string or comment, or its opening character alone when unterminated,
+# as `safe_boundaries` skips them
+_OPAQUE_RE = re.compile(r"\"[^\"]*\"|'[^']*'|//[^\n]*|/\*[\s\S]*?\*/|[\"'/]")
+# text up to the first string or comment not closed before the end
+_CLOSED_RE = re.compile(
+    r"(?:[^\"'/]+|\"[^\"]*\"|'[^']*'|//[^\n]*|/\*(?:[^*]|\*(?!/))*\*/"
+    r"|/(?![/*]))*"
+)
+
+# text up to the first string or comment the text after it may still change,
+# the last newline and other character no token spans outside them grouped
+_HELD_RE = re.compile(
+    r"(?:[^\"'/\s;,(){}\[\]]+|(?P<line>\n)|(?P<gap>[\s;,(){}\[\]])"
+    r"|\"[^\"]*\"|'[^']*'|//[^\n]*(?=\n)|/\*(?:[^*]|\*(?!/))*\*/"
+    r"|/(?![/*]|\Z))*"
+)
+
+# the longest line, string or comment chunked lexing holds waiting for its end
+MAX_TOKEN: int = 1 << 20
+
+# inputs from this size on are worth spreading over processes
+PARALLEL_SIZE: int = 1 << 20
+
+# runs of characters no token can start with
+_ILLEGAL_RE = re.compile(r"[^a-zA-Z0-9_\s\"'()\[\]{},.:;=+\-*/%!&|^<>]+")
+
+
+class Diagnostic(NamedTuple):
+    """
+    A run of illegal characters, `lexpos` is its offset in the input and
+    `lineno`/`col` (1-based) its position.
+    """
+
+    lexpos: int
+    lineno: int
+    col: int
+    text: str
+
+    @property
+    def message(self) -> str:
+        return f"Illegal characters {self.text!r}"
+
+    def __str__(self) -> str:
+        return f"{self.lineno}:{self.col}: {self.message}"
+
+
+class LexerError(Exception):
+    def __init__(self, diagnostic: Diagnostic):
+        super().__init__(diagnostic.message)
+        self.diagnostic = diagnostic
+        self.lineno = diagnostic.lineno
+        self.col = diagnostic.col
+
+
+def safe_boundaries(data: str, final: bool = False) -> Iterator[int]:
+    """
+    Yields the offsets right after every newline lying outside string literals
+    and comments; splitting the input there doesn't change the tokens lexed on
+    either side.
+
+    :param data: The input to scan
+    :param final: Whether `data` is the whole input. Otherwise scanning stops
+     at the first quote or comment that isn't closed within `data`, since the
+     text that follows decides how it is lexed
+    """
+    pos = 0
+    while True:
+        match = _BOUNDARY_RE.search(data, pos)
+        if match is None:
+            return
+
+        pos = match.start()
+        char = data[pos]
+
+        if char == "\n":
+            pos += 1
+            yield pos
+            continue
+
+        if char == "/":
+            follow = data[pos + 1] if pos + 1 < len(data) else ""
+            if follow == "/":
+                # line comments end right before the newline
+                end = data.find("\n", pos)
+            elif follow == "*":
+                end = data.find("*/", pos + 2)
+                end = end if end == -1 else end + 2
+            elif follow or final:
+                end = pos + 1
+            else:
+                return
+        else:
+            end = data.find(char, pos + 1)
+            end = end if end == -1 else end + 1
+
+        if end == -1:
+            if not final or char == "/" and follow == "/":
+                return
+            # unterminated, the opening character is lexed on its own
+            end = pos + 1
+
+        pos = end
+
+
+def split_points(data: str, size: int) -> List[int]:
+    """
+    Returns offsets splitting a whole input into pieces of at least `size`
+    characters, each the first of `safe_boundaries(data, final=True)` past
+    the end of the previous piece; the pieces lex to the same tokens on their
+    own as within the input.
+
+    The text between split points is skipped with a regex, which is much
+    quicker than listing every boundary.
+
+    :param data: The whole input
+    :param size: The minimum length of a piece, but the last
+    """
+    points: List[int] = []
+    size = max(size, 1)
+    pos, newline = 0, data.find("\n", size - 1)
+    while newline != -1:
+        # a candidate newline is safe when everything opened before it is
+        # closed before it too, which a single match tells
+        pos = _CLOSED_RE.match(data, pos, newline).end()
+        if pos == newline:
+            if newline + 1 < len(data):
+                points.append(newline + 1)
+            pos, newline = newline + 1, data.find("\n", newline + size)
+            continue
+
+        # the string or comment open at the newline, in the whole input
+        pos = _OPAQUE_RE.match(data, pos).end()
+        if pos > newline:
+            newline = data.find("\n", pos)
+
+    return points
+
+
+# the available scanners, see `Lexer`
+BACKENDS: Tuple[str, ...] = ("ply", "fast")
+
+
+class Identifiers:
+    """
+    The words a lexer scanned, identifiers and reserved words alike. Each
+    distinct spelling is stored once, interned, with its token type and a
+    small integer symbol id; tokens repeating a name share its string, and
+    keywords are told apart without lowering every word.
+
+    The lexer clears the table for every input, so lexers kept warm across
+    files don't hold every word they ever saw; symbol ids number the words of
+    one input, chunked input included.
+    """
+
+    __slots__ = ("reserved", "names", "symbols", "entries")
+
+    def __init__(self, reserved: Dict[str, str]) -> None:
+        """
+        :param reserved: The token type of every reserved word, in lower case
+        """
+        self.reserved = reserved
+        # spellings by symbol id and the other way around
+        self.names: List[str] = []
+        self.symbols: Dict[str, int] = {}
+        # `(spelling, type, id)` by spelling, what scanning a word looks up
+        self.entries: Dict[str, Tuple[str, str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def clear(self) -> None:
+        self.names.clear()
+        self.symbols.clear()
+        self.entries.clear()
+
+    def lookup(self, text: str) -> Tuple[str, str, int]:
+        """
+        Returns the interned spelling of a word, its token type and symbol
+        id, adding the word on first sight.
+
+        :param text: The word, as scanned
+        """
+        entry = self.entries.get(text)
+        if entry is None:
+            # reserved words match in any case, only new words are lowered
+            type = self.reserved.get(text) or self.reserved.get(
+                text.lower(), "ID"
+            )
+            text, id = sys.intern(text), len(self.names)
+            entry = self.entries[text] = (text, type, id)
+            self.symbols[text] = id
+            self.names.append(text)
+
+        return entry
+
+    def intern(self, text: str) -> Tuple[str, int]:
+        """
+        Returns the interned spelling of a word and its symbol id.
+
+        :param text: The word, as scanned
+        """
+        text, _, id = self.lookup(text)
+        return text, id
+
 
 class Lexer:
     # -------------------------------------------------------------------------
@@ -121,7 +353,6 @@ class Lexer:
     # Token-RegEx & Functions
     # -------------------------------------------------------------------------
     t_PLUS: str = r"\+"
-    t_STRINGCONTENT: str = r"(\"[^\"]*\"|'[^']*')"
     t_OPENPAREN: str = r"\("
     t_CLOSEPAREN: str = r"\)"
     t_OPENBRACKET: str = r"\["
@@ -162,11 +393,30 @@ class Lexer:
 
     def t_COMMENT(self, t: LexToken) -> None:
         r"//.*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/"
-        pass
+        self._newlines(t)
+
+    def t_STRINGCONTENT(self, t: LexToken) -> LexToken:
+        r"(\"[^\"]*\"|'[^']*')"
+        self._newlines(t)
+
+        return t
 
     def t_newline(self, t: LexToken) -> None:
         r"\n+"
         t.lexer.lineno += len(t.value)
+        self.line_starts.extend(
+            range(t.lexpos + 1, t.lexpos + len(t.value) + 1)
+        )
+
+    def _newlines(self, t: LexToken) -> None:
+        """
+        Accounts for the newlines inside a multi-line token.
+        """
+        i = t.value.find("\n")
+        while i != -1:
+            t.lexer.lineno += 1
+            self.line_starts.append(t.lexpos + i + 1)
+            i = t.value.find("\n", i + 1)
 
     def t_NUMBER(self, t: LexToken):
         r"\d+"
@@ -176,26 +426,807 @@ class Lexer:
 
     def t_ID(self, t: LexToken) -> LexToken:
         r"[a-zA-Z_][a-zA-Z_0-9]*"
-        t.type = self.reserved.get(t.value.lower(), "ID")
+        words = self.identifiers.entries
+        entry = words.get(t.value) or self.identifiers.lookup(t.value)
+        t.value, t.type, t.symbol = entry
 
         return t
 
     # error handling
     def t_error(self, t: LexToken) -> None:
-        print("Illegal character '%s'" % t.value[0])
-        t.lexer.skip(1)
+        # skip the whole run at once, not one character per call
+        match = _ILLEGAL_RE.match(t.value, 1)
+        text = t.value[: match.end() if match else 1]
+
+        t.lexer.skip(len(text))
+        self._illegal(t.lexpos, t.lineno, text)
+
+    def _illegal(self, lexpos: int, lineno: int, text: str) -> None:
+        """
+        Records a run of illegal characters, raising once there are too many.
+        """
+        offset, lines = self._base
+        diagnostic = Diagnostic(
+            lexpos + offset,
+            lineno + lines,
+            self.find_column(lexpos + offset),
+            text,
+        )
+        self.errors.append(diagnostic)
+
+        if self.max_errors is not None and len(self.errors) >= self.max_errors:
+            raise LexerError(diagnostic)
+
+    # -------------------------------------------------------------------------
+    # Compiled specification
+    # -------------------------------------------------------------------------
+    # PLY reflects over every `t_*` rule and compiles the master regex each
+    # time `lex()` is called; instead the result is built once per process
+    # (and cache directory) and every instance gets a cheap clone of it.
+    _specs: Dict[Tuple[type, Optional[str]], plylex.Lexer] = {}
+    _specs_lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def signature(cls) -> str:
+        """
+        Returns a digest of the token rules, used to version persisted tables.
+        """
+        rules = []
+        for name in sorted(dir(cls)):
+            if name.startswith("t_"):
+                rule = getattr(cls, name)
+                rules.append(
+                    f"{name}={rule.__doc__ if callable(rule) else rule}"
+                )
+
+        return digest(plylex.__tabversion__, *cls.tokens, *rules)
+
+    @classmethod
+    def spec(cls, cache_dir: Optional[str] = None) -> plylex.Lexer:
+        """
+        Returns the shared, compiled PLY lexer for this class. It must not be
+        fed input directly, use `clone()` on it instead.
+
+        :param cache_dir: Directory where the `lextab` module is persisted,
+         `None` keeps the specification in memory only
+        """
+        key = (cls, cache_dir)
+        spec = cls._specs.get(key)
+        if spec is None:
+            with cls._specs_lock:
+                spec = cls._specs.get(key)
+                if spec is None:
+                    spec = cls._specs[key] = cls._build_spec(cache_dir)
+
+        return spec
+
+    @classmethod
+    def _build_spec(cls, cache_dir: Optional[str]) -> plylex.Lexer:
+        # PLY reflects over a prototype holding just the rules, clones rebind
+        # them to their owner
+        instance = cls.__new__(cls)
+        prototype = SimpleNamespace(
+            __file__=__file__,
+            tokens=cls.tokens,
+            **{n: getattr(instance, n) for n in dir(cls) if n.startswith("t_")},
+        )
+        if cache_dir is None:
+            return plylex.lex(object=prototype)
+
+        name = f"lextab_{cls.signature()}"
+        lextab = load_table(name, cache_dir)
+        if lextab is not None:
+            try:
+                return plylex.lex(
+                    object=prototype, optimize=True, lextab=lextab
+                )
+            except Exception:
+                pass  # corrupted table, rebuild it below
+
+        spec = plylex.lex(object=prototype)
+        write_table(name, cache_dir, lambda tmp: spec.writetab(name, tmp))
+
+        return spec
+
+    _fast_specs: Dict[Tuple[type, Optional[str]], "FastSpec"] = {}
+
+    @classmethod
+    def fast_spec(cls, cache_dir: Optional[str] = None) -> "FastSpec":
+        """
+        Returns the shared specification of the `fast` backend, derived from
+        the PLY one so both always agree on the rules and their order.
+
+        :param cache_dir: Directory where the `lextab` module is persisted
+        """
+        key = (cls, cache_dir)
+        spec = cls._fast_specs.get(key)
+        if spec is None:
+            spec = cls._fast_specs[key] = FastSpec(cls, cls.spec(cache_dir))
+
+        return spec
 
     # -------------------------------------------------------------------------
 
-    def __init__(self) -> None:
-        self.lexer = plylex.lex(object=self)
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_errors: Optional[int] = None,
+        backend: str = "ply",
+        profile: bool = False,
+    ) -> None:
+        """
+        :param cache_dir: Directory where the compiled rules are persisted
+        :param max_errors: The amount of illegal character runs after which
+         `LexerError` is raised, `None` collects all of them in `errors`
+        :param backend: The scanner, one of `BACKENDS`: PLY's own, or a
+         `FastScanner` producing the same tokens faster
+        :param profile: Whether to count the matches of every token rule in
+         `stats`, which costs some throughput
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown lexer backend {backend!r}")
 
-    def input(self, input: str) -> None:
+        self.cache_dir = cache_dir
+        self.max_errors = max_errors
+        self.backend = backend
+        self.errors: List[Diagnostic] = []
+        # offsets at which each line of the input starts, filled while scanning
+        self.line_starts: array = array("l", [0])
+        # offset and line count of the current chunk, for chunked input, and
+        # the line starts of the chunks before it
+        self._base: Tuple[int, int] = (0, 0)
+        self._earlier: array = array("l", [0])
+        self.stats: Optional[Stats] = Stats() if profile else None
+        self.identifiers = Identifiers(self.reserved)
+
+        if backend == "fast":
+            scanner = CountingScanner if profile else FastScanner
+            self.lexer = scanner(self, self.fast_spec(cache_dir))
+        else:
+            if profile:
+                self._count_rules()
+            self.lexer = self.spec(cache_dir).clone(self)
+            # `clone` only rebinds the per-state tables, reload the active ones
+            self.lexer.begin("INITIAL")
+
+    def clone(self) -> "Lexer":
+        """
+        Returns a new, independent lexer sharing this lexer's compiled rules.
+        """
+        return type(self)(
+            self.cache_dir,
+            self.max_errors,
+            self.backend,
+            self.stats is not None,
+        )
+
+    def input(self, input: str, lexpos: int = 0) -> None:
+        """
+        Sets the input to scan, with an empty identifier table.
+
+        :param input: The input string to be tokenized
+        :param lexpos: The offset to start scanning at, which must not lie
+         inside a token; line numbers still count from the start of `input`
+        """
+        self.identifiers.clear()
+        self._input(input, lexpos)
+
+    def _input(self, input: str, lexpos: int = 0) -> None:
         self.lexer.input(input)
+        self.lexer.lexpos = lexpos
+        self.errors = []
+        self.line_starts = array("l", [0])
+        self.line_starts.extend(
+            m.end() for m in _NEWLINE_RE.finditer(input, 0, lexpos)
+        )
+        self.lexer.lineno = len(self.line_starts)
+        self._base = (0, 0)
 
     def token(self) -> LexToken:
         return self.lexer.token()
 
+    def stream(self) -> Iterator[LexToken]:
+        """
+        Yields the tokens of the current input, from the current position on.
+        """
+        if self.backend == "fast":
+            # a generator already, without a `token()` call per token
+            return iter(self.lexer)
+
+        tokens = iter(self.lexer.token, None)
+        return tokens if self.stats is None else self._count_strings(tokens)
+
+    # -------------------------------------------------------------------------
+    # Profiling
+    # -------------------------------------------------------------------------
+    # PLY dispatches to function rules through the methods of the instance it
+    # is cloned for, so counting wrappers are installed on the instance before
+    # cloning; string rules have no function, their tokens are counted as they
+    # are returned instead.
+
+    def _count_rules(self) -> None:
+        rules = self.stats.rules
+        for name in dir(type(self)):
+            if name.startswith("t_") and callable(getattr(self, name)):
+                setattr(self, name, _counted(rules, name, getattr(self, name)))
+
+    def _count_strings(self, tokens: Iterator[LexToken]) -> Iterator[LexToken]:
+        rules = self.stats.rules
+        strings = {
+            n[2:]
+            for n in dir(type(self))
+            if n.startswith("t_") and n != "t_ignore"
+            if isinstance(getattr(self, n), str)
+        }
+
+        for t in tokens:
+            if t.type in strings:
+                name = f"t_{t.type}"
+                rules[name] = rules.get(name, 0) + 1
+            yield t
+
+    # Positions of chunked input, see `iter_file_tokens`, count from the start
+    # of the file rather than of the chunk being scanned.
+
+    @property
+    def lineno(self) -> int:
+        return self.lexer.lineno + self._base[1]
+
+    @property
+    def lexpos(self) -> int:
+        return self.lexer.lexpos + self._base[0]
+
+    @property
+    def lexdata(self) -> str:
+        return self.lexer.lexdata
+
+    @property
+    def end(self) -> int:
+        """
+        The offset of the end of the input.
+        """
+        return len(self.lexer.lexdata) + self._base[0]
+
+    def position(self, lexpos: int) -> Tuple[int, int]:
+        """
+        Returns the 1-based (line, column) of the given offset in the current
+        input, which must have been scanned up to there.
+
+        :param lexpos: The offset, e.g. a token's `lexpos`
+        """
+        offset, lines = self._base
+        if lexpos < offset:
+            # in a chunk scanned earlier
+            line = bisect_right(self._earlier, lexpos)
+            return line, lexpos - self._earlier[line - 1] + 1
+
+        line = bisect_right(self.line_starts, lexpos - offset)
+        return line + lines, lexpos - offset - self.line_starts[line - 1] + 1
+
+    def find_column(self, lexpos: int) -> int:
+        """
+        Returns the 1-based column of the given offset in the current input.
+
+        :param lexpos: The offset, e.g. a token's `lexpos`
+        """
+        return self.position(lexpos)[1]
+
+    def iter_tokens(
+        self, source: str, columns: bool = False
+    ) -> Iterator[LexToken]:
+        """
+        Lazily yields the tokens of the given source. The input is set right
+        away, so the lexer's state refers to it even before iterating.
+
+        :param source: The input string to be tokenized
+        :param columns: Whether to set the 1-based `col` of every token, which
+         costs a little throughput
+        """
+        self.input(source)
+        tokens = self.stream()
+
+        return self._with_columns(tokens) if columns else tokens
+
+    def _with_columns(self, tokens: Iterator[LexToken]) -> Iterator[LexToken]:
+        starts = self.line_starts
+        for t in tokens:
+            # tokens arrive in order, only multi-line ones started earlier
+            # than the current line
+            start = starts[-1]
+            if t.lexpos < start:
+                start = starts[bisect_right(starts, t.lexpos) - 1]
+
+            t.col = t.lexpos - start + 1
+            yield t
+
+    def iter_file_tokens(
+        self,
+        file: TextIO,
+        chunk_size: int = 1 << 16,
+        columns: bool = False,
+        max_token: int = MAX_TOKEN,
+    ) -> Iterator[LexToken]:
+        """
+        Lazily yields the tokens read from a file object, holding roughly one
+        chunk of it in memory at a time. Token positions are relative to the
+        start of the file.
+
+        :param file: The text file object to read from
+        :param chunk_size: The amount of characters read at once
+        :param columns: Whether to set the 1-based `col` of every token
+        :param max_token: The most characters held for a line, string or
+         comment not ended yet. Longer lines are split between tokens, longer
+         line comments dropped as they're read, and longer strings and block
+         comments lexed as unterminated, their opening character on its own
+        """
+        chunks = iter(lambda: file.read(chunk_size), "")
+        return self._iter_chunk_tokens(chunks, columns, max_token)
+
+    def iter_mapped_tokens(
+        self,
+        path: str,
+        chunk_size: int = 1 << 20,
+        columns: bool = False,
+        max_token: int = MAX_TOKEN,
+    ) -> Iterator[LexToken]:
+        """
+        Lazily yields the tokens of a file mapped into memory rather than read,
+        see `util.map_file`, decoding roughly one chunk of it at a time. The
+        tokens are those of its text as read by `util.read_file`, positions
+        included, but for a string or block comment longer than `max_token`:
+        it's lexed as unterminated, like an unclosed one.
+
+        :param path: The path of the UTF-8 file to lex
+        :param chunk_size: The amount of bytes decoded at once
+        :param columns: Whether to set the 1-based `col` of every token
+        :param max_token: The most characters held for an open string or
+         comment, see `iter_file_tokens`
+        """
+        return self._iter_chunk_tokens(
+            _mapped_chunks(path, chunk_size), columns, max_token
+        )
+
+    def _iter_chunk_tokens(
+        self, chunks: Iterator[str], columns: bool, max_token: int
+    ) -> Iterator[LexToken]:
+        # an empty file leaves no trace of the previous input either
+        self.input("")
+        buffer, offset, lineno = "", 0, 1
+        errors: List[Diagnostic] = self.errors
+        earlier = array("l", [0])
+        # how far the buffer is scanned, resumed with the next chunk, and the
+        # last newline and token gap found up to there
+        scanned, line, gap = 0, 0, 0
+        comment = False
+        while True:
+            chunk = next(chunks, "")
+            if comment and chunk:
+                # the rest of an overlong line comment is dropped as it's read
+                end = chunk.find("\n")
+                if end == -1:
+                    offset += len(chunk)
+                    continue
+                offset, chunk, comment = offset + end, chunk[end:], False
+            buffer += chunk
+
+            # only lex up to the last point no token can straddle
+            split = len(buffer)
+            if chunk:
+                match = _HELD_RE.match(buffer, scanned)
+                scanned = match.end()
+                line = max(line, match.end("line"))
+                gap = max(gap, match.end("gap"))
+
+                split = line
+                if len(buffer) - split > max_token:
+                    # rather than holding an overlong line, split it between
+                    # tokens
+                    split = max(split, gap)
+                if len(buffer) - scanned > max_token:
+                    # a string or comment open for too long is taken to never
+                    # close, rather than holding the rest of the file
+                    if buffer.startswith("//", scanned):
+                        split, comment = len(buffer), True
+                    else:
+                        split = scanned + 1
+
+            if split:
+                # the words of earlier chunks stay in the table
+                self._input(buffer[:split])
+                # a chunk splitting a line starts past its first column
+                self.line_starts[0] = earlier[-1] - offset
+                tokens = self.stream()
+                if columns:
+                    tokens = self._with_columns(tokens)
+                # keep the diagnostics and positions of the whole file
+                self.errors, self._base = errors, (offset, lineno - 1)
+                self._earlier = earlier
+
+                for t in tokens:
+                    t.lexpos += offset
+                    t.lineno += lineno - 1
+                    yield t
+
+                earlier.extend(s + offset for s in self.line_starts[1:])
+                lineno += self.lexer.lineno - 1
+                offset += split
+                buffer = buffer[split:]
+                scanned = max(scanned - split, 0)
+                line, gap = max(line - split, 0), max(gap - split, 0)
+
+            if not chunk:
+                return
+
     def lex(self, input: str) -> List[LexToken]:
-        self.input(input)
-        return list(self.lexer)
+        return list(self.iter_tokens(input))
+
+    def lex_buffer(self, source: str) -> TokenBuffer:
+        """
+        Lexes the source into a compact `TokenBuffer` rather than a list of
+        tokens, each `LexToken` is discarded right after being stored.
+
+        :param source: The input string to be tokenized
+        """
+        buffer = TokenBuffer(source, self.tokens)
+        codes, lexer = buffer.codes, self.lexer
+        kinds, starts = buffer.kinds.append, buffer.starts.append
+        ends, lines = buffer.ends.append, buffer.lines.append
+
+        for t in self.iter_tokens(source):
+            kinds(codes[t.type])
+            starts(t.lexpos)
+            # the scanner stops right after the token just returned
+            ends(lexer.lexpos)
+            lines(t.lineno)
+
+        return buffer
+
+    def lex_parallel(
+        self,
+        source: str,
+        jobs: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ) -> TokenBuffer:
+        """
+        Lexes the source like `lex_buffer`, splitting it at `split_points` and
+        spreading the pieces over `jobs` processes. The tokens, `errors` and
+        line starts are those of `lex_buffer(source)`, positions included.
+
+        Inputs smaller than `PARALLEL_SIZE` are lexed in this process.
+
+        :param source: The input string to be tokenized
+        :param jobs: The amount of worker processes, defaults to the CPU count
+        :param chunk_size: The minimum length of a piece, defaults to an even
+         share of the source per process
+        """
+        jobs = jobs or os.cpu_count() or 1
+        if chunk_size is None:
+            if len(source) < PARALLEL_SIZE:
+                return self.lex_buffer(source)
+            chunk_size = -(-len(source) // jobs)
+
+        points = split_points(source, chunk_size) if jobs > 1 else []
+        if not points:
+            return self.lex_buffer(source)
+
+        # pieces start lines, so columns need no adjustment
+        pieces, lineno = [], 1
+        for start, end in zip([0, *points], [*points, len(source)]):
+            pieces.append((source[start:end], start, lineno - 1))
+            lineno += source.count("\n", start, end)
+
+        # only imported when some input is large enough
+        from concurrent.futures import ProcessPoolExecutor
+
+        lex = partial(
+            _lex_piece,
+            type(self),
+            self.cache_dir,
+            self.backend,
+            self.stats is not None,
+        )
+        with ProcessPoolExecutor(min(jobs, len(pieces))) as executor:
+            results = list(executor.map(lex, *zip(*pieces)))
+
+        # the whole input, scanned to its end, as left by sequential lexing
+        self.input(source, len(source))
+        self.lexer.lexpos = len(source) + 1
+
+        buffer = TokenBuffer(source, self.tokens)
+        for columns, errors, stats in results:
+            for column, values in zip(
+                (buffer.kinds, buffer.starts, buffer.ends, buffer.lines),
+                columns,
+            ):
+                column.extend(values)
+            self.errors.extend(errors)
+            if stats is not None:
+                self.stats.merge(stats)
+
+        limit = self.max_errors
+        if limit is not None and len(self.errors) >= limit:
+            del self.errors[limit:]
+            raise LexerError(self.errors[-1])
+
+        return buffer
+
+    def dump(self, source: str, file: IO[bytes], format: str = "ndjson") -> int:
+        """
+        Lexes the source straight into a token dump, see `TokenWriter`, and
+        returns the amount of tokens written.
+
+        :param source: The input string to be tokenized
+        :param file: The binary file to write to
+        :param format: One of `tokens.FORMATS`
+        """
+        lexer = self.lexer
+        with TokenWriter(file, source, self.tokens, format) as writer:
+            for t in self.iter_tokens(source):
+                # the scanner stops right after the token just returned
+                writer.append(t.type, t.lexpos, lexer.lexpos, t.lineno)
+
+        return writer.count
+
+
+# -----------------------------------------------------------------------------
+# Fast backend
+# -----------------------------------------------------------------------------
+
+
+class FastSpec:
+    """
+    The rules of a lexer merged into a single regex for `finditer`, in the
+    order PLY tries them: ignored characters are skipped as part of the next
+    match, consecutive literal rules (e.g. `==`, `;`) are grouped into one
+    alternation whose match is typed by value, and a catch-all for illegal
+    characters comes last, so the input is covered without gaps.
+    """
+
+    # function rules with an inlined equivalent in `FastScanner`
+    ACTIONS = {"t_COMMENT", "t_STRINGCONTENT", "t_newline", "t_NUMBER", "t_ID"}
+
+    def __init__(self, cls: type, spec: plylex.Lexer) -> None:
+        """
+        :param cls: The lexer class holding the `t_*` rules
+        :param spec: Its compiled PLY lexer, giving the order of the rules
+        """
+        order = []
+        for regex, findex in spec.lexstatere["INITIAL"]:
+            for name, i in sorted(regex.groupindex.items(), key=lambda x: x[1]):
+                order.append((name, findex[i]))
+
+        # literal groups map the matched text to its type, the other string
+        # rules their name, `None` if ignored
+        self.literals: Dict[str, str] = {}
+        self.types: Dict[str, Optional[str]] = {}
+        patterns: List[str] = []
+        run: List[str] = []
+
+        def flush() -> None:
+            if run:
+                name = f"literal{len(patterns)}"
+                self.types[name] = None
+                patterns.append(f"(?P<{name}>{'|'.join(run)})")
+                run.clear()
+
+        for name, (func, type) in order:
+            rule = getattr(cls, name)
+            if func is not None:
+                if name not in self.ACTIONS:
+                    raise ValueError(f"No fast equivalent of rule {name}")
+                rule = rule.__doc__
+
+            text = _literal(rule) if func is None else None
+            if text is not None:
+                run.append(rule)
+                self.literals.setdefault(text, type)
+                continue
+
+            flush()
+            if func is None:
+                self.types[name] = type
+            patterns.append(f"(?P<{name}>{rule})")
+
+        flush()
+        self.groups = {n for n in self.types if n.startswith("literal")}
+        for name in self.groups:
+            del self.types[name]
+
+        # as `t_error`: the offending character plus any illegal ones after it
+        patterns.append(f"(?P<error>.(?:{_ILLEGAL_RE.pattern})?)")
+
+        ignore = "".join(re.escape(c) for c in spec.lexignore)
+        # all of them, a rule like `\s` mustn't match one when nothing follows
+        prefix = f"[{ignore}]*(?![{ignore}])" if ignore else ""
+        self.regex = re.compile(
+            f"{prefix}(?:{'|'.join(patterns)})", spec.lexreflags
+        )
+
+
+def _counted(
+    counts: Dict[str, int], name: str, rule: Callable[[LexToken], Any]
+) -> Callable[[LexToken], Any]:
+    """
+    Wraps a function rule so its calls are counted under `name`.
+    """
+
+    def counted(t: LexToken) -> Any:
+        counts[name] = counts.get(name, 0) + 1
+        return rule(t)
+
+    counted.__name__ = name
+    return counted
+
+
+def _lex_piece(
+    cls: type,
+    cache_dir: Optional[str],
+    backend: str,
+    profile: bool,
+    source: str,
+    offset: int,
+    lines: int,
+) -> Tuple[Tuple[array, ...], List[Diagnostic], Optional[Stats]]:
+    """
+    Lexes a piece of a larger input, see `Lexer.lex_parallel`, returning its
+    token columns, diagnostics and stats with positions in the whole input.
+
+    :param offset: The offset of the piece in the whole input
+    :param lines: The amount of lines before the piece
+    """
+    lexer = cls(cache_dir, None, backend, profile)
+    buffer = lexer.lex_buffer(source)
+
+    columns = (
+        buffer.kinds,
+        array("I", [s + offset for s in buffer.starts]),
+        array("I", [e + offset for e in buffer.ends]),
+        array("I", [n + lines for n in buffer.lines]),
+    )
+    errors = [
+        d._replace(lexpos=d.lexpos + offset, lineno=d.lineno + lines)
+        for d in lexer.errors
+    ]
+
+    return columns, errors, lexer.stats
+
+
+def _mapped_chunks(path: str, chunk_size: int) -> Iterator[str]:
+    """
+    Yields the decoded chunks of a file, mapped while they are consumed.
+    """
+    with map_file(path) as data:
+        yield from decode_chunks(data, chunk_size)
+
+
+def _literal(regex: str) -> Optional[str]:
+    """
+    Returns the text matched by a regex made only of plain and escaped
+    punctuation, `None` for any other regex.
+    """
+    if re.fullmatch(r"(?:\\[^\w\s]|[^\\.^$*+?{}\[\]|()\s#])+", regex):
+        return re.sub(r"\\(.)", r"\1", regex)
+
+    return None
+
+
+class FastScanner:
+    """
+    Stands in for the PLY lexer driven by `Lexer`, scanning with one
+    `finditer` over a `FastSpec` instead of matching and dispatching to a rule
+    method per token. Token rules with actions are inlined, so they must be
+    kept in sync with the `t_*` methods; the tokens are identical.
+
+    Scanning starts on the first `token()` call after `input()`, from the
+    `lexpos` set then.
+    """
+
+    def __init__(self, owner: Lexer, spec: FastSpec) -> None:
+        """
+        :param owner: The lexer collecting line starts and diagnostics
+        :param spec: The merged rules
+        """
+        self.owner = owner
+        self.spec = spec
+        self.lexdata = ""
+        self.lexpos = 0
+        self.lineno = 1
+        self._tokens: Optional[Iterator[LexToken]] = None
+
+    def input(self, data: str) -> None:
+        self.lexdata = data
+        self.lexpos = 0
+        self._tokens = None
+
+    def __iter__(self) -> Iterator[LexToken]:
+        if self._tokens is None:
+            self._tokens = self._scan()
+
+        return self._tokens
+
+    def token(self) -> Optional[LexToken]:
+        return next(iter(self), None)
+
+    def skip(self, n: int) -> None:
+        self.lexpos += n
+
+    def _scan(self) -> Iterator[LexToken]:
+        owner, data, spec = self.owner, self.lexdata, self.spec
+        groups, literals, types = spec.groups, spec.literals, spec.types
+        identifiers, starts = owner.identifiers, owner.line_starts
+        words = identifiers.entries
+
+        for m in self._matches(data, self.lexpos):
+            rule = m.lastgroup
+            value = m.group(rule)
+
+            if rule in groups:
+                type = literals[value]
+            elif rule == "t_ID":
+                t = LexToken()
+                entry = words.get(value) or identifiers.lookup(value)
+                t.value, t.type, t.symbol = entry
+                t.lineno, t.lexpos = self.lineno, m.start(rule)
+                self.lexpos = m.end()
+                yield t
+                continue
+            elif rule == "t_newline":
+                start = m.start(rule)
+                self.lineno += len(value)
+                starts.extend(range(start + 1, start + len(value) + 1))
+                continue
+            elif rule == "t_NUMBER":
+                type, value = "NUMBER", int(value)
+            elif rule in types:
+                type = types[rule]
+                if type is None:
+                    continue
+            elif rule == "error":
+                self.lexpos = m.end()
+                owner._illegal(m.start(rule), self.lineno, value)
+                continue
+            else:
+                # comments and strings, which may span several lines
+                t = LexToken()
+                t.type, t.value = rule[2:], value
+                t.lineno, t.lexpos, t.lexer = self.lineno, m.start(rule), self
+                owner._newlines(t)
+                if rule == "t_COMMENT":
+                    continue
+
+                self.lexpos = m.end()
+                yield t
+                continue
+
+            t = LexToken()
+            t.type, t.value = type, value
+            t.lineno, t.lexpos = self.lineno, m.start(rule)
+            self.lexpos = m.end()
+            yield t
+
+        # where PLY leaves it at the end of the input
+        self.lexpos = len(data) + 1
+
+    def _matches(self, data: str, pos: int) -> Iterator[re.Match]:
+        return self.spec.regex.finditer(data, pos)
+
+
+class CountingScanner(FastScanner):
+    """
+    A `FastScanner` counting the matches of every rule in its owner's `stats`,
+    under the names PLY's rules have.
+    """
+
+    def _matches(self, data: str, pos: int) -> Iterator[re.Match]:
+        rules = self.owner.stats.rules
+        groups, literals = self.spec.groups, self.spec.literals
+
+        for m in super()._matches(data, pos):
+            name = m.lastgroup
+            if name in groups:
+                name = f"t_{literals[m.group(name)]}"
+            elif name == "error":
+                name = "t_error"
+
+            rules[name] = rules.get(name, 0) + 1
+            yield m
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+nodes.py: Syntax tree nodes built by the parser.
+"""
+
+from typing import Any, Iterator, List, Tuple
+
+
+class Node:
+    """
+    Base class of every syntax tree node.
+
+    Nodes use `__slots__` so large trees stay small in memory, `_fields` lists
+    the child attributes in order and `lineno`/`col` (both 1-based) locate the
+    first token of the construct.
+    """
+
+    __slots__ = ("lineno", "col")
+    _fields: Tuple[str, ...] = ()
+
+    def __init__(self, *values: Any, pos: Tuple[int, int] = (0, 0)) -> None:
+        for field, value in zip(self._fields, values, strict=True):
+            setattr(self, field, value)
+
+        self.lineno, self.col = pos
+
+    # Folded operator chains nest deeper than the recursion limit, so trees
+    # are printed and compared with explicit stacks.
+
+    def __repr__(self) -> str:
+        parts: List[str] = []
+        # `(True, text)` is written as is, `(False, value)` expanded
+        stack: List[Tuple[bool, Any]] = [(False, self)]
+        while stack:
+            literal, value = stack.pop()
+            if literal:
+                parts.append(value)
+                continue
+
+            if isinstance(value, Node):
+                items = [(True, f"{type(value).__name__}(")]
+                for i, field in enumerate(value._fields):
+                    items.append((True, f"{', ' if i else ''}{field}="))
+                    items.append((False, getattr(value, field)))
+                items.append((True, ")"))
+            elif isinstance(value, list):
+                items = [(True, "[")]
+                for i, item in enumerate(value):
+                    if i:
+                        items.append((True, ", "))
+                    items.append((False, item))
+                items.append((True, "]"))
+            else:
+                parts.append(repr(value))
+                continue
+
+            stack.extend(reversed(items))
+
+        return "".join(parts)
+
+    def __eq__(self, other: object) -> bool:
+        # positions are left out so trees can be compared structurally
+        stack: List[Tuple[Any, Any]] = [(self, other)]
+        while stack:
+            mine, theirs = stack.pop()
+            if isinstance(mine, Node):
+                if type(mine) is not type(theirs):
+                    return False
+                stack.extend(
+                    (getattr(mine, f), getattr(theirs, f)) for f in mine._fields
+                )
+            elif isinstance(mine, list):
+                if not isinstance(theirs, list) or len(mine) != len(theirs):
+                    return False
+                stack.extend(zip(mine, theirs))
+            elif isinstance(theirs, (Node, list)) or mine != theirs:
+                return False
+
+        return True
+
+    __hash__ = None
+
+    @property
+    def pos(self) -> Tuple[int, int]:
+        return self.lineno, self.col
+
+    def children(self) -> Iterator["Node"]:
+        """
+        Yields the direct child nodes, in source order.
+        """
+        for field in self._fields:
+            value = getattr(self, field)
+            if isinstance(value, Node):
+                yield value
+            elif isinstance(value, list):
+                yield from (v for v in value if isinstance(v, Node))
+
+
+def walk(node: Node) -> Iterator[Node]:
+    """
+    Yields every node of the tree in pre-order, without recursing so deep
+    trees can't exhaust the stack.
+
+    :param node: The root of the tree
+    """
+    stack: List[Node] = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(node.children())))
+
+
+# -----------------------------------------------------------------------------
+# Types
+# -----------------------------------------------------------------------------
+
+
+class TypeRef(Node):
+    __slots__ = _fields = ("name",)
+
+
+class ArrayType(Node):
+    __slots__ = _fields = ("element",)
+
+
+class TupleType(Node):
+    __slots__ = _fields = ("elements",)
+
+
+# -----------------------------------------------------------------------------
+# Statements
+# -----------------------------------------------------------------------------
+
+
+class Program(Node):
+    __slots__ = _fields = ("body",)
+
+
+class VarDecl(Node):
+    """
+    `kind` is one of `let`, `const` or `var`, `type` is `None` when omitted.
+    """
+
+    __slots__ = _fields = ("kind", "name", "type", "value")
+
+
+class Interface(Node):
+    __slots__ = _fields = ("name", "fields")
+
+
+class Field(Node):
+    __slots__ = _fields = ("name", "type")
+
+
+class If(Node):
+    """
+    `orelse` is `None` when there is no `else` branch.
+    """
+
+    __slots__ = _fields = ("test", "body", "orelse")
+
+
+class While(Node):
+    __slots__ = _fields = ("test", "body")
+
+
+class For(Node):
+    __slots__ = _fields = ("init", "test", "update", "body")
+
+
+class FunctionDecl(Node):
+    """
+    `kind` is `declaration` (`function f() {}`), `expression`
+    (`const f = function() {};`) or `arrow` (`const f = () => {}`).
+    """
+
+    __slots__ = _fields = ("kind", "name", "params", "return_type", "body")
+
+
+class Param(Node):
+    __slots__ = _fields = ("name", "type")
+
+
+class Return(Node):
+    __slots__ = _fields = ("value",)
+
+
+class ConsoleLog(Node):
+    __slots__ = _fields = ("argument",)
+
+
+class Invalid(Node):
+    """
+    Placeholder for a statement skipped while recovering from a syntax error.
+    """
+
+    __slots__ = _fields = ()
+
+
+# -----------------------------------------------------------------------------
+# Expressions
+# -----------------------------------------------------------------------------
+
+
+class Identifier(Node):
+    __slots__ = _fields = ("name",)
+
+
+class Literal(Node):
+    """
+    `kind` is one of `string`, `number` or `boolean`; string values are stored
+    without their quotes.
+    """
+
+    __slots__ = _fields = ("kind", "value")
+
+
+class ArrayLiteral(Node):
+    __slots__ = _fields = ("elements",)
+
+
+class TupleLiteral(Node):
+    __slots__ = _fields = ("elements",)
+
+
+class Sequence(Node):
+    """
+    Comma separated expressions, e.g. `let x = 1, 2;`.
+    """
+
+    __slots__ = _fields = ("expressions",)
+
+
+class BinaryOp(Node):
+    __slots__ = _fields = ("op", "left", "right")
+
+
+class UnaryOp(Node):
+    __slots__ = _fields = ("op", "operand")
+
+
+class Update(Node):
+    """
+    Increment/decrement such as `i++` or `--i`.
+    """
+
+    __slots__ = _fields = ("op", "operand", "prefix")
+
+
+class Call(Node):
+    __slots__ = _fields = ("callee", "args")
+
+
+# -----------------------------------------------------------------------------
+# Operators
+# -----------------------------------------------------------------------------
+
+# binding power of the binary operators, higher binds tighter
+PRECEDENCE = {
+    "||": 1,
+    "&&": 2,
+    "^": 3,
+    "+": 4,
+    "-": 4,
+    "*": 5,
+    "/": 5,
+    "%": 5,
+}
+
+
+def fold(items: List[Any]) -> Node:
+    """
+    Builds a left-associative `BinaryOp` tree honouring `PRECEDENCE` from a flat
+    `[operand, operator, operand, ...]` list, as produced by the grammar's
+    operator chains.
+
+    :param items: Operands (nodes) alternating with operators (strings)
+    """
+    operands: List[Node] = [items[0]]
+    operators: List[str] = []
+
+    def reduce() -> None:
+        right, left = operands.pop(), operands.pop()
+        operands.append(BinaryOp(operators.pop(), left, right, pos=left.pos))
+
+    for i in range(1, len(items), 2):
+        op = items[i]
+        while operators and PRECEDENCE[operators[-1]] >= PRECEDENCE[op]:
+            reduce()
+        operators.append(op)
+        operands.append(items[i + 1])
+
+    while operators:
+        reduce()
+
+    return operands[0]
+
+
+def split(items: List[Any], separator: str = ",") -> List[Node]:
+    """
+    Splits a flat operand/operator list on the given separator and folds each
+    part into a single expression.
+
+    :param items: Operands (nodes) alternating with operators (strings)
+    :param separator: The operator separating expressions
+    """
+    groups: List[Node] = []
+    start = 0
+    for i in range(1, len(items), 2):
+        if items[i] == separator:
+            groups.append(fold(items[start:i]))
+            start = i + 1
+    groups.append(fold(items[start:]))
+
+    return groups
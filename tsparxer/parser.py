@@ -6,16 +6,76 @@
 lexer.py: A lexer for tokenizing a TypeScript input.
 """
 
+import copy
+import threading
+import time
 import ply.yacc as plyacc
+from ply.lex import LexToken
 from ply.yacc import YaccProduction
-from typing import Tuple
-
+from types import ModuleType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from . import typecheck
 from .lexer import Lexer as TSLexer
+from .nodes import (
+    ArrayLiteral,
+    ArrayType,
+    BinaryOp,
+    Call,
+    ConsoleLog,
+    Field,
+    For,
+    FunctionDecl,
+    Identifier,
+    If,
+    Interface,
+    Invalid,
+    Literal,
+    Node,
+    Param,
+    Program,
+    Return,
+    Sequence,
+    TupleLiteral,
+    TupleType,
+    TypeRef,
+    UnaryOp,
+    Update,
+    VarDecl,
+    While,
+    fold,
+    split,
+)
+from .stats import Stats
+from .util import default_cache_dir, digest, load_table, write_table
 
 
 class ParserSyntaxError(Exception):
-    def __init__(self, p: YaccProduction):
-        super().__init__(f"Syntax error in input '{p}'!")
+    def __init__(self, p: YaccProduction, lineno: int = 0, col: int = 0):
+        # the offending token is described without its offset, which the
+        # `lineno`/`col` attributes already give
+        if isinstance(p, LexToken):
+            message = f"Syntax error at {p.type} {p.value!r}"
+        elif p is None:
+            message = "Syntax error at end of input"
+        else:
+            message = f"Syntax error: {p}"
+
+        super().__init__(message)
+        self.lineno = lineno
+        self.col = col
+        self.eof = p is None
 
 
 class Parser:
@@ -28,6 +88,7 @@ class Parser:
         """
         program : statements
         """
+        p[0] = Program(p[1], pos=self._pos(p, 1))
 
     def p_statement(self, p: YaccProduction) -> None:
         """
@@ -37,12 +98,28 @@ class Parser:
                   | function_decl
                   | console_log
         """
+        p[0] = p[1]
+
+    def p_statement_error(self, p: YaccProduction) -> None:
+        """
+        statement : error SEMICOLON
+                  | error CLOSEBRACE
+        """
+        # only reached in recovery mode, the tokens up to the separator were
+        # skipped; resynchronized, so the next error is reported right away
+        p.parser.errok()
+        p[0] = Invalid(pos=self._pos(p, 1))
 
     def p_statements(self, p: YaccProduction) -> None:
         """
         statements : statement
-                   | statement statements
+                   | statements statement
         """
+        if len(p) == 2:
+            p[0] = [p[1]]
+        else:
+            p[0] = p[1]
+            p[0].append(p[2])
 
     def p_empty(self, p: YaccProduction) -> None:
         """
@@ -50,7 +127,28 @@ class Parser:
         """
 
     def p_error(self, p: YaccProduction) -> None:
-        raise ParserSyntaxError(p)
+        # no token means the input ended unexpectedly
+        lexpos = self.lexer.end if p is None else p.lexpos
+        lineno = self.lexer.lineno if p is None else p.lineno
+
+        self.report(
+            ParserSyntaxError(p, lineno, self.lexer.find_column(lexpos))
+        )
+
+    def report(self, error: ParserSyntaxError) -> None:
+        """
+        Raises the error, or records it in `errors` when recovering; parsing
+        then resumes after the next `;` or `}`. Reaching `max_errors` raises
+        the error in both modes.
+
+        :param error: The error found
+        """
+        if not self.recover:
+            raise error
+
+        self.errors.append(error)
+        if len(self.errors) >= self.max_errors:
+            raise error
 
     # -----------------------------------------------------------------------------
     # Data Structures
@@ -66,6 +164,7 @@ class Parser:
                        | structure_array
                        | structure_tuple
         """
+        p[0] = p[1]
 
     # Object
 
@@ -73,12 +172,18 @@ class Parser:
         """
         structure_object : INTERFACE ID OPENBRACE structure_object_values CLOSEBRACE
         """
+        p[0] = Interface(p[2], p[4], pos=self._pos(p, 1))
 
     def p_structure_object_values(self, p: YaccProduction) -> None:
         """
         structure_object_values : ID COLON data_type SEMICOLON
-                                | ID COLON data_type SEMICOLON structure_object_values
+                                | structure_object_values ID COLON data_type SEMICOLON
         """
+        if len(p) == 5:
+            p[0] = [Field(p[1], p[3], pos=self._pos(p, 1))]
+        else:
+            p[0] = p[1]
+            p[0].append(Field(p[2], p[4], pos=self._pos(p, 2)))
 
     # Array
 
@@ -86,11 +191,14 @@ class Parser:
         """
         structure_array : assignment_var_type ID COLON data_type OPENBRACKET CLOSEBRACKET EQUALS structure_array_data SEMICOLON
         """
+        array_type = ArrayType(p[4], pos=p[4].pos)
+        p[0] = VarDecl(p[1], p[2], array_type, p[8], pos=self._pos(p, 1))
 
     def p_structure_array_data(self, p: YaccProduction) -> None:
         """
         structure_array_data : OPENBRACKET assignment_var_values CLOSEBRACKET
         """
+        p[0] = ArrayLiteral(split(p[2]), pos=self._pos(p, 1))
 
     # Tuple
 
@@ -98,17 +206,25 @@ class Parser:
         """
         structure_tuple : assignment_var_type ID COLON OPENBRACKET structure_tuple_type_list CLOSEBRACKET EQUALS structure_tuple_data SEMICOLON
         """
+        tuple_type = TupleType(p[5], pos=self._pos(p, 4))
+        p[0] = VarDecl(p[1], p[2], tuple_type, p[8], pos=self._pos(p, 1))
 
     def p_tuple_type_list(self, p: YaccProduction) -> None:
         """
         structure_tuple_type_list : data_type
-                                  | data_type COMMA structure_tuple_type_list
+                                  | structure_tuple_type_list COMMA data_type
         """
+        if len(p) == 2:
+            p[0] = [p[1]]
+        else:
+            p[0] = p[1]
+            p[0].append(p[3])
 
     def p_structure_tuple_data(self, p: YaccProduction) -> None:
         """
         structure_tuple_data : OPENBRACKET assignment_var_values CLOSEBRACKET
         """
+        p[0] = TupleLiteral(split(p[2]), pos=self._pos(p, 1))
 
     # -----------------------------------------------------------------------------
     # Control Structures
@@ -125,18 +241,20 @@ class Parser:
                           | control_while
                           | loop_for
         """
+        p[0] = p[1]
 
     def p_control_if(self, p: YaccProduction) -> None:
         """
         control_if : IF OPENPAREN condition CLOSEPAREN OPENBRACE control_if_body CLOSEBRACE
         """
-        p[0] = ("if", p[3], p[6])
+        p[0] = If(p[3], p[6], None, pos=self._pos(p, 1))
 
     def p_control_if_else(self, p: YaccProduction) -> None:
         """
         control_if_else : control_if ELSE OPENBRACE control_if_body CLOSEBRACE
         """
-        p[0] = ("if_else", p[4])
+        p[0] = p[1]
+        p[0].orelse = p[4]
 
     def p_control_if_body(self, p: YaccProduction) -> None:
         """
@@ -144,30 +262,49 @@ class Parser:
                         | RETURN assignment_var_value SEMICOLON
                         | statements RETURN assignment_var_value SEMICOLON
         """
+        if len(p) == 2:
+            p[0] = p[1]
+        elif len(p) == 4:
+            p[0] = [Return(p[2], pos=self._pos(p, 1))]
+        else:
+            p[0] = [*p[1], Return(p[3], pos=self._pos(p, 2))]
 
     def p_control_while(self, p: YaccProduction) -> None:
         """
         control_while : WHILE OPENPAREN condition CLOSEPAREN OPENBRACE statements CLOSEBRACE
         """
-        p[0] = ("while", p[3], p[6])
+        p[0] = While(p[3], p[6], pos=self._pos(p, 1))
 
     def p_condition(self, p: YaccProduction) -> None:
         """
         condition : condition_values
                   | logical_exclamation OPENPAREN condition_values CLOSEPAREN
         """
+        if len(p) == 2:
+            p[0] = p[1]
+        else:
+            p[0] = UnaryOp(p[1], p[3], pos=self._pos(p, 1))
 
     def p_condition_values(self, p: YaccProduction) -> None:
         """
         condition_values : STRINGCONTENT
                          | logical
         """
+        if p.slice[1].type == "STRINGCONTENT":
+            p[0] = self._atom(p, 1)
+        else:
+            p[0] = fold(p[1])
 
     def p_logical(self, p: YaccProduction) -> None:
         """
         logical : logical_values
-                | logical_values logical_operators logical
+                | logical logical_operators logical_values
         """
+        if len(p) == 2:
+            p[0] = [p[1]]
+        else:
+            p[0] = p[1]
+            p[0] += (p[2], p[3])
 
     def p_logical_values(self, p: YaccProduction) -> None:
         """
@@ -175,6 +312,10 @@ class Parser:
                        | boolean_value
                        | comparative
         """
+        if p.slice[1].type == "ID":
+            p[0] = self._atom(p, 1)
+        else:
+            p[0] = p[1]
 
     def p_comparative(self, p: YaccProduction) -> None:
         """
@@ -182,18 +323,30 @@ class Parser:
                     | STRINGCONTENT EQUALSEQUALS STRINGCONTENT
                     | STRINGCONTENT EQUALSEQUALSEQUALS STRINGCONTENT
         """
+        if p.slice[1].type == "STRINGCONTENT":
+            left, right = self._atom(p, 1), self._atom(p, 3)
+        else:
+            left, right = fold(p[1]), fold(p[3])
+
+        p[0] = BinaryOp(p[2], left, right, pos=left.pos)
 
     def p_arithmetic_expression(self, p: YaccProduction) -> None:
         """
         arithmetic_expression : comparative_values
-                              | comparative_values arithmetic_operators arithmetic_expression
+                              | arithmetic_expression arithmetic_operators comparative_values
         """
+        if len(p) == 2:
+            p[0] = [p[1]]
+        else:
+            p[0] = p[1]
+            p[0] += (p[2], p[3])
 
     def p_comparative_values(self, p: YaccProduction) -> None:
         """
         comparative_values : ID
                            | NUMBER
         """
+        p[0] = self._atom(p, 1)
 
     # -----------------------------------------------------------------------------
     # for loop
@@ -205,9 +358,16 @@ class Parser:
                  | FOR OPENPAREN assignment_var_type ID COLON data_type EQUALS NUMBER SEMICOLON loop_for_condition SEMICOLON loop_for_var_delta CLOSEPAREN OPENBRACE statements CLOSEBRACE
         """
         if len(p) == 15:
-            p[0] = ("for", p[8], p[10], p[13])
+            var_type, value = None, 6
         else:
-            p[0] = ("for", p[10], p[12], p[15])
+            var_type, value = p[6], 8
+
+        init = VarDecl(
+            p[3], p[4], var_type, self._atom(p, value), pos=self._pos(p, 3)
+        )
+        p[0] = For(
+            init, p[value + 2], p[value + 4], p[value + 7], pos=self._pos(p, 1)
+        )
 
     def p_loop_for_condition(self, p: YaccProduction) -> None:
         """
@@ -215,6 +375,8 @@ class Parser:
                            | NUMBER comparative_operators ID
                            | ID comparative_operators ID
         """
+        left, right = self._atom(p, 1), self._atom(p, 3)
+        p[0] = BinaryOp(p[2], left, right, pos=left.pos)
 
     def p_loop_for_var_delta(self, p: YaccProduction) -> None:
         """
@@ -223,6 +385,10 @@ class Parser:
                            | PLUSPLUS ID
                            | MINUSMINUS ID
         """
+        if p.slice[1].type == "ID":
+            p[0] = Update(p[2], self._atom(p, 1), False, pos=self._pos(p, 1))
+        else:
+            p[0] = Update(p[1], self._atom(p, 2), True, pos=self._pos(p, 1))
 
     # -----------------------------------------------------------------------------
     # Function Declarations
@@ -238,12 +404,27 @@ class Parser:
                       | FUNCTION ID OPENPAREN function_parameter CLOSEPAREN return_type OPENBRACE function_body CLOSEBRACE
                       | CONST ID EQUALS OPENPAREN function_parameter CLOSEPAREN return_type ARROW OPENBRACE function_body CLOSEBRACE
         """
+        if p.slice[1].type == "FUNCTION":
+            kind, params, body = "declaration", 4, 8
+        elif p.slice[4].type == "FUNCTION":
+            kind, params, body = "expression", 6, 10
+        else:
+            kind, params, body = "arrow", 5, 10
+
+        p[0] = FunctionDecl(
+            kind, p[2], p[params], p[params + 2], p[body], pos=self._pos(p, 1)
+        )
 
     def p_function_parameter(self, p: YaccProduction) -> None:
         """
         function_parameter : ID COLON data_type
-                           | ID COLON data_type COMMA function_parameter
+                           | function_parameter COMMA ID COLON data_type
         """
+        if len(p) == 4:
+            p[0] = [Param(p[1], p[3], pos=self._pos(p, 1))]
+        else:
+            p[0] = p[1]
+            p[0].append(Param(p[3], p[5], pos=self._pos(p, 3)))
 
     def p_function_body(self, p: YaccProduction) -> None:
         """
@@ -252,59 +433,67 @@ class Parser:
                       | RETURN ID SEMICOLON
                       | RETURN assignment_var_value SEMICOLON
         """
+        statements = p[1] if len(p) == 5 else []
+        value = len(p) - 2
+
+        if p.slice[value].type == "ID":
+            expr = self._atom(p, value)
+        else:
+            expr = p[value]
+
+        p[0] = [*statements, Return(expr, pos=self._pos(p, value - 1))]
 
     def p_return_type(self, p: YaccProduction) -> None:
         """
         return_type : COLON data_type
                     | empty
         """
+        if len(p) == 3:
+            p[0] = p[2]
 
     # -----------------------------------------------------------------------------
     # Terminals
     # -----------------------------------------------------------------------------
 
-    def get_val_data_type(self, value):
-        """
-        NOTE: This method is a workaround (hack) to accomplish type verification.
-
-        It works by comparing the given value to Python's built-in types, it does
-        not perform a check with the lexed/parsed language.
-        """
-
-        if isinstance(value, bool) or value in [
-            "TRUE",
-            "FALSE",
-            "true",
-            "false",
-            "True",
-            "False",
-        ]:
-            return "boolean"
-        elif isinstance(value, str):
-            # Remove leading and trailing quotes
-            value = value.strip("'\"")
-            return "string"
-        elif isinstance(value, int) or isinstance(value, float):
-            return "number"
+    def _pos(self, p: YaccProduction, n: int) -> Tuple[int, int]:
+        """
+        Returns the (line, column) of the n-th symbol of a production.
+        """
+        return p.lineno(n), p.lexer.find_column(p.lexpos(n))
+
+    def _atom(self, p: YaccProduction, n: int) -> Node:
+        """
+        Builds the node for the n-th symbol of a production, which must be an
+        `ID`, `STRINGCONTENT`, `NUMBER`, `TRUE` or `FALSE` token.
+        """
+        token, value, pos = p.slice[n].type, p[n], self._pos(p, n)
+
+        if token == "ID":
+            return Identifier(value, pos=pos)
+        elif token == "STRINGCONTENT":
+            return Literal("string", value[1:-1], pos=pos)
+        elif token == "NUMBER":
+            return Literal("number", value, pos=pos)
         else:
-            return "unknown"
+            return Literal("boolean", value.lower() == "true", pos=pos)
 
     def p_assignment_var(self, p: YaccProduction) -> None:
         """
         assignment_var : assignment_var_type ID EQUALS assignment_var_values SEMICOLON
                        | assignment_var_type ID COLON data_type EQUALS assignment_var_value SEMICOLON
         """
-        if len(p) == 8:
-            var_type = p[4]
-            value_type = self.get_val_data_type(p[6])
-
-            if var_type != value_type:
-                p[0] = None
-                raise ParserSyntaxError(
-                    f"Type mismatch: cannot assign {value_type} to {var_type}"
-                )
+        if len(p) == 6:
+            values = split(p[4])
+            if len(values) == 1:
+                value = values[0]
             else:
-                p[0] = p[5]
+                value = Sequence(values, pos=values[0].pos)
+
+            p[0] = VarDecl(p[1], p[2], None, value, pos=self._pos(p, 1))
+        else:
+            # the value's type is checked by `typecheck`, once the whole
+            # program is known
+            p[0] = VarDecl(p[1], p[2], p[4], p[6], pos=self._pos(p, 1))
 
     def p_assignment_var_type(self, p: YaccProduction) -> None:
         """
@@ -320,7 +509,7 @@ class Parser:
                   | TYPE_NUMBER
                   | TYPE_STRING
         """
-        p[0] = p[1]
+        p[0] = TypeRef(p.slice[1].type[5:].lower(), pos=self._pos(p, 1))
 
     def p_assignment_var_value(self, p: YaccProduction) -> None:
         """
@@ -330,18 +519,19 @@ class Parser:
                              | FALSE
                              | ID
         """
-        p[0] = p[1]
+        p[0] = self._atom(p, 1)
 
     def p_assignment_var_values(self, p: YaccProduction) -> None:
         """
         assignment_var_values : assignment_var_value
-                              | assignment_var_value COMMA assignment_var_values
-                              | assignment_var_value arithmetic_operators assignment_var_values
+                              | assignment_var_values COMMA assignment_var_value
+                              | assignment_var_values arithmetic_operators assignment_var_value
         """
         if len(p) == 2:
             p[0] = [p[1]]
         else:
-            p[0] = [p[1]] + p[3]
+            p[0] = p[1]
+            p[0] += (p[2], p[3])
 
     def p_logical_exclamation(self, p: YaccProduction) -> None:
         """
@@ -366,7 +556,7 @@ class Parser:
         boolean_value : TRUE
                       | FALSE
         """
-        p[0] = p[1]
+        p[0] = self._atom(p, 1)
 
     def p_logical_operators(self, p: YaccProduction) -> None:
         """
@@ -390,13 +580,36 @@ class Parser:
         """
         console_log : CONSOLE DOT LOG OPENPAREN console_content CLOSEPAREN SEMICOLON
         """
+        p[0] = ConsoleLog(fold(p[5]), pos=self._pos(p, 1))
 
     def p_console_log_content(self, p: YaccProduction) -> None:
         """
-        console_content : console_values
-                        | console_values PLUS console_content
-                        | ID OPENPAREN console_values CLOSEPAREN
+        console_content : console_sum
+                        | console_sum PLUS console_call
+                        | console_call
+        """
+        if len(p) == 2:
+            p[0] = p[1] if isinstance(p[1], list) else [p[1]]
+        else:
+            p[0] = p[1]
+            p[0] += (p[2], p[3])
+
+    def p_console_log_sum(self, p: YaccProduction) -> None:
+        """
+        console_sum : console_values
+                    | console_sum PLUS console_values
         """
+        if len(p) == 2:
+            p[0] = [p[1]]
+        else:
+            p[0] = p[1]
+            p[0] += (p[2], p[3])
+
+    def p_console_log_call(self, p: YaccProduction) -> None:
+        """
+        console_call : ID OPENPAREN console_values CLOSEPAREN
+        """
+        p[0] = Call(self._atom(p, 1), [p[3]], pos=self._pos(p, 1))
 
     def p_console_log_values(self, p: YaccProduction) -> None:
         """
@@ -404,20 +617,230 @@ class Parser:
                        | NUMBER
                        | STRINGCONTENT
         """
+        p[0] = self._atom(p, 1)
+
+    # -------------------------------------------------------------------------
+    # Parse tables
+    # -------------------------------------------------------------------------
+    # LALR tables are generated once, stored as `parsetab_<signature>.py` in
+    # the cache directory and loaded read-only afterwards; a module with the
+    # same name inside the package is used when the tables are shipped.
+    _tables: Dict[Tuple[type, str], ModuleType] = {}
+    _tables_lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def signature(cls) -> str:
+        """
+        Returns a digest of the grammar, used to version the parse tables.
+        """
+        rules = [
+            f"{name}={getattr(cls, name).__doc__}"
+            for name in sorted(dir(cls))
+            if name.startswith("p_")
+        ]
+
+        return digest(plyacc.__tabversion__, cls.start, *cls.tokens, *rules)
+
+    def _build(self, cache_dir: str) -> plyacc.LRParser:
+        name = f"parsetab_{self.signature()}"
+        key = (type(self), cache_dir)
+
+        with self._tables_lock:
+            tables = self._tables.get(key) or load_table(name, cache_dir)
+            if tables is not None:
+                self._tables[key] = tables
+                return plyacc.yacc(
+                    module=self,
+                    tabmodule=tables,
+                    debug=False,
+                    write_tables=False,
+                )
+
+            parser = None
+
+            def generate(outputdir: str) -> None:
+                nonlocal parser
+                parser = plyacc.yacc(
+                    module=self,
+                    tabmodule=name,
+                    outputdir=outputdir,
+                    debug=False,
+                )
+
+            if write_table(name, cache_dir, generate):
+                self._tables[key] = load_table(name, cache_dir)
+
+            if parser is None:
+                # cache directory isn't writable, keep the tables in memory
+                parser = plyacc.yacc(
+                    module=self,
+                    tabmodule=name,
+                    debug=False,
+                    write_tables=False,
+                )
+
+            return parser
 
     # -------------------------------------------------------------------------
 
-    def __init__(self, lexer: TSLexer) -> None:
+    def __init__(
+        self,
+        lexer: TSLexer,
+        cache_dir: Optional[str] = None,
+        recover: bool = False,
+        max_errors: int = 100,
+        profile: bool = False,
+    ) -> None:
+        """
+        :param lexer: The lexer providing the tokens
+        :param cache_dir: Directory of the generated tables, defaults to the
+         user's cache directory
+        :param recover: Whether to keep parsing after syntax errors, collecting
+         them in `errors`, instead of raising the first one
+        :param max_errors: The amount of errors after which recovery gives up
+        :param profile: Whether to count shifts and reductions and time the
+         actions of the productions in `stats`, shared with the lexer's if it
+         is profiled too; concurrent parses may lose some counts
+        """
+        self._local = threading.local()
         self.lexer = lexer
-        self.parser = plyacc.yacc(module=self)
+        self.parser = self._build(cache_dir or default_cache_dir())
+        # each parse drives its own copy of the parser's stacks, sharing the
+        # tables and productions
+        self._parsers = _Pool(self.parser, lambda: copy.copy(self.parser))
+        self.recover = recover
+        self.max_errors = max_errors
+        self.errors = []
+
+        self.stats: Optional[Stats] = None
+        if profile:
+            self.stats = lexer.stats if lexer.stats is not None else Stats()
+            # the productions are bound to this instance's own table copy
+            for production in self.parser.productions:
+                if production.callable is not None:
+                    production.callable = _timed(
+                        self.stats, production.str, production.callable
+                    )
+
+    # -------------------------------------------------------------------------
+    # Per-call state
+    # -------------------------------------------------------------------------
+    # A parse only touches shared state through `lexer` and `errors`, which
+    # resolve to the innermost parse running on the current thread; so one
+    # parser serves concurrent and nested calls, each with its own lexer and
+    # parser stacks, while single-threaded callers keep getting the lexer they
+    # passed in.
+
+    @property
+    def lexer(self) -> TSLexer:
+        """
+        The lexer of the parse running on the current thread, otherwise the one
+        the parser was created with.
+        """
+        calls = getattr(self._local, "calls", None)
+        return calls[-1].lexer if calls else self._lexers.primary
+
+    @lexer.setter
+    def lexer(self, lexer: TSLexer) -> None:
+        self._lexers = _Pool(lexer, lexer.clone)
 
-    def parse(self, input: str):
-        self.parser.parse(input, self.lexer)
+    @property
+    def errors(self) -> List[ParserSyntaxError]:
+        """
+        The errors of the last parse on the current thread, when recovering.
+        """
+        calls = getattr(self._local, "calls", None)
+        if calls:
+            return calls[-1].errors
+
+        return getattr(self._local, "errors", [])
+
+    @errors.setter
+    def errors(self, errors: List[ParserSyntaxError]) -> None:
+        self._local.errors = errors
+
+    def parse(self, input: str) -> Optional[Program]:
+        """
+        Lexes and parses a source text. Safe to call from several threads at
+        once: a call finding the parser's lexer busy lexes with a clone of it.
+
+        :param input: The source text
+        """
+        lexer = self._lexers.acquire()
+        try:
+            return self.parse_tokens(lexer.iter_tokens(input), lexer)
+        finally:
+            self._lexers.release(lexer)
+
+    def parse_tokens(
+        self, tokens: Iterable[LexToken], lexer: Optional[TSLexer] = None
+    ) -> Optional[Program]:
+        """
+        Parses an already lexed token stream.
+
+        When recovering, the errors found are left in `errors` and statements
+        skipped over are `Invalid` nodes. `None` is returned if the input ended
+        inside a broken statement or `max_errors` was reached.
+
+        :param tokens: The tokens to parse, e.g. from `Lexer.iter_tokens`
+        :param lexer: The lexer holding the input the tokens come from,
+         locating errors and nodes; the parser's lexer by default
+        """
+        tokens = iter(tokens)
+        call = _Call(lexer or self._lexers.primary, [])
+        calls = getattr(self._local, "calls", None)
+        if calls is None:
+            calls = self._local.calls = []
+
+        calls.append(call)
+        try:
+            if self.stats is not None:
+                return self._profile(tokens)
+
+            return self._parse(lambda: next(tokens, None))
+        finally:
+            calls.pop()
+            self._local.errors = call.errors
+
+    def _parse(
+        self, tokenfunc: Callable[[], Optional[LexToken]]
+    ) -> Optional[Program]:
+        parser = self._parsers.acquire()
+        try:
+            # tracking keeps positions of nonterminals, used for node spans
+            return parser.parse(
+                lexer=self.lexer, tokenfunc=tokenfunc, tracking=True
+            )
+        except ParserSyntaxError:
+            if not self.recover:
+                raise
+
+            return None
+        finally:
+            self._parsers.release(parser)
+
+    def _profile(self, tokens: Iterable[LexToken]) -> Optional[Program]:
+        stats = self.stats
+
+        def tokenfunc() -> Optional[LexToken]:
+            start = time.perf_counter()
+            t = next(tokens, None)
+            stats.token_time += time.perf_counter() - start
+            stats.shifts += t is not None
+
+            return t
+
+        start = time.perf_counter()
+        try:
+            return self._parse(tokenfunc)
+        finally:
+            stats.parse_time += time.perf_counter() - start
+            stats.parses += 1
 
     def run(self, prompt: str = "TSParxser"):
         try:
             s = input(prompt)
-            self.parse(s)
+            self._run(s)
         except Exception as e:
             print(f"Error: {e}")
 
@@ -427,9 +850,84 @@ class Parser:
                 s = input(prompt)
                 if not s:
                     continue
-                self.parse(s)
+                self._run(s)
             except EOFError:
                 break
             except Exception as e:
                 print(f"Error: {e}")
                 continue
+
+    def _run(self, s: str) -> None:
+        """
+        Parses an input of the prompt, printing its type errors.
+        """
+        program = self.parse(s)
+        if program is not None:
+            for diagnostic in typecheck.check(program):
+                print(diagnostic)
+
+
+class _Call(NamedTuple):
+    """
+    The state of a running parse.
+    """
+
+    lexer: TSLexer
+    errors: List[ParserSyntaxError]
+
+
+T = TypeVar("T")
+
+
+class _Pool(Generic[T]):
+    """
+    Hands out a primary object whenever it is free, spare ones made by
+    `factory` otherwise; the spares are kept for later calls.
+    """
+
+    def __init__(self, primary: T, factory: Callable[[], T]) -> None:
+        self.primary = primary
+        self.factory = factory
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._spares: List[T] = []
+
+    def acquire(self) -> T:
+        if self._busy.acquire(blocking=False):
+            return self.primary
+
+        with self._lock:
+            if self._spares:
+                return self._spares.pop()
+
+        return self.factory()
+
+    def release(self, item: T) -> None:
+        if item is self.primary:
+            self._busy.release()
+            return
+
+        with self._lock:
+            self._spares.append(item)
+
+
+def _timed(
+    stats: Stats, name: str, action: Callable[[YaccProduction], Any]
+) -> Callable[[YaccProduction], Any]:
+    """
+    Wraps the action of a production so its reductions are counted and timed
+    under `name`.
+    """
+    reductions, times = stats.reductions, stats.times
+    reductions.setdefault(name, 0)
+    times.setdefault(name, 0.0)
+
+    def timed(p: YaccProduction) -> Any:
+        start = time.perf_counter()
+        try:
+            return action(p)
+        finally:
+            times[name] += time.perf_counter() - start
+            reductions[name] += 1
+
+    return timed
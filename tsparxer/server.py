@@ -0,0 +1,429 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+server.py: Long-running JSON-RPC server, speaking the Language Server Protocol.
+"""
+
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import IO, Any, Callable, Dict, List, Optional
+
+from . import check
+from .incremental import Document
+
+# JSON-RPC error codes
+PARSE_ERROR: int = -32700
+INVALID_REQUEST: int = -32600
+METHOD_NOT_FOUND: int = -32601
+INVALID_PARAMS: int = -32602
+INTERNAL_ERROR: int = -32603
+
+# LSP `TextDocumentSyncKind.Incremental` and `DiagnosticSeverity.Error`
+SYNC_INCREMENTAL: int = 2
+SEVERITY_ERROR: int = 1
+
+
+class RPCError(Exception):
+    """
+    An error answered to a request, rather than a failure of the server.
+    """
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+# -----------------------------------------------------------------------------
+# Framing
+# -----------------------------------------------------------------------------
+
+
+def read_message(stream: IO[bytes]) -> Optional[Any]:
+    """
+    Reads a message framed by a `Content-Length` header, as LSP does. Returns
+    `None` at the end of the stream, raises a parse error once the headers of
+    a frame with an invalid header end.
+
+    :param stream: The binary stream to read from
+    """
+    length, invalid = None, None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+
+        line = line.strip()
+        if not line:
+            if length is not None or invalid is not None:
+                break
+            continue
+
+        try:
+            name, _, value = line.decode("ascii").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+                if length < 0:
+                    raise ValueError(length)
+        except ValueError:
+            # not ASCII, or a length that isn't a count of bytes
+            invalid = line
+
+    if invalid is not None:
+        raise RPCError(PARSE_ERROR, f"Invalid header {invalid!r}")
+
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise RPCError(PARSE_ERROR, "Invalid JSON") from None
+
+
+def write_message(stream: IO[bytes], message: Any) -> None:
+    """
+    Writes a message framed by a `Content-Length` header.
+
+    :param stream: The binary stream to write to
+    :param message: The JSON-serializable message
+    """
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    stream.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+    stream.flush()
+
+
+# -----------------------------------------------------------------------------
+# Requests
+# -----------------------------------------------------------------------------
+
+
+def _check(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    `tsparxer/check`: lexes and parses a `text` or a file at `path`.
+    """
+    max_errors = params.get("maxErrors", 1)
+    if "text" in params:
+        result = check.check_source(params["text"], "<input>", max_errors)
+    else:
+        result = check.check_file(params["path"], max_errors)
+
+    errors = result.errors or (
+        () if result.ok else ((result.lineno, result.col, result.message),)
+    )
+    return {
+        "ok": result.ok,
+        "tokens": result.tokens,
+        "errors": [{"line": n, "col": c, "message": m} for n, c, m in errors],
+    }
+
+
+def _tokenize(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    `tsparxer/tokenize`: lexes a `text` into `[type, value, line, offset]`.
+    """
+    lexer, _ = check.warm()
+    lexer.max_errors = None
+
+    tokens = [
+        [t.type, t.value, t.lineno, t.lexpos]
+        for t in lexer.iter_tokens(params["text"])
+    ]
+    return {
+        "tokens": tokens,
+        "errors": [
+            {"line": d.lineno, "col": d.col, "message": d.message}
+            for d in lexer.errors
+        ],
+    }
+
+
+# requests answered on the worker pool, they only use per-thread state
+REQUESTS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "tsparxer/check": _check,
+    "tsparxer/tokenize": _tokenize,
+}
+
+
+# -----------------------------------------------------------------------------
+# Sessions
+# -----------------------------------------------------------------------------
+
+
+class Session:
+    """
+    A connection of a client: reads its messages until `exit` or the end of
+    the stream and answers them.
+
+    Open documents are kept incrementally lexed and parsed, their diagnostics
+    are published after each change. Document notifications are handled in
+    order on the reading thread, standalone requests run concurrently on the
+    worker pool and are answered as soon as they are done.
+
+    Positions follow LSP, zero-based lines and characters, but characters are
+    counted in code points rather than UTF-16 code units.
+    """
+
+    def __init__(
+        self, reader: IO[bytes], writer: IO[bytes], executor: ThreadPoolExecutor
+    ) -> None:
+        """
+        :param reader: The stream the client's messages are read from
+        :param writer: The stream the answers are written to
+        :param executor: The worker pool running the requests
+        """
+        self.reader = reader
+        self.writer = writer
+        self.executor = executor
+
+        self.documents: Dict[str, Document] = {}
+        self.notifications: Dict[str, Callable[[Dict[str, Any]], None]] = {
+            "textDocument/didOpen": self.did_open,
+            "textDocument/didChange": self.did_change,
+            "textDocument/didClose": self.did_close,
+        }
+        self.shutdown = False
+        self._lock = threading.Lock()
+        self._pending: List[Future] = []
+
+    def run(self) -> None:
+        """
+        Serves the client, returns once every answer is written.
+        """
+        try:
+            while True:
+                try:
+                    message = read_message(self.reader)
+                except RPCError as e:
+                    self.send({"id": None, "error": _error(e)})
+                    continue
+
+                if message is None or not self.dispatch(message):
+                    break
+        finally:
+            wait(self._pending)
+
+    def send(self, message: Dict[str, Any]) -> None:
+        # answers of the pool are written concurrently
+        with self._lock:
+            write_message(self.writer, {"jsonrpc": "2.0", **message})
+
+    def dispatch(self, message: Any) -> bool:
+        """
+        Handles a message, returns whether to keep reading.
+
+        :param message: The decoded message
+        """
+        if not isinstance(message, dict) or "method" not in message:
+            self.send(
+                {
+                    "id": None,
+                    "error": _error(
+                        RPCError(INVALID_REQUEST, "Invalid request")
+                    ),
+                }
+            )
+            return True
+
+        method, params = message["method"], message.get("params") or {}
+
+        # notifications, answered by nothing or by other notifications
+        if "id" not in message:
+            if method == "exit":
+                return False
+
+            handler = self.notifications.get(method)
+            try:
+                if handler is not None:
+                    handler(params)
+            except (KeyError, TypeError, ValueError):
+                # malformed notifications can't be answered, only ignored
+                pass
+            return True
+
+        id = message["id"]
+        if method in REQUESTS:
+            self._pending = [f for f in self._pending if not f.done()]
+            self._pending.append(
+                self.executor.submit(self.answer, id, REQUESTS[method], params)
+            )
+        elif method == "initialize":
+            self.send({"id": id, "result": self.initialize()})
+        elif method == "shutdown":
+            self.shutdown = True
+            self.send({"id": id, "result": None})
+        else:
+            error = RPCError(METHOD_NOT_FOUND, f"Unknown method {method!r}")
+            self.send({"id": id, "error": _error(error)})
+
+        return True
+
+    def answer(
+        self, id: Any, func: Callable[[Dict[str, Any]], Any], params: Any
+    ) -> None:
+        """
+        Runs a request on the pool and sends its outcome.
+
+        :param id: The id of the request
+        :param func: The function answering the request
+        :param params: The parameters of the request
+        """
+        try:
+            message = {"id": id, "result": func(params)}
+        except (KeyError, TypeError, ValueError) as e:
+            error = RPCError(INVALID_PARAMS, f"Invalid params: {e}")
+            message = {"id": id, "error": _error(error)}
+        except RPCError as e:
+            message = {"id": id, "error": _error(e)}
+        except Exception as e:
+            error = RPCError(INTERNAL_ERROR, str(e))
+            message = {"id": id, "error": _error(error)}
+
+        self.send(message)
+
+    # -------------------------------------------------------------------------
+    # Language Server Protocol
+    # -------------------------------------------------------------------------
+
+    def initialize(self) -> Dict[str, Any]:
+        return {
+            "capabilities": {"textDocumentSync": SYNC_INCREMENTAL},
+            "serverInfo": {"name": "tsparxer"},
+        }
+
+    def did_open(self, params: Dict[str, Any]) -> None:
+        item = params["textDocument"]
+        self.documents[item["uri"]] = Document(item["text"])
+        self.publish(item["uri"])
+
+    def did_change(self, params: Dict[str, Any]) -> None:
+        uri = params["textDocument"]["uri"]
+        document = self.documents.get(uri)
+        if document is None:
+            return
+
+        for change in params["contentChanges"]:
+            if "range" not in change:
+                document.update(change["text"])
+                continue
+
+            start = _offset(document, change["range"]["start"])
+            end = _offset(document, change["range"]["end"])
+            document.edit(start, max(end - start, 0), change["text"])
+
+        self.publish(uri)
+
+    def did_close(self, params: Dict[str, Any]) -> None:
+        uri = params["textDocument"]["uri"]
+        if self.documents.pop(uri, None) is not None:
+            # clears the client's diagnostics of the document
+            self.send(
+                {
+                    "method": "textDocument/publishDiagnostics",
+                    "params": {"uri": uri, "diagnostics": []},
+                }
+            )
+
+    def publish(self, uri: str) -> None:
+        """
+        Sends the diagnostics of an open document.
+        """
+        diagnostics = []
+        for lineno, col, message in self.documents[uri].diagnostics():
+            start = {"line": lineno - 1, "character": col - 1}
+            end = {"line": lineno - 1, "character": col}
+            diagnostics.append(
+                {
+                    "range": {"start": start, "end": end},
+                    "severity": SEVERITY_ERROR,
+                    "source": "tsparxer",
+                    "message": message,
+                }
+            )
+
+        self.send(
+            {
+                "method": "textDocument/publishDiagnostics",
+                "params": {"uri": uri, "diagnostics": diagnostics},
+            }
+        )
+
+
+def _error(error: RPCError) -> Dict[str, Any]:
+    return {"code": error.code, "message": str(error)}
+
+
+def _offset(document: Document, position: Dict[str, int]) -> int:
+    """
+    Returns the offset of an LSP position in a document, a character past the
+    end of its line clamped to that end, and a line past the end of the text
+    to the end of the text.
+    """
+    line, character = position["line"], position["character"]
+    if line < 0 or character < 0:
+        raise ValueError(f"Negative position {line}:{character}")
+
+    starts, source = document.line_starts, document.source
+    if line >= len(starts):
+        return len(source)
+
+    end = starts[line + 1] - 1 if line + 1 < len(starts) else len(source)
+    if end > starts[line] and source[end - 1] == "\r":
+        end -= 1
+
+    return min(starts[line] + character, end)
+
+
+# -----------------------------------------------------------------------------
+# Entry point
+# -----------------------------------------------------------------------------
+
+
+def serve(socket_path: Optional[str] = None, jobs: Optional[int] = None) -> int:
+    """
+    Serves clients until stopped: a single one over stdin/stdout, or any
+    amount of them over a Unix socket. The worker pool is warmed up first so
+    no request pays for building the lexer and parse tables.
+
+    :param socket_path: The Unix socket to listen on, stdin/stdout if `None`
+    :param jobs: The amount of worker threads, defaults to the CPU count
+    """
+    jobs = jobs or os.cpu_count() or 1
+    executor = ThreadPoolExecutor(jobs, initializer=check.warm)
+    # builds the parse tables, later threads only load them
+    executor.submit(check.warm).result()
+
+    try:
+        if socket_path is None:
+            session = Session(sys.stdin.buffer, sys.stdout.buffer, executor)
+            session.run()
+            return 0 if session.shutdown else 1
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                Session(self.rfile, self.wfile, executor).run()
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        # stopped like with Ctrl-C, so the socket is removed
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+        with socketserver.ThreadingUnixStreamServer(socket_path, Handler) as s:
+            s.daemon_threads = True
+            try:
+                s.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os.unlink(socket_path)
+
+        return 0
+    finally:
+        executor.shutdown()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+stats.py: Counters collected by a profiled lexer and parser.
+"""
+
+import json
+from typing import IO, Any, Dict, List
+
+# dump formats of `Stats.dump`
+FORMATS = ("json", "collapsed")
+
+
+class Stats:
+    """
+    What a `Lexer` or `Parser` created with `profile=True` did: how often each
+    token rule matched, how often each production was reduced and how long
+    its action took, and the time spent parsing and waiting for tokens.
+
+    A profiled parser shares the stats of a profiled lexer, so a single object
+    describes both.
+    """
+
+    def __init__(self) -> None:
+        # matches per token rule, e.g. `t_ID`, including discarded ones such
+        # as `t_COMMENT` and runs of illegal characters as `t_error`
+        self.rules: Dict[str, int] = {}
+        # reductions and cumulative action time per production, as
+        # `statement -> assignment_var`
+        self.reductions: Dict[str, int] = {}
+        self.times: Dict[str, float] = {}
+        # tokens read by the parser, each shifted unless skipped by recovery
+        self.shifts = 0
+        self.parses = 0
+        # in seconds, the token time is part of the parse time
+        self.parse_time = 0.0
+        self.token_time = 0.0
+
+    @property
+    def reduces(self) -> int:
+        return sum(self.reductions.values())
+
+    def merge(self, other: "Stats") -> None:
+        """
+        Adds the counters of another `Stats`, e.g. of another thread.
+        """
+        for mine, theirs in (
+            (self.rules, other.rules),
+            (self.reductions, other.reductions),
+            (self.times, other.times),
+        ):
+            for key, value in theirs.items():
+                mine[key] = mine.get(key, 0) + value
+
+        self.shifts += other.shifts
+        self.parses += other.parses
+        self.parse_time += other.parse_time
+        self.token_time += other.token_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the counters as JSON-serializable values, most frequent rules
+        and most expensive productions first.
+        """
+        productions = sorted(self.reductions, key=lambda p: -self.times[p])
+        return {
+            "parses": self.parses,
+            "shifts": self.shifts,
+            "reduces": self.reduces,
+            "parse_time": self.parse_time,
+            "token_time": self.token_time,
+            "rules": dict(sorted(self.rules.items(), key=lambda r: -r[1])),
+            "productions": {
+                p: {"reductions": self.reductions[p], "time": self.times[p]}
+                for p in productions
+            },
+        }
+
+    def collapsed(self) -> List[str]:
+        """
+        Returns the time spent parsing as collapsed stacks, `frame;frame
+        microseconds` lines as read by flamegraph tools: waiting for tokens,
+        the action of each production under its nonterminal, and the rest.
+        """
+        lines = [f"parse;tokens {round(self.token_time * 1e6)}"]
+        for production in sorted(self.reductions):
+            if not self.reductions[production]:
+                continue
+
+            name = production.split(" -> ")[0]
+            micros = round(self.times[production] * 1e6)
+            lines.append(f"parse;reduce;{name};{production} {micros}")
+
+        # driving the parse tables
+        rest = self.parse_time - self.token_time - sum(self.times.values())
+        lines.append(f"parse {max(round(rest * 1e6), 0)}")
+
+        return lines
+
+    def dump(self, file: IO[str], format: str = "json") -> None:
+        """
+        Writes the counters to a text file.
+
+        :param file: The file to write to
+        :param format: One of `FORMATS`
+        """
+        if format == "json":
+            json.dump(self.to_dict(), file, indent=2)
+            file.write("\n")
+        elif format == "collapsed":
+            file.writelines(line + "\n" for line in self.collapsed())
+        else:
+            raise ValueError(f"Unknown stats format {format!r}")
+
+    def report(self, limit: int = 10) -> str:
+        """
+        Returns a summary of the most frequent token rules and the most
+        expensive productions.
+
+        :param limit: The amount of rules and productions listed
+        """
+        lines = [
+            f"{self.parses} parses, {self.shifts} shifts, {self.reduces} "
+            f"reduces in {self.parse_time:.3f}s "
+            f"({self.token_time:.3f}s waiting for tokens)"
+        ]
+
+        rules = sorted(self.rules.items(), key=lambda r: -r[1])[:limit]
+        if rules:
+            lines.append("token rules:")
+            lines.extend(f"  {count:>10} {name}" for name, count in rules)
+
+        productions = sorted(self.reductions, key=lambda p: -self.times[p])
+        if productions:
+            lines.append("productions:")
+            lines.extend(
+                f"  {self.times[p] * 1e3:>9.2f}ms {self.reductions[p]:>8} {p}"
+                for p in productions[:limit]
+            )
+
+        return "\n".join(lines)
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+tokens.py: Compact, array-backed storage and serialization of lexed tokens.
+"""
+
+import itertools
+import json
+import struct
+from array import array
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ply.lex import LexToken
+
+# formats of token dumps: one JSON object per line, or the binary format
+FORMATS = ("ndjson", "binary")
+
+# the binary format: a header of this magic plus a version byte, the token
+# type names, the UTF-8 source, then one record per token
+MAGIC: bytes = b"TSTK\x01"
+_RECORD = struct.Struct("<BIII")
+_COUNT = struct.Struct("<I")
+# records written or read at once
+_CHUNK: int = 4096
+# `json.dumps` builds an encoder per call when given options
+_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+class TokenBuffer:
+    """
+    Stores tokens column-wise in `array`s instead of one `LexToken` per token:
+    `kinds` holds small-int codes indexing `names`, `starts`/`ends` the offsets
+    of each token in `source` and `lines` their line numbers. Values are only
+    sliced out of the source when accessed, so a token costs 13 bytes instead
+    of a whole Python object.
+    """
+
+    def __init__(self, source: str, names: Sequence[str]) -> None:
+        """
+        :param source: The input the tokens are lexed from
+        :param names: The token types, e.g. `Lexer.tokens`
+        """
+        self.source = source
+        self.names = tuple(names)
+        self.codes: Dict[str, int] = {n: i for i, n in enumerate(self.names)}
+
+        self.kinds: array = array("B")
+        self.starts: array = array("I")
+        self.ends: array = array("I")
+        self.lines: array = array("I")
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, i: int) -> LexToken:
+        """
+        Builds the `LexToken` of the i-th token, as the lexer would return it.
+        """
+        t = LexToken()
+        t.type = self.names[self.kinds[i]]
+        t.value = self.value(i)
+        t.lineno = self.lines[i]
+        t.lexpos = self.starts[i]
+
+        return t
+
+    def __iter__(self) -> Iterator[LexToken]:
+        # materialized one at a time, e.g. to feed `Parser.parse_tokens`
+        return map(self.__getitem__, range(len(self)))
+
+    def append(self, type: str, start: int, end: int, lineno: int) -> None:
+        """
+        Adds a token to the end of the buffer.
+
+        :param type: The token type, one of `names`
+        :param start: The offset of the token's first character
+        :param end: The offset right after the token's last character
+        :param lineno: The line the token starts on
+        """
+        self.kinds.append(self.codes[type])
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(lineno)
+
+    def type(self, i: int) -> str:
+        return self.names[self.kinds[i]]
+
+    def text(self, i: int) -> str:
+        """
+        Returns the source text of the i-th token.
+        """
+        start, end = self.starts[i], self.ends[i]
+        return self.source[start:end]
+
+    def value(self, i: int) -> Any:
+        """
+        Returns the value of the i-th token, converted like the lexer does.
+        """
+        return _value(self.type(i), self.text(i))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory used by the token columns, without the source.
+        """
+        columns = (self.kinds, self.starts, self.ends, self.lines)
+        return sum(c.itemsize * len(c) for c in columns)
+
+    def dump(self, file: IO[bytes], format: str = "binary") -> None:
+        """
+        Writes the tokens to a binary file, see `TokenWriter`.
+
+        :param file: The file to write to
+        :param format: One of `FORMATS`
+        """
+        with TokenWriter(file, self.source, self.names, format) as writer:
+            for i in range(len(self)):
+                writer.append(
+                    self.type(i), self.starts[i], self.ends[i], self.lines[i]
+                )
+
+    @classmethod
+    def load(cls, file: IO[bytes]) -> "TokenBuffer":
+        """
+        Reads the tokens of a dump in the binary format, the only one holding
+        the whole source.
+
+        :param file: The file to read from
+        """
+        names, source = _read_header(file)
+        buffer = cls(source, names)
+        for kind, start, end, lineno in _read_records(file):
+            buffer.kinds.append(kind)
+            buffer.starts.append(start)
+            buffer.ends.append(end)
+            buffer.lines.append(lineno)
+
+        return buffer
+
+
+def _value(type: str, text: str) -> Any:
+    return int(text) if type == "NUMBER" else text
+
+
+# -----------------------------------------------------------------------------
+# Serialization
+# -----------------------------------------------------------------------------
+
+
+class TokenWriter:
+    """
+    Streams tokens to a binary file, in one of `FORMATS`:
+
+    - `ndjson`, a JSON object per token and line, with its `type`, `value`,
+      `lineno`, `lexpos` and `end` offset, for people and other tools;
+    - `binary`, a header holding the token type names and the source, then
+      13 bytes per token: its type code, start and end offsets and line.
+
+    Offsets count characters of the source, as the lexer's do. Tokens are
+    written in chunks, `close()` writes the last one.
+    """
+
+    def __init__(
+        self,
+        file: IO[bytes],
+        source: str,
+        names: Sequence[str],
+        format: str = "ndjson",
+    ) -> None:
+        """
+        :param file: The file to write to, left open
+        :param source: The input the tokens are lexed from
+        :param names: The token types, e.g. `Lexer.tokens`
+        :param format: One of `FORMATS`
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown token format {format!r}")
+
+        self.file = file
+        self.source = source
+        self.format = format
+        self.codes: Dict[str, int] = {n: i for i, n in enumerate(names)}
+        self.count = 0
+        self._chunk: List[bytes] = []
+
+        if format == "binary":
+            header = [MAGIC, struct.pack("<H", len(names))]
+            for name in names:
+                encoded = name.encode("ascii")
+                header.append(struct.pack("<B", len(encoded)) + encoded)
+
+            encoded = source.encode("utf-8")
+            header.append(_COUNT.pack(len(encoded)) + encoded)
+            file.write(b"".join(header))
+
+    def __enter__(self) -> "TokenWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def append(self, type: str, start: int, end: int, lineno: int) -> None:
+        """
+        Writes a token, the arguments are those of `TokenBuffer.append`.
+        """
+        if self.format == "binary":
+            record = _RECORD.pack(self.codes[type], start, end, lineno)
+        else:
+            token = {
+                "type": type,
+                "value": _value(type, self.source[start:end]),
+                "lineno": lineno,
+                "lexpos": start,
+                "end": end,
+            }
+            record = _ENCODER.encode(token).encode() + b"\n"
+
+        self._chunk.append(record)
+        self.count += 1
+        if len(self._chunk) >= _CHUNK:
+            self.flush()
+
+    def flush(self) -> None:
+        self.file.write(b"".join(self._chunk))
+        self._chunk.clear()
+
+    def close(self) -> None:
+        """
+        Writes the pending tokens, the file itself is left open.
+        """
+        self.flush()
+        self.file.flush()
+
+
+def read_tokens(file: IO[bytes]) -> Iterator[LexToken]:
+    """
+    Lazily yields the tokens of a dump written by `TokenWriter`, in either
+    format, as the lexer returned them.
+
+    :param file: The binary file to read from
+    """
+    head = file.read(len(MAGIC))
+    if head == MAGIC:
+        names, source = _read_header(file, head)
+        for kind, start, end, lineno in _read_records(file):
+            t = LexToken()
+            t.type = names[kind]
+            t.value = _value(t.type, source[start:end])
+            t.lineno, t.lexpos = lineno, start
+            yield t
+        return
+
+    if not head:
+        return
+
+    # the start of the first line was read looking for the magic
+    for line in itertools.chain([head + file.readline()], file):
+        if not line.strip():
+            continue
+
+        token = json.loads(line)
+        t = LexToken()
+        t.type, t.value = token["type"], token["value"]
+        t.lineno, t.lexpos = token["lineno"], token["lexpos"]
+        yield t
+
+
+def _read_header(
+    file: IO[bytes], head: Optional[bytes] = None
+) -> Tuple[Tuple[str, ...], str]:
+    """
+    Reads the header of a binary dump, returns its token types and source.
+
+    :param file: The file to read from
+    :param head: The start of the file, if already read
+    """
+    if head is None:
+        head = file.read(len(MAGIC))
+    if head != MAGIC:
+        raise ValueError("Not a binary token dump, or of another version")
+
+    names = []
+    (count,) = struct.unpack("<H", _read(file, 2))
+    for _ in range(count):
+        (length,) = struct.unpack("<B", _read(file, 1))
+        names.append(_read(file, length).decode("ascii"))
+
+    (length,) = _COUNT.unpack(_read(file, _COUNT.size))
+    return tuple(names), _read(file, length).decode("utf-8")
+
+
+def _read_records(file: IO[bytes]) -> Iterator[Tuple[int, int, int, int]]:
+    size = _RECORD.size
+    while True:
+        chunk = file.read(size * _CHUNK)
+        if len(chunk) % size:
+            # a short read, or a truncated file
+            chunk += _read(file, size - len(chunk) % size)
+        if not chunk:
+            return
+
+        yield from _RECORD.iter_unpack(chunk)
+
+
+def _read(file: IO[bytes], n: int) -> bytes:
+    data = file.read(n)
+    while len(data) < n:
+        more = file.read(n - len(data))
+        if not more:
+            raise ValueError("Truncated token dump")
+        data += more
+
+    return data
@@ -0,0 +1,456 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+typecheck.py: Semantic checking of a parsed program's types and names.
+"""
+
+import sys
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from .nodes import (
+    ArrayLiteral,
+    ArrayType,
+    BinaryOp,
+    Call,
+    ConsoleLog,
+    For,
+    FunctionDecl,
+    Identifier,
+    If,
+    Interface,
+    Invalid,
+    Literal,
+    Node,
+    Program,
+    Return,
+    Sequence,
+    TupleLiteral,
+    TupleType,
+    TypeRef,
+    UnaryOp,
+    Update,
+    VarDecl,
+    While,
+)
+
+# the type of anything that couldn't be resolved, assignable to and from any
+# other type so a single mistake is reported once
+UNKNOWN: str = "unknown"
+FUNCTION: str = "function"
+
+_COMPARATIVE = {"==", "===", "!=", "<", "<=", ">", ">="}
+_LOGICAL = {"&&", "||"}
+
+
+# a block to check: its statements, scope and enclosing function
+_Block = Tuple[List[Node], "Scope", Optional[FunctionDecl]]
+
+
+class TypeDiagnostic(NamedTuple):
+    """
+    A type error or unresolved name, `lineno`/`col` (1-based) locate the node
+    it was found at.
+    """
+
+    lineno: int
+    col: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.lineno}:{self.col}: {self.message}"
+
+
+class Symbol(NamedTuple):
+    """
+    A declared name: `kind` is `let`, `const`, `var`, `param` or `function`,
+    `node` the declaring node.
+    """
+
+    kind: str
+    type: str
+    node: Node
+
+
+class Scope:
+    """
+    The names declared in a block, looked up through the enclosing blocks.
+    """
+
+    __slots__ = ("parent", "names", "interfaces", "skipped")
+
+    def __init__(self, parent: Optional["Scope"] = None) -> None:
+        self.parent = parent
+        self.names: Dict[str, Symbol] = {}
+        # interfaces live apart from values, fields by name per interface
+        self.interfaces: Dict[str, Dict[str, str]] = {}
+        # whether error recovery skipped statements of the block, which may
+        # have declared any name
+        self.skipped = False
+
+    def lookup(self, name: str) -> Optional[Symbol]:
+        scope = self
+        while scope is not None:
+            symbol = scope.names.get(name)
+            if symbol is not None:
+                return symbol
+            scope = scope.parent
+
+        return None
+
+    def partial(self) -> bool:
+        """
+        Whether this block or an enclosing one had statements skipped.
+        """
+        scope = self
+        while scope is not None:
+            if scope.skipped:
+                return True
+            scope = scope.parent
+
+        return False
+
+
+def type_name(node: Optional[Node]) -> str:
+    """
+    Returns the name of a type annotation, as written in TypeScript, e.g.
+    `number[]` or `[string, number]`.
+
+    :param node: The annotation, `None` when omitted
+    """
+    if isinstance(node, TypeRef):
+        return node.name
+    elif isinstance(node, ArrayType):
+        return f"{type_name(node.element)}[]"
+    elif isinstance(node, TupleType):
+        return f"[{', '.join(type_name(t) for t in node.elements)}]"
+
+    return UNKNOWN
+
+
+def assignable(source: str, target: str) -> bool:
+    return source == target or UNKNOWN in (source, target)
+
+
+class TypeChecker:
+    """
+    Resolves every name of a program against the declarations in scope and
+    checks the types of declarations, operators, calls and returns, in a
+    single walk over the tree.
+
+    Blocks get their own scope, a hash map of the names they declare, the
+    names interned so lookups mostly compare pointers. Functions declared
+    with the `function` keyword are hoisted to the top of their block, and
+    function bodies are checked once the blocks around them are, as they
+    only run after those declared every name.
+
+    Names that may have been declared by statements skipped by error
+    recovery resolve to `UNKNOWN`, so one syntax error doesn't cascade.
+    """
+
+    def __init__(self) -> None:
+        self.diagnostics: List[TypeDiagnostic] = []
+        self._bodies: Deque[_Block] = deque()
+
+    def check(self, program: Program) -> List[TypeDiagnostic]:
+        """
+        Returns every error found in the program, in source order.
+
+        :param program: The program to check, as built by the parser
+        """
+        self.diagnostics = []
+        self._bodies.clear()
+        globals_ = Scope()
+
+        # statements with their scope and enclosing function, popped in
+        # source order; no recursion, so deep nesting can't exhaust the stack
+        stack: List[Tuple[Node, Scope, Optional[FunctionDecl]]] = []
+        self._block(program.body, globals_, None, stack)
+        while True:
+            while stack:
+                self._statement(*stack.pop(), stack)
+
+            if not self._bodies:
+                break
+            self._block(*self._bodies.popleft(), stack)
+
+        return sorted(self.diagnostics)
+
+    def report(self, node: Node, message: str) -> None:
+        self.diagnostics.append(TypeDiagnostic(node.lineno, node.col, message))
+
+    # -------------------------------------------------------------------------
+    # Statements
+    # -------------------------------------------------------------------------
+
+    def _block(
+        self,
+        body: List[Node],
+        scope: Scope,
+        function: Optional[FunctionDecl],
+        stack: List[Tuple[Node, Scope, Optional[FunctionDecl]]],
+    ) -> None:
+        for node in body:
+            if isinstance(node, FunctionDecl) and node.kind == "declaration":
+                self._declare(scope, node.name, "function", FUNCTION, node)
+            elif isinstance(node, Invalid):
+                scope.skipped = True
+
+        stack.extend((node, scope, function) for node in reversed(body))
+
+    def _statement(
+        self,
+        node: Node,
+        scope: Scope,
+        function: Optional[FunctionDecl],
+        stack: List[Tuple[Node, Scope, Optional[FunctionDecl]]],
+    ) -> None:
+        if isinstance(node, VarDecl):
+            self._var(node, scope)
+        elif isinstance(node, FunctionDecl):
+            if node.kind != "declaration":
+                self._declare(scope, node.name, "const", FUNCTION, node)
+
+            inner = Scope(scope)
+            for param in node.params:
+                self._declare(
+                    inner, param.name, "param", type_name(param.type), param
+                )
+            self._bodies.append((node.body, inner, node))
+        elif isinstance(node, Interface):
+            self._interface(node, scope)
+        elif isinstance(node, If):
+            self._type(node.test, scope)
+            self._block(node.body, Scope(scope), function, stack)
+            if node.orelse is not None:
+                self._block(node.orelse, Scope(scope), function, stack)
+        elif isinstance(node, While):
+            self._type(node.test, scope)
+            self._block(node.body, Scope(scope), function, stack)
+        elif isinstance(node, For):
+            # the loop variable is visible in the whole loop only
+            loop = Scope(scope)
+            self._var(node.init, loop)
+            self._type(node.test, loop)
+            self._type(node.update, loop)
+            self._block(node.body, Scope(loop), function, stack)
+        elif isinstance(node, Return):
+            value = self._type(node.value, scope)
+            expected = (
+                type_name(function.return_type)
+                if function is not None
+                else UNKNOWN
+            )
+            if not assignable(value, expected):
+                self.report(
+                    node.value,
+                    f"Type mismatch: cannot return {value} from a function "
+                    f"returning {expected}",
+                )
+        elif isinstance(node, ConsoleLog):
+            self._type(node.argument, scope)
+
+    def _var(self, node: VarDecl, scope: Scope) -> None:
+        expected = type_name(node.type)
+
+        # literals are checked element by element against their annotation
+        if isinstance(node.value, ArrayLiteral) and isinstance(
+            node.type, ArrayType
+        ):
+            element = type_name(node.type.element)
+            for value in node.value.elements:
+                self._assign(value, self._type(value, scope), element)
+        elif isinstance(node.value, TupleLiteral) and isinstance(
+            node.type, TupleType
+        ):
+            values, types = node.value.elements, node.type.elements
+            if len(values) != len(types):
+                self.report(
+                    node.value,
+                    f"Type mismatch: cannot assign {len(values)} elements "
+                    f"to a tuple of {len(types)}",
+                )
+            for value, type_ in zip(values, types):
+                self._assign(value, self._type(value, scope), type_name(type_))
+        else:
+            value = self._type(node.value, scope)
+            if node.type is None:
+                expected = value
+            else:
+                self._assign(node.value, value, expected)
+
+        self._declare(scope, node.name, node.kind, expected, node)
+
+    def _assign(self, node: Node, value: str, expected: str) -> None:
+        if not assignable(value, expected):
+            self.report(
+                node, f"Type mismatch: cannot assign {value} to {expected}"
+            )
+
+    def _declare(
+        self, scope: Scope, name: str, kind: str, type_: str, node: Node
+    ) -> None:
+        name = sys.intern(name)
+        previous = scope.names.get(name)
+
+        # only `var` may be declared again, by another `var`
+        if previous is not None and not (kind == previous.kind == "var"):
+            self.report(node, f"Cannot redeclare '{name}'")
+            return
+        # and only with the same type
+        if previous is not None and not assignable(type_, previous.type):
+            self.report(
+                node, f"'{name}' is declared as {previous.type}, not {type_}"
+            )
+            return
+
+        scope.names[name] = Symbol(kind, type_, node)
+
+    def _interface(self, node: Interface, scope: Scope) -> None:
+        # declarations of the same interface merge, as in TypeScript
+        fields = scope.interfaces.setdefault(sys.intern(node.name), {})
+        seen = set()
+        for field in node.fields:
+            name = sys.intern(field.name)
+            type_ = type_name(field.type)
+            if name in seen:
+                self.report(field, f"Duplicate field '{name}'")
+            elif fields.get(name, type_) != type_:
+                self.report(
+                    field,
+                    f"Field '{name}' of '{node.name}' is declared as "
+                    f"{fields[name]}, not {type_}",
+                )
+
+            seen.add(name)
+            fields.setdefault(name, type_)
+
+    # -------------------------------------------------------------------------
+    # Expressions
+    # -------------------------------------------------------------------------
+
+    def _type(self, expr: Node, scope: Scope) -> str:
+        """
+        Returns the type of an expression, reporting the errors inside it.
+        Operands are typed before their operators through an explicit stack,
+        as long operator chains fold into deep trees.
+        """
+        types: List[str] = []
+        stack: List[Tuple[Node, bool]] = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+            if not ready and not isinstance(node, (Identifier, Literal)):
+                stack.append((node, True))
+                stack.extend(
+                    (child, False) for child in reversed(list(node.children()))
+                )
+                continue
+
+            start = len(types) - sum(1 for _ in node.children())
+            operands = types[start:]
+            del types[start:]
+            types.append(self._combine(node, operands, scope))
+
+        return types[0]
+
+    def _combine(self, node: Node, operands: List[str], scope: Scope) -> str:
+        if isinstance(node, Literal):
+            return node.kind
+        elif isinstance(node, Identifier):
+            symbol = scope.lookup(node.name)
+            if symbol is None:
+                if not scope.partial():
+                    self.report(node, f"Cannot find name '{node.name}'")
+                return UNKNOWN
+            return symbol.type
+        elif isinstance(node, BinaryOp):
+            return self._binary(node, *operands)
+        elif isinstance(node, UnaryOp):
+            return "boolean"
+        elif isinstance(node, Update):
+            return self._update(node, scope, operands[0])
+        elif isinstance(node, Call):
+            return self._call(node, scope, operands[1:])
+        elif isinstance(node, ArrayLiteral):
+            elements = sorted(set(operands))
+            if len(elements) == 1:
+                return f"{elements[0]}[]"
+            return f"({' | '.join(elements)})[]"
+        elif isinstance(node, TupleLiteral):
+            return f"[{', '.join(operands)}]"
+        elif isinstance(node, Sequence):
+            return operands[-1]
+
+        return UNKNOWN
+
+    def _binary(self, node: BinaryOp, left: str, right: str) -> str:
+        op = node.op
+        if op in _COMPARATIVE or op in _LOGICAL:
+            return "boolean"
+        elif UNKNOWN in (left, right):
+            return UNKNOWN
+        elif op == "+" and "string" in (left, right):
+            return "string"
+        elif left == right == "number":
+            return "number"
+
+        self.report(
+            node,
+            f"Operator '{op}' cannot be applied to {left} and {right}",
+        )
+        return UNKNOWN
+
+    def _update(self, node: Update, scope: Scope, operand: str) -> str:
+        symbol = scope.lookup(node.operand.name)
+        if symbol is not None and symbol.kind == "const":
+            self.report(
+                node, f"Cannot assign to '{node.operand.name}', a constant"
+            )
+        elif not assignable(operand, "number"):
+            self.report(
+                node, f"Operator '{node.op}' cannot be applied to {operand}"
+            )
+
+        return "number"
+
+    def _call(self, node: Call, scope: Scope, args: List[str]) -> str:
+        symbol = scope.lookup(node.callee.name)
+        if symbol is None:
+            # already reported as an unresolved name
+            return UNKNOWN
+        elif symbol.kind != "function" and symbol.type != FUNCTION:
+            if symbol.type != UNKNOWN:
+                self.report(
+                    node,
+                    f"'{node.callee.name}' is a {symbol.type}, not a "
+                    "function",
+                )
+            return UNKNOWN
+
+        function = symbol.node
+        if not isinstance(function, FunctionDecl):
+            return UNKNOWN
+
+        params = function.params
+        if len(args) != len(params):
+            self.report(
+                node,
+                f"'{function.name}' takes {len(params)} arguments, "
+                f"not {len(args)}",
+            )
+        for arg, value, param in zip(node.args, args, params):
+            self._assign(arg, value, type_name(param.type))
+
+        return type_name(function.return_type)
+
+
+def check(program: Program) -> List[TypeDiagnostic]:
+    """
+    Returns the type errors and unresolved names of a program, in source
+    order.
+
+    :param program: The program to check, as built by the parser
+    """
+    return TypeChecker().check(program)
@@ -6,8 +6,17 @@
 utility.py: Utilities file.
 """
 
-import re
-from typing import Any, Dict, List
+import contextlib
+import hashlib
+import importlib.util
+import mmap
+import os
+import sys
+import tempfile
+from types import ModuleType
+from typing import Callable, Iterator, Optional, Union
+
+from .tokens import read_tokens
 
 
 def read_file(file_path: str) -> str:
@@ -22,28 +31,154 @@ def read_file(file_path: str) -> str:
     return f_content
 
 
-def parse_lex_output(input: str) -> List[Dict[str, Any]]:
-    result = []
-    pattern = r"LexToken\((\w+),('(.*?)'|(\d+)),(\d+),(\d+)\)"
-    for line in input.splitlines():
-        match = re.match(pattern, line)
-        if match:
-            t_type, t_val = match.group(1), match.group(3) or match.group(4)
-            result.append({"type": t_type, "value": t_val})
-    return result
+@contextlib.contextmanager
+def map_file(file_path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Maps the contents of a file read-only into memory, rather than reading
+    them; the pages come from the page cache, shared with every process
+    mapping the same file, and are only loaded as they are touched. Empty
+    files, which can't be mapped, give `b""`.
+
+    :param file_path: The path of the file to map
+    """
+    with open(file_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def decode_chunks(
+    data: Union[mmap.mmap, bytes], chunk_size: int = 1 << 20
+) -> Iterator[str]:
+    """
+    Decodes UTF-8 data, e.g. a mapped file, a chunk at a time into the text
+    `read_file` would return, newlines translated. Chunks end right after a
+    newline, which never lies inside a multi-byte character; ASCII is decoded
+    by a fast path of the UTF-8 codec.
+
+    :param data: The bytes to decode
+    :param chunk_size: The least amount of bytes per chunk, but the last
+    """
+    pos = 0
+    while pos < len(data):
+        end = data.find(b"\n", pos + chunk_size - 1)
+        end = len(data) if end == -1 else end + 1
+        chunk = data[pos:end]
+        pos = end
+
+        if b"\r" in chunk:
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        yield chunk.decode("utf-8")
+
+
+def digest(*parts: str) -> str:
+    """
+    Returns a short, stable hex digest of the given strings.
+
+    :param parts: The strings to hash, order matters
+    """
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def default_cache_dir() -> str:
+    """
+    Returns the directory generated tables are persisted to, taken from the
+    `TSPARXER_CACHE_DIR` environment variable or the user's cache directory.
+    """
+    cache_dir = os.environ.get("TSPARXER_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
 
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+
+    return os.path.join(cache_home, "tsparxer")
+
+
+def load_table(name: str, directory: str) -> Optional[ModuleType]:
+    """
+    Loads a generated table module (PLY `lextab`/`parsetab`) from the given
+    directory without touching `sys.path`, returns `None` if it is missing or
+    can't be loaded.
+
+    :param name: The module name, without the `.py` suffix
+    :param directory: The directory holding the module
+    """
+    path = os.path.join(directory, f"{name}.py")
+    if not os.path.isfile(path):
+        return None
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        return None
+
+    return module
+
+
+def write_table(
+    name: str, directory: str, write: Callable[[str], None]
+) -> bool:
+    """
+    Atomically persists a generated table module, so concurrent processes
+    never observe (or import) a half-written file. Returns whether the table
+    was written.
+
+    :param name: The module name, without the `.py` suffix
+    :param directory: The directory to store the module in
+    :param write: Callback writing `<name>.py` into the directory it is given
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=directory) as tmp:
+            write(tmp)
+            os.replace(
+                os.path.join(tmp, f"{name}.py"),
+                os.path.join(directory, f"{name}.py"),
+            )
+    except OSError:
+        return False
+
+    return True
+
+
+def tokens(
+    path: str,
+    output: Optional[str] = None,
+    format: str = "ndjson",
+    read: bool = False,
+) -> int:
+    """
+    Writes the tokens of a source file as a dump, see `tokens.TokenWriter`;
+    or, with `read`, prints the tokens of a dump one per line. Returns the
+    exit status.
+
+    :param path: The source file, or the dump with `read`
+    :param output: The file to write to, stdout if `None`
+    :param format: The format of the dump, one of `tokens.FORMATS`
+    :param read: Whether `path` is a dump to read
+    """
+    # imported here, the lexer depends on this module
+    from .lexer import Lexer
 
-def parse() -> None:
-    # specify input and output files
-    FILE_IN: str = "data/lex_data.in"
-    FILE_OUT: str = "data/parsed.out"
+    with contextlib.ExitStack() as stack:
+        if output is None:
+            out = sys.stdout.buffer
+        else:
+            out = stack.enter_context(open(output, "wb"))
 
-    # read input & write to file
-    with open(FILE_IN, "r") as file:
-        lex_output = file.read()
+        if not read:
+            Lexer().dump(read_file(path), out, format)
+            return 0
 
-    with open(FILE_OUT, "w") as file:
-        for item in parse_lex_output(lex_output):
-            file.write(str(item) + "\n")
+        with open(path, "rb") as file:
+            for t in read_tokens(file):
+                out.write(f"{t}\n".encode("utf-8"))
 
-    print("Parsing successful, be wary of strings and numbers mixing.")
+    return 0
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+worker.py: Background thread running the newest of the submitted jobs.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class Worker:
+    """
+    Runs a function on a background thread so the caller, e.g. the Tk event
+    loop, never waits for it.
+
+    Every job gets a generation number and only the newest one matters: queued
+    jobs are skipped when a newer one is submitted, and results of jobs which
+    were superseded or cancelled while running are dropped.
+    """
+
+    def __init__(self, func: Callable[..., Any]) -> None:
+        """
+        :param func: The function run with the arguments of each job
+        """
+        self.func = func
+        self.generation = 0
+
+        self._jobs: queue.Queue = queue.Queue()
+        self._results: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, *args: Any) -> int:
+        """
+        Queues a job, superseding every previous one. Returns its generation.
+
+        :param args: The arguments passed to the function
+        """
+        self.generation += 1
+        self._jobs.put((self.generation, args))
+
+        return self.generation
+
+    def cancel(self) -> None:
+        """
+        Drops the results of every job submitted so far.
+        """
+        self.generation += 1
+
+    def poll(self, timeout: float = 0.0) -> Optional[Any]:
+        """
+        Returns the result of the newest job, or `None` if it isn't done yet.
+        An exception raised by the job is raised again here.
+
+        :param timeout: How long to wait for the result, in seconds
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                generation, result, error = self._results.get(
+                    block=remaining > 0, timeout=max(remaining, 0)
+                )
+            except queue.Empty:
+                return None
+
+            if generation != self.generation:
+                continue
+            if error is not None:
+                raise error
+
+            return result
+
+    def close(self) -> None:
+        """
+        Stops the thread once the running job is done.
+        """
+        self.cancel()
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+
+            # only the newest of the queued jobs is worth running
+            while job is not None:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+            if job is None:
+                return
+
+            generation, args = job
+            if generation != self.generation:
+                continue
+
+            result, error = None, None
+            try:
+                result = self.func(*args)
+            except Exception as e:
+                error = e
+
+            if generation == self.generation:
+                self._results.put((generation, result, error))